@@ -2,6 +2,7 @@ from fastapi import APIRouter, UploadFile, HTTPException
 import logging
 from dotenv import load_dotenv
 from app.utils.ner_clickhouse_service import OmdFileProcesser
+from app.utils.upload_storage import spool_upload, upload_workspace
 
 # Load environment variables
 load_dotenv()
@@ -26,8 +27,10 @@ async def predict_ner(table_id: str, file: UploadFile):
     # Extract file extension
     file_extension = file.filename.split(".")[-1]
     
-    # Process the file based on its extension using the processor instance
-    data = await processor.process_file_data(file, file_extension)
+    # Stream the upload to a private directory and parse it from disk; the file is removed once parsed
+    with upload_workspace() as upload_dir:
+        stored = await spool_upload(file, upload_dir)
+        data = await processor.process_file_data(stored.path, file_extension, file.filename)
     
     # Process NER and update results in ClickHouse
     save_result = await processor.process_and_update_ner_results(table_id, data)
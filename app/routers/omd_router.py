@@ -1,8 +1,9 @@
 from fastapi import APIRouter, UploadFile, HTTPException
-from app.utils.clickhouse_service import save_omd_table_data
-from app.utils.csv_processor import process_csv
+from app.utils.clickhouse_service import save_omd_table_data_in_chunks
+from app.utils.csv_processor import iter_csv_chunks
 from app.constants.omd_db_entity import ALLOWED_OMD_DB_ENTITY
 import os
+import asyncio
 router = APIRouter()
 
 @router.post("/upload/{entity_type}")
@@ -11,8 +12,11 @@ async def upload_data(entity_type: str, file: UploadFile):
     if entity_type not in ALLOWED_OMD_DB_ENTITY:
         raise HTTPException(status_code=400, detail="Invalid entity type")
 
-    # Process the CSV file
-    data = process_csv(file)
-    # Send the data to ClickHouse
-    result = save_omd_table_data(entity_type, data)
+    # Stream the CSV file to ClickHouse chunk by chunk. Parsing and inserting a large file takes a while,
+    # so it runs on a worker thread instead of blocking every other request on the event loop
+    try:
+        result = await asyncio.to_thread(save_omd_table_data_in_chunks, entity_type, iter_csv_chunks(file))
+    except ValueError as e:
+        # Empty upload or a CSV without the identifier column
+        raise HTTPException(status_code=400, detail=str(e))
     return {"message": "Data uploaded successfully", "details": {"entity_type": entity_type, "result": result}}
\ No newline at end of file
@@ -2,14 +2,18 @@ from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from typing import List, Dict, Any
 import os
 import logging
-from uuid import uuid4
-from datetime import datetime
+import shutil
+from uuid import UUID, uuid4
 from client_connect import Connection
+from app.utils.bulk_writer import insert_columns
 from collections import defaultdict
 import asyncio
 import json
 from dotenv import load_dotenv
-from pii_scanner.scanner import PIIScanner
+from app.utils.model_registry import model_registry
+from app.utils.scan_executor import get_scan_executor
+from app.utils.upload_storage import StoredUpload, spool_upload
+from app.utils.scan_result_cache import scan_result_cache, HIT, MISS
 from pii_scanner.constants.patterns_countries import Regions
 
 load_dotenv()
@@ -23,16 +27,26 @@ logging.basicConfig(level=logging.INFO)
 UNSTRUCTURED_FILE_FORMATS = os.getenv("UNSTRUCTURED_FILE_FORMATS").split(',')
 STRUCTURED_FILE_FORMATS = os.getenv("STRUCTURED_FILE_FORMATS").split(',')
 
-async def save_file(file: UploadFile, temp_dir: str) -> str:
+PII_SCANNER_TEMP_DIR = "/tmp/pii_scanner"
+# Fraction of each file sampled by the PII scanner; part of the scan result cache key
+PII_SCAN_SAMPLE_SIZE = 0.2
+# Maximum number of /process-files jobs running at the same time; later jobs wait in 'queued'
+PII_SCAN_MAX_CONCURRENT_JOBS = int(os.getenv("PII_SCAN_MAX_CONCURRENT_JOBS", "2"))
+# Seconds after which a queued or running job is marked failed at startup even though its files are not on this
+# instance, e.g. when the instance that accepted it is gone
+PII_SCAN_JOB_STALE_SECONDS = int(os.getenv("PII_SCAN_JOB_STALE_SECONDS", "3600"))
+
+_job_semaphore = asyncio.Semaphore(PII_SCAN_MAX_CONCURRENT_JOBS)
+_running_jobs = set()
+
+async def save_file(file: UploadFile, temp_dir: str) -> StoredUpload:
     """
-    Saves the uploaded file temporarily and returns the file path.
+    Streams the uploaded file to temp_dir and returns where it was stored, with its size and sha256.
     """
-    file_path = os.path.join(temp_dir, file.filename)
     try:
-        with open(file_path, "wb") as temp_file:
-            temp_file.write(await file.read())
-        logger.info(f"File {file.filename} saved successfully to {file_path}")
-        return file_path
+        return await spool_upload(file, temp_dir)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to save file '{file.filename}': {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to save file '{file.filename}'.")
@@ -48,17 +62,17 @@ def get_human_readable_size(file_path: str) -> str:
     else:
         return f"{size_bytes / 1024 ** 3:.0f} GB"
 
-async def process_instant_classifier_files(file_path: str, file_extension: str, file_name: str) -> Dict[str, Any]:
+async def process_instant_classifier_files(file_path: str, file_extension: str, file_name: str, scanner=None) -> Dict[str, Any]:
     """
     Applies the NER scanner on the file and returns the results.
     """
     entity_counts = defaultdict(int)
     total_entities = 0
     ner_results = 'NA'
-    scanner = PIIScanner()
+    scanner = scanner or model_registry.get("pii_scanner")
     
     try:
-        json_result = await scanner.scan(str(file_path), sample_size=0.2, region=Regions.IN)
+        json_result = await scanner.scan(str(file_path), sample_size=PII_SCAN_SAMPLE_SIZE, region=Regions.IN)
         
         if not json_result:
             logger.error(f"No PII detected in the file {file_name} ({file_extension}).")
@@ -112,7 +126,7 @@ async def process_instant_classifier_files(file_path: str, file_extension: str,
             ner_results = {
                 'highest_label': "NA",
                 'confidence_score': 0.00,
-                'detected_entities': {"NA"}
+                'detected_entities': "{ NA }"
             }
 
         logger.info(f"NER results: {ner_results}")
@@ -122,13 +136,98 @@ async def process_instant_classifier_files(file_path: str, file_extension: str,
         logger.error(f"Error processing file {file_name}--{file_extension}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error during NER processing: {str(e)}")
 
-@router.post("/process-files/")
+def _scan_file_in_worker(file_path: str, file_extension: str, file_name: str) -> Dict[str, Any]:
+    """
+    Runs in a scan worker process: scans one file with the process's shared PIIScanner.
+    Errors are returned as plain messages, since HTTPException does not pickle back to the parent.
+    """
+    try:
+        return {"results": asyncio.run(process_instant_classifier_files(file_path, file_extension, file_name))}
+    except HTTPException as e:
+        return {"error": str(e.detail)}
+    except Exception as e:
+        return {"error": str(e)}
+
+def lookup_cached_results(file_hashes: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Returns the cached ner_results of the files scanned before (by content), keyed by file name.
+    """
+    cached = {}
+    for file_name, content_sha256 in file_hashes.items():
+        ner_results = scan_result_cache.get(Connection.client, content_sha256, Regions.IN, PII_SCAN_SAMPLE_SIZE)
+        if ner_results is not None:
+            cached[file_name] = ner_results
+    return cached
+
+def store_scan_results(file_hashes: Dict[str, str], results: List[Dict[str, Any]]) -> None:
+    for result in results:
+        if result.get("cache") == MISS:
+            scan_result_cache.put(Connection.client, file_hashes[result["file_name"]], Regions.IN, PII_SCAN_SAMPLE_SIZE, result["results"])
+
+async def scan_job_file(job_dir: str, file_name: str, cached_results: Any = None) -> Dict[str, Any]:
+    """
+    Scans one file of a job on the worker pool (unless cached_results are given) and returns its entry
+    for the job's scan_results.
+    """
+    file_path = os.path.join(job_dir, file_name)
+    file_extension = file_name.lower().split('.')[-1]
+    if cached_results is not None:
+        logger.info(f"File {file_name} was scanned before; using cached results.")
+        outcome, cache_status = {"results": cached_results}, HIT
+    else:
+        logger.info(f"Processing file: {file_name} with extension: {file_extension}")
+        loop = asyncio.get_running_loop()
+        outcome = await loop.run_in_executor(get_scan_executor(), _scan_file_in_worker, file_path, file_extension, file_name)
+        cache_status = MISS
+
+    if outcome.get("results"):
+        logger.info(f"File {file_name} processed successfully.")
+        return {
+            "file_name": file_name,
+            "file_extension": file_extension,
+            "file_size": get_human_readable_size(file_path),
+            "results": outcome["results"],
+            "cache": cache_status
+        }
+    error = outcome.get("error", "No entities detected.")
+    logger.error(f"Error processing file {file_name}: {error}")
+    return {file_name: {"error": error}}
+
+async def run_scan_job(job_id: str, customer_id: int, job_dir: str, file_hashes: Dict[str, str]) -> None:
+    """
+    Background task for one /process-files job: scans all of its files in parallel and records the result.
+    file_hashes maps each stored file name to the sha256 of its content; files seen before are not rescanned.
+    """
+    file_names = list(file_hashes)
+    try:
+        async with _job_semaphore:
+            await save_instant_data(job_id, customer_id, file_names, [], status="running")
+            cached = await Connection.async_client.run(lookup_cached_results, file_hashes)
+            all_final_results = await asyncio.gather(*(
+                scan_job_file(job_dir, file_name, cached.get(file_name)) for file_name in file_names
+            ))
+            await Connection.async_client.run(store_scan_results, file_hashes, all_final_results)
+            processed_files = [result["file_name"] for result in all_final_results if "file_name" in result]
+            await save_instant_data(job_id, customer_id, processed_files, list(all_final_results), status="completed")
+            logger.info(f"Files processed successfully for customer {customer_id}, job {job_id}: {processed_files}")
+    except Exception as e:
+        logger.error(f"Scan job {job_id} failed: {str(e)}")
+        try:
+            await save_instant_data(job_id, customer_id, file_names, [], status="failed", error=str(e))
+        except Exception as save_error:
+            logger.error(f"Could not record failure of scan job {job_id}: {str(save_error)}")
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        logger.info(f"Temporary files of job {job_id} removed.")
+
+@router.post("/process-files/", status_code=202)
 async def process_multiple_files(
     customer_id: int = Form(...),
     files: List[UploadFile] = File(...)
 ) -> Dict[str, Any]:
     """
-    Processes multiple uploaded files using the PII scanner.
+    Accepts multiple files for PII scanning and returns a job id immediately.
+    The files are scanned in the background; poll GET /instant-pii-scanner/jobs/{job_id} for the results.
     """
     # Validate file extensions
     if not files:
@@ -142,80 +241,150 @@ async def process_multiple_files(
             logger.error(f"Unsupported file type '.{file_extension}'. Allowed types: {allowed_types}")
             raise HTTPException(status_code=400, detail=f"Unsupported file type '.{file_extension}'.")
 
-    temp_dir = "/tmp/pii_scanner"
-    os.makedirs(temp_dir, exist_ok=True)
-    all_final_results = []
-    file_names = []
-
+    job_id = str(uuid4())
+    # One directory per job, so files with the same name in concurrent jobs do not overwrite each other
+    job_dir = os.path.join(PII_SCANNER_TEMP_DIR, job_id)
+    os.makedirs(job_dir, exist_ok=True)
     try:
+        file_hashes = {}
         for file in files:
-            file_path = await save_file(file, temp_dir)
-            file_extension = file.filename.lower().split('.')[-1]
-            file_name = file.filename
-
-            try:
-                all_scan_results = {}
-                logger.info(f"Processing file: {file_name} with extension: {file_extension}")
-                save_result = await process_instant_classifier_files(file_path, file_extension, file_name)
-
-                if save_result:
-                    all_scan_results["file_name"] = file_name
-                    all_scan_results["file_extension"] = file_extension
-                    all_scan_results["file_size"] = get_human_readable_size(file_path)
-                    all_scan_results["results"] = save_result
-                    file_names.append(file_name)
-                    logger.info(f"File {file_name} processed successfully.")
-                else:
-                    all_scan_results[file_name] = {"error": "No entities detected."}
-                    logger.warning(f"No entities detected in file {file_name}")
-
-                all_final_results.append(all_scan_results)
-            
-            except Exception as e:
-                all_scan_results[file_name] = {"error": str(e)}
-                logger.error(f"Error processing file {file_name}: {str(e)}")
-            
-            finally:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    logger.info(f"Temporary file {file_name} removed.")
-
+            stored = await save_file(file, job_dir)
+            file_hashes[stored.filename] = stored.sha256
+        file_names = list(file_hashes)
+        await save_instant_data(job_id, customer_id, file_names, [], status="queued")
+    except HTTPException:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
     except Exception as e:
-        logger.error(f"An error occurred while processing files: {str(e)}")
-        raise HTTPException(status_code=500, detail="An error occurred while processing files: {str(e)}")
+        shutil.rmtree(job_dir, ignore_errors=True)
+        logger.error(f"An error occurred while queuing files: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"An error occurred while queuing files: {str(e)}")
 
-    # Save results to ClickHouse asynchronously
-    await save_instant_data(customer_id, file_names, all_final_results)
-
-    logger.info(f"Files processed successfully for customer {customer_id}: {file_names}")
+    task = asyncio.create_task(run_scan_job(job_id, customer_id, job_dir, file_hashes))
+    # Keep a reference until the task finishes, otherwise it may be garbage collected mid-run
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
 
+    logger.info(f"Queued scan job {job_id} for customer {customer_id}: {file_names}")
     return {
-        "message": "Files processed successfully",
+        "message": "Files accepted for processing",
+        "job_id": job_id,
+        "status": "queued",
         "customer_id": customer_id,
-        "files_processed": file_names,
-        "scan_results": all_final_results
+        "files": file_names,
+        "status_url": f"/instant-pii-scanner/jobs/{job_id}"
     }
 
-async def save_instant_data(customer_id: int, file_names: List[str], all_final_results: List[Dict[str, Any]]) -> None:
+@router.get("/jobs/{job_id}")
+async def get_scan_job(job_id: str) -> Dict[str, Any]:
     """
-    Saves the processed scan results to a ClickHouse database.
+    Returns the status of a /process-files job, and its scan results once it has completed.
     """
-    client = Connection.client
     try:
-        json_output = json.dumps(all_final_results)
-        current_time = datetime.now()
-        await asyncio.to_thread(client.insert, 
-            'instant_classifier',
-            [(
-                str(uuid4()),    
-                customer_id,      
-                file_names,       
-                json_output,      
-                current_time,     
-                current_time      
-            )],
-            column_names=['id', 'customer_id', 'list_of_files', 'json_output', 'created_at', 'updated_at']
+        UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid job id.")
+
+    query = """
+        SELECT id, customer_id, list_of_files, json_output, status, error, created_at, updated_at
+        FROM instant_classifier
+        WHERE id = {job_id:UUID}
+        ORDER BY updated_at DESC, indexOf(['queued', 'running', 'completed', 'failed'], status) DESC
+        LIMIT 1
+    """
+    result = await Connection.async_client.query(query, parameters={"job_id": job_id})
+    if not result.result_rows:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+
+    _, customer_id, list_of_files, json_output, status, error, created_at, updated_at = result.result_rows[0]
+    scan_results = json.loads(json_output) if status == "completed" and json_output else None
+    cache_statuses = [entry.get("cache") for entry in scan_results or []]
+    return {
+        "job_id": job_id,
+        "customer_id": customer_id,
+        "status": status,
+        "files": list_of_files,
+        "error": error or None,
+        "scan_results": scan_results,
+        "cache": {"hits": cache_statuses.count(HIT), "misses": cache_statuses.count(MISS)},
+        "created_at": created_at,
+        "updated_at": updated_at
+    }
+
+async def save_instant_data(
+    job_id: str,
+    customer_id: int,
+    file_names: List[str],
+    all_final_results: List[Dict[str, Any]],
+    status: str = "completed",
+    error: str = ""
+) -> None:
+    """
+    Saves the state of a scan job (and its results once completed) to a ClickHouse database.
+    """
+    json_output = json.dumps(all_final_results)
+    # created_at and updated_at are left to the server's clock, which mark_interrupted_jobs_failed compares with
+    columns = {
+        'id': [job_id],
+        'customer_id': [customer_id],
+        'list_of_files': [file_names],
+        'json_output': [json_output],
+        'status': [status],
+        'error': [error]
+    }
+    await Connection.async_client.run(insert_columns, Connection.client, 'instant_classifier', columns)
+    logger.info(f"Job {job_id} saved to ClickHouse with status '{status}'.")
+
+def interrupted_job_dirs() -> Dict[str, str]:
+    """
+    Spool directories under PII_SCANNER_TEMP_DIR, keyed by job id. Listed before the service takes requests,
+    they all belong to jobs the previous process of this instance did not finish.
+    """
+    if not os.path.isdir(PII_SCANNER_TEMP_DIR):
+        return {}
+    return {name: os.path.join(PII_SCANNER_TEMP_DIR, name) for name in os.listdir(PII_SCANNER_TEMP_DIR)}
+
+def mark_interrupted_jobs_failed(job_dirs: Dict[str, str]) -> int:
+    """
+    Marks as failed the queued or running jobs that will never finish: those whose spool directory is in
+    job_dirs, and those without a state change for PII_SCAN_JOB_STALE_SECONDS. Then removes job_dirs.
+    Returns the number of jobs marked failed.
+    """
+    result = Connection.client.query(
+        """
+        SELECT id, argMax(customer_id, version), argMax(list_of_files, version), argMax(status, version) AS latest_status
+        FROM (
+            SELECT id, customer_id, list_of_files, status, updated_at,
+                (updated_at, indexOf(['queued', 'running', 'completed', 'failed'], status)) AS version
+            FROM instant_classifier
+            WHERE id IN (SELECT id FROM instant_classifier WHERE status IN ('queued', 'running'))
         )
-        logger.info("Data saved successfully to ClickHouse.")
-    finally:
-        client.close()
\ No newline at end of file
+        GROUP BY id
+        HAVING latest_status IN ('queued', 'running')
+            AND (has({job_ids:Array(String)}, toString(id)) OR max(updated_at) < now() - toIntervalSecond({stale_seconds:UInt32}))
+        """,
+        parameters={"job_ids": list(job_dirs), "stale_seconds": PII_SCAN_JOB_STALE_SECONDS}
+    )
+    rows = result.result_rows
+    if rows:
+        insert_columns(Connection.client, 'instant_classifier', {
+            'id': [row[0] for row in rows],
+            'customer_id': [row[1] for row in rows],
+            'list_of_files': [row[2] for row in rows],
+            'json_output': ["[]"] * len(rows),
+            'status': ["failed"] * len(rows),
+            'error': ["The scan was interrupted by a restart of the service; upload the files again."] * len(rows)
+        })
+    for job_dir in job_dirs.values():
+        shutil.rmtree(job_dir, ignore_errors=True)
+    return len(rows)
+
+async def fail_interrupted_jobs(job_dirs: Dict[str, str]) -> None:
+    """
+    Runs mark_interrupted_jobs_failed off the event loop, so clients polling those jobs see a final state.
+    """
+    try:
+        failed = await Connection.async_client.run(mark_interrupted_jobs_failed, job_dirs)
+        logger.info(f"Marked {failed} interrupted scan jobs as failed; removed {len(job_dirs)} spool directories")
+    except Exception as e:
+        logger.error(f"Could not mark interrupted scan jobs as failed: {str(e)}")
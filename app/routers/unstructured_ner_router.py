@@ -1,11 +1,20 @@
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 from pydantic import BaseModel
 import os
+import asyncio
+import logging
+from uuid import UUID, uuid4
+from client_connect import Connection
+from app.utils import scan_job_store
 from app.utils.unstructured_clickhouse_service import UnstructuredFileProcessor
 
 router = APIRouter()
 processor = UnstructuredFileProcessor()
 
+logger = logging.getLogger(__name__)
+
+_resumed_jobs = set()
+
 class DataReceived(BaseModel):
     source_type: str
     source_bucket: str
@@ -16,6 +25,69 @@ class DataReceived(BaseModel):
 async def process_unstructured_files(data_received: DataReceived, background_tasks: BackgroundTasks):
     bucket_name = os.getenv("MINIO_BUCKET_NAME")
     folder_name = data_received.source_bucket
-    background_tasks.add_task(processor.process_files_from_minio, bucket_name, folder_name, data_received)
+    job_id = str(uuid4())
+    # Recorded before the task starts, so a restart before it runs still resumes it
+    await Connection.async_client.run(scan_job_store.save_job_state, Connection.client, job_id, bucket_name, folder_name,
+                                      data_received, scan_job_store.QUEUED)
+    background_tasks.add_task(processor.process_files_from_minio, bucket_name, folder_name, data_received, job_id)
     
-    return {"results": f"Processing started for the folder: {folder_name}"}
+    return {"results": f"Processing started for the folder: {folder_name}", "job_id": job_id}
+
+@router.get("/jobs/{job_id}")
+async def get_unstructured_job(job_id: str):
+    """
+    Returns the state of a folder job and how many of its objects were checkpointed per status.
+    """
+    try:
+        UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid job id.")
+    job = await Connection.async_client.run(scan_job_store.get_job, Connection.client, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    job["objects"] = await Connection.async_client.run(scan_job_store.manifest_summary, Connection.client, job_id)
+    return job
+
+async def resume_interrupted_jobs():
+    """
+    Restarts the folder jobs that were queued or running when their instance stopped.
+    Runs for the life of the service: every SCAN_JOB_HEARTBEAT_SECONDS it looks for jobs whose heartbeat is
+    older than SCAN_JOB_LEASE_SECONDS, claims them, and after SCAN_JOB_CLAIM_SETTLE_SECONDS resumes the ones
+    whose claim won (see scan_job_store.claim_won). Objects they had already completed are skipped through the
+    manifest.
+    """
+    while True:
+        try:
+            jobs = await Connection.async_client.run(scan_job_store.interrupted_jobs, Connection.client)
+        except Exception as e:
+            logger.error(f"Could not look up interrupted folder jobs: {str(e)}")
+            jobs = []
+        claimed = []
+        for job in jobs:
+            try:
+                await Connection.async_client.run(scan_job_store.record_claim, Connection.client, job)
+                claimed.append(job)
+            except Exception as e:
+                logger.error(f"Could not claim folder job {job['job_id']}: {str(e)}")
+        if claimed:
+            # Let the claims of other instances on the same jobs become visible before picking the winners
+            await asyncio.sleep(scan_job_store.SCAN_JOB_CLAIM_SETTLE_SECONDS)
+        for job in claimed:
+            try:
+                won = await Connection.async_client.run(scan_job_store.claim_won, Connection.client, job)
+            except Exception as e:
+                logger.error(f"Could not read the claims on folder job {job['job_id']}: {str(e)}")
+                continue
+            if not won:
+                logger.info(f"Folder job {job['job_id']} was claimed by another instance")
+                continue
+            data_received = DataReceived(source_type=job["source_type"], source_bucket=job["source_bucket"],
+                                         region=job["region"], message=job["message"])
+            logger.info(f"Resuming folder job {job['job_id']} on {job['bucket_name']}/{job['folder_name']}")
+            task = asyncio.create_task(
+                processor.process_files_from_minio(job["bucket_name"], job["folder_name"], data_received, str(job["job_id"]))
+            )
+            # Keep a reference until the task finishes, otherwise it may be garbage collected mid-run
+            _resumed_jobs.add(task)
+            task.add_done_callback(_resumed_jobs.discard)
+        await asyncio.sleep(scan_job_store.SCAN_JOB_HEARTBEAT_SECONDS)
@@ -0,0 +1,63 @@
+import os
+import time
+import logging
+from typing import Any, Dict, Mapping, Optional, Sequence
+import pandas as pd
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Maximum number of rows sent to ClickHouse in a single INSERT block
+CLICKHOUSE_INSERT_BLOCK_SIZE = int(os.getenv("CLICKHOUSE_INSERT_BLOCK_SIZE", "100000"))
+
+
+def _block_ranges(row_count: int, block_size: Optional[int]):
+    """Yields (start, end) row ranges of at most block_size rows."""
+    block_size = block_size or CLICKHOUSE_INSERT_BLOCK_SIZE
+    for start in range(0, row_count, block_size):
+        yield start, min(start + block_size, row_count)
+
+
+def insert_columns(
+    client,
+    table: str,
+    columns: Mapping[str, Sequence[Any]],
+    block_size: Optional[int] = None,
+    settings: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Inserts column-oriented data (lists, NumPy arrays or pandas Series keyed by column name)
+    using clickhouse-connect's native columnar insert. Returns the number of rows written.
+    """
+    column_names = list(columns.keys())
+    if not column_names:
+        return 0
+    data = [columns[name] for name in column_names]
+    row_count = len(data[0])
+    if any(len(column) != row_count for column in data):
+        raise ValueError(f"All columns inserted into '{table}' must have the same length")
+
+    start_time = time.perf_counter()
+    for start, end in _block_ranges(row_count, block_size):
+        block = [column[start:end] for column in data]
+        client.insert(table, block, column_names=column_names, column_oriented=True, settings=settings)
+    logger.debug(f"Inserted {row_count} rows into '{table}' in {time.perf_counter() - start_time:.3f}s")
+    return row_count
+
+
+def insert_dataframe(
+    client,
+    table: str,
+    df: pd.DataFrame,
+    block_size: Optional[int] = None,
+    settings: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Inserts a pandas DataFrame with clickhouse-connect's insert_df, one block at a time.
+    Returns the number of rows written.
+    """
+    start_time = time.perf_counter()
+    for start, end in _block_ranges(len(df), block_size):
+        client.insert_df(table, df.iloc[start:end], settings=settings)
+    logger.debug(f"Inserted {len(df)} rows into '{table}' in {time.perf_counter() - start_time:.3f}s")
+    return len(df)
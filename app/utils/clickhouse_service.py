@@ -1,17 +1,109 @@
 from client_connect import Connection
+from app.utils.bulk_writer import insert_columns, insert_dataframe
+from app.utils.omd_json_extract import (
+    PROFILE_POINT_METRICS, StageTimer, extract_profile_points, extract_service_locations, extract_table_profiles,
+    parse_json_column
+)
+import numpy as np
 import pandas as pd
-import datetime
 import logging
-import json
+import os
 import re
+import resource
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Optional, Set
 
 # Setup logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def save_omd_table_data(entity_type: str, data: pd.DataFrame, batch_size: int = 1000):
+# How OMD uploads replace existing rows:
+#   "mutation"  - ALTER TABLE ... DELETE the incoming ids, then insert (original behaviour)
+#   "replacing" - append only; the ReplacingMergeTree engines from migration 011 keep the latest
+#                 version and the views read with FINAL
+OMD_UPSERT_MODES = ("mutation", "replacing")
+OMD_UPSERT_MODE = os.getenv("OMD_UPSERT_MODE", "mutation").lower()
+if OMD_UPSERT_MODE not in OMD_UPSERT_MODES:
+    raise ValueError(f"Invalid OMD_UPSERT_MODE '{OMD_UPSERT_MODE}'. Expected one of: {', '.join(OMD_UPSERT_MODES)}")
+
+# ClickHouse integer types that map onto a NumPy dtype of the same name
+INTEGER_DTYPES = ("uint8", "uint16", "uint32", "uint64", "int8", "int16", "int32", "int64")
+
+def delete_in_batches(client, table_name: str, identifier_column: str, ids: list, batch_size: int):
+    """
+    Deletes rows matching the given identifiers with one ALTER TABLE ... DELETE mutation per batch.
+    Only used in the "mutation" upsert mode.
+    """
+    for i in range(0, len(ids), batch_size):
+        batch_ids = ids[i:i + batch_size]
+        id_conditions = ",".join([f"'{row_id}'" for row_id in batch_ids])
+        delete_query = f"ALTER TABLE {table_name} DELETE WHERE {identifier_column} IN ({id_conditions})"
+        logger.debug(f"Executing query: {delete_query}")
+        client.command(delete_query)
+        logger.info(f"Deleted batch {i // batch_size + 1} from table '{table_name}'")
+
+def table_column_types(client, table_name: str) -> Dict[str, str]:
+    """Returns the ClickHouse type of every column of table_name, without Nullable / LowCardinality wrappers."""
+    result = client.query(
+        "SELECT name, type FROM system.columns WHERE database = currentDatabase() AND table = {table:String}",
+        parameters={"table": table_name}
+    )
+    return {name: re.sub(r"^(?:Nullable|LowCardinality)\((.*)\)$", r"\1", column_type) for name, column_type in result.result_rows}
+
+def _parse_integer(text: str) -> Optional[int]:
+    """Exact value of an integer CSV cell ("42", "-7", "3.0", "1e3"), or None when it is not a whole number."""
+    try:
+        number = Decimal(text.strip())
+    except InvalidOperation:
+        return None
+    if not number.is_finite() or number != number.to_integral_value():
+        return None
+    return int(number)
+
+def _invalid_values(raw: pd.Series, invalid: pd.Series, column: str, column_type: str, reason: str) -> ValueError:
+    examples = raw[invalid].head(3).tolist()
+    return ValueError(f"Column '{column}' ({column_type}) has {int(invalid.sum())} values that are {reason}, e.g. {examples}")
+
+def cast_to_table_types(data: pd.DataFrame, column_types: Dict[str, str]) -> pd.DataFrame:
+    """
+    Casts the text columns read from the CSV to the types of the target table.
+    Missing numbers become 0 and missing strings 'NA'; columns the table does not have are kept as strings.
+    Raises ValueError for values that are not numbers, and for integers that are fractional or out of range of
+    the column's type, instead of truncating or wrapping them.
+    """
+    data = data.copy()
+    for column in data.columns:
+        column_type = column_types.get(column, "String")
+        raw = data[column]
+        if column_type.startswith("Float"):
+            values = pd.to_numeric(raw, errors="coerce")
+            unparsed = raw.notna() & values.isna()
+            if unparsed.any():
+                raise _invalid_values(raw, unparsed, column, column_type, "not numbers")
+            data[column] = values.fillna(0).astype("float64")
+        elif column_type.startswith(("UInt", "Int")):
+            # Parsed exactly, in plain ints: through float64, integers beyond 2^53 lose precision and 2^64 - 1 wraps to 0
+            values = [0 if missing else _parse_integer(text) for text, missing in zip(raw.tolist(), raw.isna().tolist())]
+            unparsed = pd.Series([value is None for value in values], index=raw.index)
+            if unparsed.any():
+                raise _invalid_values(raw, unparsed, column, column_type, "not whole numbers")
+            # Unknown widths (Int128 / Int256) are held to the 64-bit range of the cast
+            type_name = column_type.lower()
+            limits = np.iinfo(type_name if type_name in INTEGER_DTYPES else "uint64" if type_name.startswith("uint") else "int64")
+            out_of_range = pd.Series([not limits.min <= value <= limits.max for value in values], index=raw.index)
+            if out_of_range.any():
+                raise _invalid_values(raw, out_of_range, column, column_type, f"outside {limits.min}..{limits.max}")
+            data[column] = np.array(values, dtype=limits.dtype)
+        else:
+            data[column] = raw.fillna("NA").astype(str)
+    return data
+
+def save_omd_table_data(entity_type: str, data: pd.DataFrame, batch_size: int = 1000, deleted_ids: Optional[Set[str]] = None):
     """
     Optimized create or update data in ClickHouse based on 'id' or 'entityFQNHash' in batches, with type checking and NaN handling.
+    deleted_ids carries the identifiers already deleted by earlier chunks of the same upload (mutation mode): an id is
+    deleted only once per upload, so a later chunk does not delete the rows an earlier chunk inserted for that id.
     """
     # Check if the data is empty
     if data.empty:
@@ -20,6 +112,7 @@ def save_omd_table_data(entity_type: str, data: pd.DataFrame, batch_size: int =
     
     connection = Connection()  # Example connection object (replace with your actual connection logic)
     client = connection.client
+    timer = StageTimer()
     
     table_name = f"{entity_type}"
     
@@ -48,39 +141,33 @@ def save_omd_table_data(entity_type: str, data: pd.DataFrame, batch_size: int =
     data[identifier_column] = data[identifier_column].astype(str)
     logger.info(f"Converted '{identifier_column}' to string for all rows.")
 
-    # Insert the data in batches    
-    data = data.fillna({
-        col: 'NA' if data[col].dtype == 'object' else 0  # Replace NaN with 'NA' for strings, 0 for numeric types
-        for col in data.columns
-    })
+    # Cast to the table's column types: 0 for missing numbers, 'NA' for missing strings
+    data = cast_to_table_types(data, table_column_types(client, table_name))
     
     try:
         # Collect all identifiers (either 'id' or 'entityFQNHash') from the incoming data
         ids = data[identifier_column].tolist()  # Convert to list here, after handling NaNs
         logger.debug(f"IDs: {ids}, Type: {type(ids)}")
+        # Identifiers this chunk deletes: each one once, and none an earlier chunk of this upload already deleted
+        if deleted_ids is None:
+            deleted_ids = set()
+        ids = [row_id for row_id in dict.fromkeys(ids) if row_id not in deleted_ids]
         
         # Process deletion in batches to avoid exceeding query size limits
-        for i in range(0, len(ids), batch_size):
-            batch_ids = ids[i:i + batch_size]
-            id_conditions = ",".join([f"'{row_id}'" for row_id in batch_ids])
-            delete_query = f"ALTER TABLE {table_name} DELETE WHERE {identifier_column} IN ({id_conditions})"
-            logger.debug(f"Executing query: {delete_query}")
-            client.command(delete_query)
-            logger.info(f"Deleted batch {i // batch_size + 1} from table '{table_name}'")
-
-        logger.info("step 1 ---------------------- deleted ")
+        if OMD_UPSERT_MODE == "mutation":
+            delete_in_batches(client, table_name, identifier_column, ids, batch_size)
+            logger.info("step 1 ---------------------- deleted ")
+        else:
+            logger.info(f"Upsert mode '{OMD_UPSERT_MODE}': skipping deletes, rows are versioned by ReplacingMergeTree")
         logger.info("*"*20)
         logger.info(f"Data for '{identifier_column}': {data[identifier_column]}, Type: {type(data[identifier_column])},Type data: {type(data)},  Length: {len(data[identifier_column])}")
 
         # Now iterate over the data in batches
         length = len(data[identifier_column])
         print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>")
-        for i in range(0, length, batch_size):
-            batch_data = data.iloc[i:i + batch_size]
-            rows = batch_data.to_records(index=False).tolist()
-            column_names = list(batch_data.columns)
-            client.insert(table_name, rows, column_names=column_names)
-            logger.info(f"Inserted batch {i // batch_size + 1} into table '{table_name}'")
+        with timer.stage("insert"):
+            insert_dataframe(client, table_name, data, block_size=batch_size)
+        logger.info(f"Inserted {length} rows into table '{table_name}'")
         logger.info("*"*20)
         
         
@@ -89,133 +176,109 @@ def save_omd_table_data(entity_type: str, data: pd.DataFrame, batch_size: int =
         # Delete from dbservice_entity_meta_info
         meta_info_table = "dbservice_entity_meta_info"
         identifier_column_meta = "dbservice_entity_id"
-        for i in range(0, len(ids), batch_size):
-            batch_ids = ids[i:i + batch_size]
-            id_conditions = ",".join([f"'{row_id}'" for row_id in batch_ids])
-            delete_meta_query = f"ALTER TABLE {meta_info_table} DELETE WHERE {identifier_column_meta} IN ({id_conditions})"
-            logger.debug(f"Executing delete query for meta info: {delete_meta_query}")
-            client.command(delete_meta_query)
-            logger.info(f"Deleted batch {i // batch_size + 1} from table '{meta_info_table}'")
+        if OMD_UPSERT_MODE == "mutation":
+            delete_in_batches(client, meta_info_table, identifier_column_meta, ids, batch_size)
 
         # Insert data into dbservice_entity_meta_info
-        for i in range(0, len(data[identifier_column]), batch_size):
-            batch_data = data.iloc[i:i + batch_size]
-            rows = []  # Initialize an empty list to collect rows
-            for index in batch_data.index:
-                row = batch_data.loc[index]
-                row = row.to_dict()
-                logger.debug(f"Row_json:{row['json']}")
-        
-                json_str = row['json'].replace("'", '"').replace("False", "false").replace("True", "true")
-                json_str = json_str.rstrip(',')  # Remove any trailing commas
-
-                logger.debug(f"Modified JSON string: {json_str}")
-                
-                try:
-                    data_host = json.loads(json_str)  # JSON is also the column name in data
-                except json.JSONDecodeError as e:
-                    logger.error(f"Error decoding JSON: {e}")
-                    continue
-
-                host_port = data_host.get('connection', {}).get('config', {}).get('hostPort', '')
-                # Split the hostPort value
-                host_parts = host_port.split(".") if host_port else []
-                # Ensure host_parts has enough elements before accessing indices
-                region = host_parts[2] if len(host_parts) > 2 else "N/A"
-                source = host_parts[4] if len(host_parts) > 4 else "N/A"
-
-                # Extract other fields directly from the DataFrame
-                if entity_type == "profiler_data_time_series":
-                    dbservice_entity_id = row['entityFQNHash']
-                    dbservice_entity_name = row.get('name', "N/A")
-                else:
-                    dbservice_entity_id = row['id']
-                    dbservice_entity_name = row['name']
-
-                logger.debug(f"Host port: {host_port}, Region: {region}, Source: {source}")
-
-                # Append the extracted data as a tuple to the rows list
-                rows.append((dbservice_entity_id, dbservice_entity_name, source, region))
-
-            # Prepare column names for the insert statement
-            column_names = ['dbservice_entity_id', 'dbservice_entity_name', 'source', 'region']
-            
-            # Insert the collected rows into the ClickHouse table
-            client.insert(meta_info_table, rows, column_names=column_names)
-            logger.info(f"Inserted batch {i // batch_size + 1} into table '{meta_info_table}'")
+        meta_info = extract_service_locations(data, entity_type, timer)
+        with timer.stage("insert"):
+            insert_columns(client, meta_info_table, {column: meta_info[column].to_numpy() for column in meta_info.columns}, block_size=batch_size)
+        logger.info(f"Inserted {len(meta_info)} rows into table '{meta_info_table}'")
 
         if entity_type == "profiler_data_time_series":
-            profiler_meta_data(ids, batch_size, identifier_column, data, client)
+            profiler_meta_data(ids, batch_size, identifier_column, data, client, timer)
             logger.info("Successfully deleted/inserted data in profiler_metadata table")
+        deleted_ids.update(ids)
 
         logger.info(f"Successfully inserted or updated {len(data[identifier_column])} rows in table '{table_name}' and '{meta_info_table}'")
-        return {"table": table_name, "rows_inserted_or_updated": len(data[identifier_column])}
+        logger.info(f"Stage timings for '{table_name}': {timer.as_dict()}")
+        return {"table": table_name, "rows_inserted_or_updated": len(data[identifier_column]), "stage_seconds": timer.as_dict()}
 
     except Exception as e:
         logger.error(f"Error processing data: {e}")
         return {"error": str(e)}
 
-def profiler_meta_data(ids, batch_size, identifier_column, data, client):
+def save_omd_table_data_in_chunks(entity_type: str, chunks: Iterable[pd.DataFrame], batch_size: int = 1000):
+    """
+    Streams DataFrame chunks into ClickHouse, inserting each chunk before the next one is read.
+    Returns the combined result with throughput and peak memory for the upload.
+    """
+    start_time = time.perf_counter()
+    total_rows = 0
+    chunk_count = 0
+    result = {"table": entity_type}
+    timer = StageTimer()
+    # Identifiers deleted so far; rows of one id can span several chunks
+    deleted_ids: Set[str] = set()
+
+    for chunk in chunks:
+        chunk_count += 1
+        chunk_result = save_omd_table_data(entity_type, chunk, batch_size, deleted_ids)
+        if "error" in chunk_result:
+            logger.error(f"Stopping upload of '{entity_type}' at chunk {chunk_count}: {chunk_result['error']}")
+            result["error"] = chunk_result["error"]
+            break
+        total_rows += chunk_result["rows_inserted_or_updated"]
+        timer.merge(chunk_result.get("stage_seconds", {}))
+        logger.info(f"Chunk {chunk_count}: {chunk_result['rows_inserted_or_updated']} rows into '{entity_type}'")
+
+    if chunk_count == 0:
+        logger.error("The uploaded CSV is empty. No data to insert or update.")
+        raise ValueError("The uploaded CSV is empty. No data to insert or update.")
+
+    elapsed = time.perf_counter() - start_time
+    result["rows_inserted_or_updated"] = total_rows
+    result["chunks"] = chunk_count
+    result["metrics"] = {
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_sec": round(total_rows / elapsed, 1) if elapsed > 0 else None,
+        # ru_maxrss is the high-water mark of the worker process, reported in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stage_seconds": timer.as_dict(),
+    }
+    logger.info(f"Uploaded {total_rows} rows into '{entity_type}' in {chunk_count} chunks: {result['metrics']}")
+    return result
+
+def profiler_meta_data(ids, batch_size, identifier_column, data, client, timer: StageTimer = None):
+    timer = timer or StageTimer()
     table_name = "profiler_metadata"
-    for i in range(0, len(ids), batch_size):
+    if OMD_UPSERT_MODE == "mutation":
         # Deleting existing records in batches
-        batch_ids = ids[i:i + batch_size]
-        id_conditions = ",".join([f"'{row_id}'" for row_id in batch_ids])
-        delete_query = f"ALTER TABLE {table_name} DELETE WHERE {identifier_column} IN ({id_conditions})"
-        logger.debug(f"Executing query: {delete_query}")
         try:
-            # Uncomment this to execute the query
-            client.command(delete_query)
-            logger.info(f"Deleted batch {i // batch_size + 1} from table '{table_name}'")
+            delete_in_batches(client, table_name, identifier_column, ids, batch_size)
         except Exception as delete_error:
             logger.error(f"Error during delete operation: {delete_error}")
 
-    # Insert data in batches
-    for i in range(0, len(data), batch_size):
-        batch_data = data.iloc[i:i + batch_size]
-        column_names = ["entityFQNHash", "rowCount", "timestamp", "sizeInByte", "columnCount", "profileSample", "createDateTime", "profileSampleType"]
-
-        # Filter rows where jsonSchema is "tableProfile"
-        filtered_data = batch_data[batch_data["jsonSchema"] == "tableProfile"]
-
-        if not filtered_data.empty:
-            rows = []
-            for _, row in filtered_data.iterrows():
-                try:
-                
-                    json_str = row['json'].replace("'", '"').replace("False", "false").replace("True", "true")
-                    json_str = json_str.rstrip(',')  # Remove any trailing commas
-                    try:
-                        json_data = json.loads(json_str)  # JSON is also the column name in data
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Error decoding JSON: {e}")
-                        continue
-                
-                    # Convert createDateTime to Unix timestamp (seconds since epoch)
-                    createDateTime_str = json_data.get("createDateTime")
-                    if createDateTime_str:
-                        createDateTime = datetime.datetime.strptime(createDateTime_str, "%Y-%m-%dT%H:%M:%S.%fZ").timestamp()
-                    else:
-                        createDateTime = None  # Handle case where 'createDateTime' is missing
-
-                    rows.append((
-                        row["entityFQNHash"],
-                        json_data.get("rowCount"),
-                        json_data.get("timestamp"),
-                        json_data.get("sizeInByte"),
-                        json_data.get("columnCount"),
-                        json_data.get("profileSample"),
-                        createDateTime,  # Insert the Unix timestamp here
-                        json_data.get("profileSampleType")
-                    ))
-                except Exception as parse_error:
-                    logger.error(f"Error parsing JSON for row: {row['entityFQNHash']}, error: {parse_error}")
-
-            try:
-                # Uncomment this to execute the insertion
-                client.insert(table_name, rows, column_names=column_names)
-                logger.info(f"Inserted batch {i // batch_size + 1} into table '{table_name}'")
-            except Exception as insert_error:
-                logger.error(f"Error during insert operation: {insert_error}")
-        else:
-            logger.info(f"No rows with jsonSchema='tableProfile' in batch {i // batch_size + 1}")
+    # Parse the profile documents of the whole batch once, for profiler_metadata and the metric points
+    profile_rows = data[data["jsonSchema"].isin(list(PROFILE_POINT_METRICS))]
+    parsed = parse_json_column(profile_rows["json"], timer)
+
+    profiles = extract_table_profiles(data, timer, parsed)
+    if profiles.empty:
+        logger.info("No rows with jsonSchema='tableProfile' in this batch")
+    else:
+        try:
+            with timer.stage("insert"):
+                insert_columns(client, table_name, {column: profiles[column].to_numpy() for column in profiles.columns}, block_size=batch_size)
+            logger.info(f"Inserted {len(profiles)} rows into table '{table_name}'")
+        except Exception as insert_error:
+            logger.error(f"Error during insert operation: {insert_error}")
+
+    profiler_metric_points(data, client, timer, parsed)
+
+def profiler_metric_points(data, client, timer: StageTimer, parsed=None):
+    """
+    Writes the typed table and column profile metrics of a batch to profiler_metric_points; the hourly and daily
+    rollups are filled by their materialized views. Re-uploaded profiles are deduplicated by the
+    ReplacingMergeTree, so no delete is issued in either upsert mode.
+    """
+    points = extract_profile_points(data, timer, parsed)
+    if points.empty:
+        logger.info("No profile metrics in this batch")
+        return
+    try:
+        with timer.stage("insert"):
+            insert_columns(client, "profiler_metric_points", {column: points[column].to_numpy() for column in points.columns})
+        logger.info(f"Inserted {len(points)} rows into table 'profiler_metric_points'")
+    except Exception as insert_error:
+        logger.error(f"Error inserting profiler metric points: {insert_error}")
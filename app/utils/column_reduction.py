@@ -0,0 +1,63 @@
+import os
+import random
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Maximum number of distinct values of one column sent to NER; larger columns are reservoir-sampled
+NER_MAX_DISTINCT_VALUES = int(os.getenv("NER_MAX_DISTINCT_VALUES", "1000"))
+
+
+def reservoir_sample(values: Iterable, k: int, rng: Optional[random.Random] = None) -> List:
+    """
+    Uniform sample of k items from an iterable of unknown length in one pass (Algorithm R).
+    """
+    rng = rng or random.Random()
+    reservoir = []
+    for index, value in enumerate(values):
+        if index < k:
+            reservoir.append(value)
+        else:
+            slot = rng.randint(0, index)
+            if slot < k:
+                reservoir[slot] = value
+    return reservoir
+
+
+def reduce_column(values, max_distinct_values: int = NER_MAX_DISTINCT_VALUES, rng: Optional[random.Random] = None) -> pd.Series:
+    """
+    Pre-scan reduction for a column: drops nulls and blank cells and counts the distinct values.
+    Returns a Series of occurrence counts indexed by the (stringified, stripped) value.
+    High-cardinality columns are capped at max_distinct_values distinct values by a reservoir sample.
+    """
+    column = pd.Series(values, dtype=object).dropna()
+    column = column.astype(str).str.strip()
+    column = column[column != ""]
+    value_counts = column.value_counts(sort=False)
+
+    if len(value_counts) > max_distinct_values:
+        sampled = reservoir_sample(value_counts.index, max_distinct_values, rng)
+        logger.info(f"Sampled {max_distinct_values} of {len(value_counts)} distinct values for NER")
+        value_counts = value_counts.loc[sampled]
+    return value_counts
+
+
+def weighted_entity_counts(results: List[Dict], value_counts: pd.Series) -> Dict[str, int]:
+    """
+    Counts the top entity type of each scanned distinct value, weighted by how often the value occurs in the column.
+    The scanned value is read from the result's "text" (or the detected entity's "text", which the scanner
+    fills with the whole cell); results whose value is not in value_counts count once.
+    """
+    entity_counts = defaultdict(int)
+    for result in results:
+        if result.get("entity_detected"):
+            entity = result["entity_detected"][0]
+            entity_type = entity.get("type")
+            if entity_type:
+                value = result.get("text", entity.get("text"))
+                entity_counts[entity_type] += int(value_counts.get(value, 1))
+    return dict(entity_counts)
@@ -1,15 +1,31 @@
-# Description: This file contains the function to process the uploaded CSV file and convert it to a pandas DataFrame.
+# Description: This file contains the functions to read the uploaded CSV file into pandas DataFrames.
+import os
+from typing import Iterator
 import pandas as pd
 from fastapi import UploadFile
-import csv
+
+# Number of CSV rows held in memory at a time while streaming an upload
+OMD_CSV_CHUNK_SIZE = int(os.getenv("OMD_CSV_CHUNK_SIZE", "10000"))
 
 def process_csv(file: UploadFile, sep: str = ";") -> pd.DataFrame:
     """
     Process the uploaded CSV file and convert it to a pandas DataFrame.
+    Loads the whole file; use iter_csv_chunks for large uploads.
     """
-    # Read a few lines to detect the delimiter
+    return pd.read_csv(file.file, sep=sep, index_col=False)
 
-    df = pd.read_csv(file.file, sep=sep,index_col=False)
-    print(df)
-    
-    return df
+def iter_csv_chunks(file: UploadFile, sep: str = ";", chunk_size: int = OMD_CSV_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream the uploaded CSV file as DataFrames of at most chunk_size rows.
+    Only one chunk is parsed at a time, so memory use does not grow with the file size.
+    Every column is read as text: pandas infers types per chunk, so a column that is empty in one chunk would
+    otherwise come back as float64. The caller casts the chunks to the target table's types.
+    An empty file yields no chunks.
+    """
+    try:
+        reader = pd.read_csv(file.file, sep=sep, index_col=False, chunksize=chunk_size, dtype=str)
+    except pd.errors.EmptyDataError:
+        return
+    with reader:
+        for chunk in reader:
+            yield chunk
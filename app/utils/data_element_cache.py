@@ -0,0 +1,127 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+from app.utils.bulk_writer import insert_columns
+from app.utils.metrics import metrics
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Seconds before the in-memory data_element index is reloaded from ClickHouse
+DATA_ELEMENT_CACHE_TTL_SECONDS = int(os.getenv("DATA_ELEMENT_CACHE_TTL_SECONDS", "300"))
+# Number of buffered UNKNOWN categories that triggers a write to data_element
+DATA_ELEMENT_UNKNOWN_FLUSH_SIZE = int(os.getenv("DATA_ELEMENT_UNKNOWN_FLUSH_SIZE", "50"))
+
+UNKNOWN_CATEGORY = "UNKNOWN"
+
+
+class DataElementCache:
+    """
+    In-memory index of the data_element table (parameter_value -> parameter_name).
+    Loaded at startup and reloaded after DATA_ELEMENT_CACHE_TTL_SECONDS; entities that are not in the
+    table are answered as UNKNOWN immediately and written back in batches instead of one INSERT each.
+    """
+    def __init__(self, ttl_seconds: int = DATA_ELEMENT_CACHE_TTL_SECONDS, flush_size: int = DATA_ELEMENT_UNKNOWN_FLUSH_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        # Held while reloading, so concurrent lookups that find the index stale reload it once
+        self._reload_lock = threading.Lock()
+        self._categories: Dict[str, str] = {}
+        self._pending_unknown: List[str] = []
+        self._loaded_at: Optional[float] = None
+        self._hits = 0
+        self._misses = 0
+
+    def load(self, client):
+        """
+        (Re)loads the whole table. Real categories win over UNKNOWN when a value has both.
+        """
+        result = client.query("SELECT parameter_name, parameter_value FROM data_element")
+        categories = {}
+        for parameter_name, parameter_value in result.result_rows:
+            if parameter_value not in categories or categories[parameter_value] == UNKNOWN_CATEGORY:
+                categories[parameter_value] = parameter_name
+        with self._lock:
+            # Buffered UNKNOWN entries are not in ClickHouse yet; keep answering them from memory
+            for parameter_value in self._pending_unknown:
+                categories.setdefault(parameter_value, UNKNOWN_CATEGORY)
+            self._categories = categories
+            self._loaded_at = time.monotonic()
+        metrics.set_gauge("data_element_cache.size", len(categories))
+        logger.info(f"Loaded {len(categories)} data_element entries")
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def lookup(self, client, detected_entity: str) -> str:
+        """
+        Returns the data element category of detected_entity, registering it as UNKNOWN if it has none.
+        """
+        if self._is_stale():
+            with self._reload_lock:
+                # Another lookup may have reloaded the index while this one waited
+                if self._is_stale():
+                    try:
+                        self.flush(client)
+                    except Exception as e:
+                        # flush keeps the pending rows for the next attempt; load still answers them as UNKNOWN
+                        logger.error(f"Could not write buffered UNKNOWN data_element rows: {str(e)}")
+                    try:
+                        self.load(client)
+                    except Exception as e:
+                        # Serve this lookup from the current index; the next one retries the reload
+                        logger.error(f"Could not reload data_element, using the current index: {str(e)}")
+
+        with self._lock:
+            category = self._categories.get(detected_entity)
+            hit = category is not None
+            if not hit:
+                self._misses += 1
+                category = UNKNOWN_CATEGORY
+                self._categories[detected_entity] = category
+                self._pending_unknown.append(detected_entity)
+                flush_needed = len(self._pending_unknown) >= self.flush_size
+                logger.info(f"No category found for '{detected_entity}'. Added to 'UNKNOWN' category.")
+            else:
+                self._hits += 1
+                flush_needed = False
+            hit_rate = self._hits / (self._hits + self._misses)
+
+        metrics.increment("data_element_cache.hits" if hit else "data_element_cache.misses")
+        metrics.set_gauge("data_element_cache.hit_rate", round(hit_rate, 4))
+        if flush_needed:
+            try:
+                self.flush(client)
+            except Exception as e:
+                # The rows stay buffered for the next flush; the category is already known
+                logger.error(f"Could not write buffered UNKNOWN data_element rows: {str(e)}")
+        return category
+
+    def flush(self, client) -> int:
+        """
+        Writes the buffered UNKNOWN categories to data_element in one insert. Returns the number of rows written.
+        """
+        with self._lock:
+            pending, self._pending_unknown = self._pending_unknown, []
+        if not pending:
+            return 0
+        try:
+            insert_columns(client, "data_element", {
+                "parameter_name": [UNKNOWN_CATEGORY] * len(pending),
+                "parameter_value": pending,
+                "parameter_sensitivity": [UNKNOWN_CATEGORY] * len(pending)
+            })
+        except Exception:
+            # Put the values back so the next flush retries them
+            with self._lock:
+                self._pending_unknown = pending + self._pending_unknown
+            raise
+        metrics.increment("data_element_cache.unknown_rows_written", len(pending))
+        logger.info(f"Added {len(pending)} entities to 'UNKNOWN' category.")
+        return len(pending)
+
+
+data_element_cache = DataElementCache()
@@ -0,0 +1,46 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics: counters, gauges and timing summaries (count/sum/max).
+    Thread-safe, so it can be updated from executor threads; exposed as JSON on GET /metrics.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            timing = self._timings.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            timing["count"] += 1
+            timing["sum"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            timings = {
+                name: {
+                    "count": timing["count"],
+                    "avg_seconds": round(timing["sum"] / timing["count"], 6) if timing["count"] else 0.0,
+                    "max_seconds": round(timing["max"], 6),
+                    "total_seconds": round(timing["sum"], 6),
+                }
+                for name, timing in self._timings.items()
+            }
+            return {"counters": dict(self._counters), "gauges": dict(self._gauges), "timings": timings}
+
+
+metrics = MetricsRegistry()
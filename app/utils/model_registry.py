@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import logging
+import resource
+import threading
+from typing import Any, Callable, Dict
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+SPACY_SM_MODEL = "en_core_web_sm"
+SPACY_MD_MODEL = "en_core_web_md"
+GLINER_MODEL_NAME = "urchade/gliner_multi_pii-v1"
+GLINER_MODEL_DIR = "local_pii_model"
+HAAR_CASCADE_FILE = "app/utils/pii_scan/face_cascade.xml"
+DEFINITIONS_FILE = "app/utils/pii_scan/definitions.json"
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ModelRegistry:
+    """
+    Loads each heavy model or rule set at most once per process and hands out the shared instance.
+    Loading is lazy and thread-safe: concurrent first requests for the same artifact wait for a single load,
+    while different artifacts can load in parallel.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        with self._lock:
+            self._loaders[name] = loader
+            self._load_locks[name] = threading.Lock()
+            self._stats[name] = {"loaded": False, "load_count": 0, "requests": 0, "load_seconds": 0.0, "rss_delta_mb": 0.0}
+
+    def get(self, name: str) -> Any:
+        """Returns the shared instance of a registered artifact, loading it on first use."""
+        if name not in self._loaders:
+            raise KeyError(f"Model '{name}' is not registered")
+        with self._lock:
+            self._stats[name]["requests"] += 1
+        if name in self._models:
+            return self._models[name]
+        with self._load_locks[name]:
+            if name not in self._models:
+                rss_before = current_rss_mb()
+                start_time = time.perf_counter()
+                model = self._loaders[name]()
+                stats = self._stats[name]
+                stats["load_seconds"] = round(time.perf_counter() - start_time, 3)
+                stats["rss_delta_mb"] = round(current_rss_mb() - rss_before, 1)
+                stats["load_count"] += 1
+                stats["loaded"] = True
+                self._models[name] = model
+                logger.info(f"Loaded model '{name}' in {stats['load_seconds']} seconds (+{stats['rss_delta_mb']} MB RSS)")
+        return self._models[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rss_mb": round(current_rss_mb(), 1), "models": {name: dict(stats) for name, stats in self._stats.items()}}
+
+
+def _load_spacy(model_name: str):
+    import spacy
+    if not spacy.util.is_package(model_name):
+        logger.info(f"Downloading {model_name} language model for SpaCy")
+        spacy.cli.download(model_name)
+    return spacy.load(model_name)
+
+
+def load_ner_only_model(model_name: str = SPACY_SM_MODEL):
+    """
+    Loads a SpaCy model with every component disabled except `ner` (and a shared tok2vec if `ner` listens to it).
+    Only doc.ents is read, so the tagger, parser, lemmatizer etc. are pure overhead.
+    """
+    nlp = _load_spacy(model_name)
+    enabled = ["ner"]
+    if "tok2vec" in nlp.pipe_names and "ner" in getattr(nlp.get_pipe("tok2vec"), "listening_components", []):
+        enabled.append("tok2vec")
+    nlp.select_pipes(enable=enabled)
+    return nlp
+
+
+def _build_analyzer(pattern_table):
+    """
+    Presidio AnalyzerEngine on the shared en_core_web_md model, with one PatternRecognizer per pattern.
+    """
+    from presidio_analyzer import AnalyzerEngine, PatternRecognizer
+    from presidio_analyzer.nlp_engine.spacy_nlp_engine import SpacyNlpEngine
+
+    nlp_engine = SpacyNlpEngine(models=[{"lang_code": "en", "model_name": SPACY_MD_MODEL}])
+    # Hand the engine the already loaded model instead of letting it load its own copy
+    nlp_engine.nlp = {"en": model_registry.get("spacy_md")}
+    analyzer = AnalyzerEngine(nlp_engine=nlp_engine)
+    for entity, pattern in pattern_table.items():
+        analyzer.registry.add_recognizer(PatternRecognizer(supported_entity=entity, patterns=[pattern]))
+    return analyzer
+
+
+def _load_data_regex_analyzer():
+    from app.utils.pii_scan.regex_patterns.data_regex import patterns
+    return _build_analyzer(patterns)
+
+
+def _load_column_data_analyzer():
+    from app.utils.ner_scanner.ner_regex_patteren_for_data import patterns
+    return _build_analyzer(patterns)
+
+
+def _load_gliner():
+    from gliner import GLiNER
+    if not os.path.isdir(GLINER_MODEL_DIR):
+        logger.info("Model not found locally. Downloading model from Hugging Face.")
+        os.makedirs(GLINER_MODEL_DIR, exist_ok=True)
+        GLiNER.from_pretrained(GLINER_MODEL_NAME, cache_dir=GLINER_MODEL_DIR)
+        logger.info(f"Model downloaded and cached to {GLINER_MODEL_DIR}.")
+    return GLiNER.from_pretrained(GLINER_MODEL_NAME)
+
+
+def _load_haar_cascade():
+    import cv2
+    return cv2.CascadeClassifier(HAAR_CASCADE_FILE)
+
+
+def _load_definitions():
+    with open(DEFINITIONS_FILE, "r", encoding='utf-8') as json_file:
+        return json.load(json_file)
+
+
+def _load_pii_scanner():
+    from pii_scanner.scanner import PIIScanner
+    return PIIScanner()
+
+
+model_registry = ModelRegistry()
+model_registry.register("spacy_sm", lambda: _load_spacy(SPACY_SM_MODEL))
+model_registry.register("spacy_sm_ner", lambda: load_ner_only_model(SPACY_SM_MODEL))
+model_registry.register("spacy_md", lambda: _load_spacy(SPACY_MD_MODEL))
+model_registry.register("analyzer_data_regex", _load_data_regex_analyzer)
+model_registry.register("analyzer_column_data", _load_column_data_analyzer)
+model_registry.register("gliner_pii", _load_gliner)
+model_registry.register("haar_cascade", _load_haar_cascade)
+model_registry.register("pii_definitions", _load_definitions)
+model_registry.register("pii_scanner", _load_pii_scanner)
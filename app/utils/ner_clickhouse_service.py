@@ -1,17 +1,19 @@
-from fastapi import UploadFile, HTTPException
+from fastapi import HTTPException
 import logging
 import os
 import json
+import time
+import asyncio
 from dotenv import load_dotenv
-from collections import defaultdict
-from typing import Dict
+from typing import Dict, List, Union
 import pandas as pd
 import csv
-from io import StringIO
-from client_connect import Connection
-from pii_scanner.scanner import PIIScanner
 from pii_scanner.constants.patterns_countries import Regions
 from app.utils.common_utils import BaseFileProcessor
+from app.utils.model_registry import model_registry
+from app.utils.result_writer import column_ner_writer
+from app.utils.column_reduction import reduce_column, weighted_entity_counts
+from app.utils.scan_executor import get_scan_executor
 
 # Load environment variables
 load_dotenv()
@@ -21,137 +23,164 @@ logger = logging.getLogger(__name__)
 
 # Load structured file formats from environment variables
 STRUCTURED_FILE_FORMATS = os.getenv("STRUCTURED_FILE_FORMATS", "").split(',')
+# Number of distinct values of each column passed to the PII scanner
+NER_COLUMN_SAMPLE_SIZE = int(os.getenv("NER_COLUMN_SAMPLE_SIZE", "5"))
+# Maximum number of columns of one table queued on the scan pool at the same time
+NER_COLUMN_PARALLELISM = int(os.getenv("NER_COLUMN_PARALLELISM", "4"))
+
+# Characters read from the start of a CSV file to detect its delimiter
+CSV_SNIFF_BYTES = int(os.getenv("CSV_SNIFF_BYTES", str(64 * 1024)))
+
+def _scan_values_in_worker(values: List[str], sample_size) -> Dict:
+    """
+    Runs in a scan worker process: scans the distinct values of one column with the process's PIIScanner.
+    Columns are scanned on the PII_SCAN_WORKERS process pool rather than on threads of the API process:
+    the scan is CPU-bound, and one PIIScanner (and its spaCy model) is never shared between threads.
+    """
+    return asyncio.run(model_registry.get("pii_scanner").scan(data=values, sample_size=sample_size, region=Regions.IN))
 
 class OmdFileProcesser(BaseFileProcessor):
-    def __init__(self):
-        self.pii_scanner = PIIScanner()
 
-    async def process_file_data(self, file: UploadFile, file_extension: str) -> Dict:
+    @staticmethod
+    def _read_table(file_path: str, file_extension: str) -> pd.DataFrame:
+        """
+        Parses a structured file straight from disk; the raw bytes are never loaded into memory as a whole.
+        """
+        if file_extension == 'csv':
+            # Auto-detect CSV delimiter from the head of the file
+            with open(file_path, "r", encoding="utf-8", newline="") as csv_file:
+                sample = csv_file.read(CSV_SNIFF_BYTES)
+            delimiter = csv.Sniffer().sniff(sample).delimiter
+            return pd.read_csv(file_path, sep=delimiter, encoding="utf-8")
+        if file_extension in ['xlsx', 'xls']:
+            return pd.read_excel(file_path)
+        if file_extension == 'json':
+            return pd.read_json(file_path, encoding="utf-8")
+        raise ValueError("Unsupported file format")
+
+    async def process_file_data(self, file_path: str, file_extension: str, file_name: str) -> Dict:
         """
-        Processes a file (CSV, Excel, JSON) into a dictionary structure.
+        Processes a file (CSV, Excel, JSON) stored at file_path into a dictionary structure.
         """
         if file_extension.lower() not in STRUCTURED_FILE_FORMATS:
             logger.error(f"Unsupported file format: {file_extension}")
             raise HTTPException(status_code=400, detail="Unsupported file format")
 
-        file_content = await file.read()
         try:
-            if file_extension.lower() == 'csv':
-                content_str = file_content.decode("utf-8")
-                # Auto-detect CSV delimiter
-                sniffer = csv.Sniffer()
-                delimiter = sniffer.sniff(content_str).delimiter
-                data = pd.read_csv(StringIO(content_str), sep=delimiter)
-            elif file_extension.lower() in ['xlsx', 'xls']:
-                data = pd.read_excel(file_content)
-            elif file_extension.lower() == 'json':
-                content_str = file_content.decode("utf-8")
-                data = pd.read_json(StringIO(content_str))
-            else:
-                raise ValueError("Unsupported file format")
+            data = await asyncio.to_thread(self._read_table, file_path, file_extension.lower())
 
             if data.empty:
                 raise ValueError(f"No valid data found in {file_extension.upper()} file")
 
-            column_data = {col: [str(value) for value in data[col]] for col in data.columns}
-            logger.info(f"Processed {file_extension.upper()} file '{file.filename}' with columns: {list(data.columns)}")
+            # Raw column values; nulls and repeats are removed by reduce_column before scanning
+            column_data = {col: data[col] for col in data.columns}
+            logger.info(f"Processed {file_extension.upper()} file '{file_name}' with columns: {list(data.columns)}")
             return column_data
 
         except Exception as e:
-            logger.error(f"Error processing {file_extension.upper()} file '{file.filename}': {str(e)}")
+            logger.error(f"Error processing {file_extension.upper()} file '{file_name}': {str(e)}")
             raise HTTPException(status_code=400, detail=f"Error processing {file_extension.upper()} file: {str(e)}")
 
-    async def process_and_update_ner_results(self, table_id: str, data: dict) -> bool:
+    async def _scan_column(self, column_name: str, column_data, slots: asyncio.Semaphore) -> Dict:
         """
-        Processes NER results for each column and updates the results in ClickHouse.
+        Scans one column on the scan worker pool and builds its NER summary.
+        Only the distinct values are sent to the worker; the counts stay in this process.
+        """
+        async with slots:
+            start_time = time.perf_counter()
+            # Scan each distinct non-null value once; counts are weighted by value frequency
+            value_counts = await asyncio.to_thread(reduce_column, column_data)
+            distinct_values = value_counts.index.tolist()
+            sample_size = NER_COLUMN_SAMPLE_SIZE if len(distinct_values) > NER_COLUMN_SAMPLE_SIZE else None
+            json_result = None
+            if distinct_values:
+                loop = asyncio.get_running_loop()
+                json_result = await loop.run_in_executor(get_scan_executor(), _scan_values_in_worker, distinct_values, sample_size)
+        ner_results = 'NA'
+
+        # Process the NER results
+        if json_result:
+            entity_counts = weighted_entity_counts(json_result.get("results", []), value_counts)
+            total_entities = sum(entity_counts.values())
+
+            if entity_counts:
+                highest_label = max(entity_counts.items(), key=lambda x: x[1])[0]
+                confidence_score = round(max(entity_counts.values()) / total_entities, 2)
+                ner_results = {
+                    'highest_label': highest_label,
+                    'confidence_score': confidence_score,
+                    'detected_entities': dict(entity_counts)
+                }
+            else:
+                ner_results = {
+                    'highest_label': "NA",
+                    'confidence_score': 0.00,
+                    'detected_entities': "{ NA }"
+                }
+
+        logger.info(f"NER results for column '{column_name}': {ner_results}")
+        return {
+            "column_name": column_name,
+            "ner_results": ner_results,
+            "scan_seconds": round(time.perf_counter() - start_time, 4)
+        }
+
+    async def process_and_update_ner_results(self, table_id: str, data: dict) -> Union[Dict, bool]:
+        """
+        Processes NER results for all columns concurrently and saves them to ClickHouse in one insert.
+        At most NER_COLUMN_PARALLELISM columns of the table are on the scan pool at a time. Returns the
+        per-column and total wall times, or False on failure.
         """
         try:
-            for column_name, column_data in data.items():
-                # Perform NER scanning on the column data
-                json_result = await self.pii_scanner.scan(data=column_data, sample_size=5, region=Regions.IN)
-                entity_counts = defaultdict(int)
-                total_entities = 0
-                ner_results = 'NA'
-                
-                # Process the NER results
-                if json_result:
-                    for result in json_result.get("results", []):
-                        if result.get("entity_detected"):
-                            entity_type = result["entity_detected"][0].get("type")
-                            if entity_type:
-                                entity_counts[entity_type] += 1
-                                total_entities += 1
-
-                    if entity_counts:
-                        highest_label = max(entity_counts.items(), key=lambda x: x[1])[0]
-                        confidence_score = round(max(entity_counts.values()) / total_entities, 2)
-                        ner_results = {
-                            'highest_label': highest_label,
-                            'confidence_score': confidence_score,
-                            'detected_entities': dict(entity_counts)
-                        }
-                    else:
-                        ner_results = {
-                            'highest_label': "NA",
-                            'confidence_score': 0.00,
-                            'detected_entities': "{ NA }"
-                        }
-
-                logger.info(f"NER results for column '{column_name}': {ner_results}")
-                
+            start_time = time.perf_counter()
+            slots = asyncio.Semaphore(NER_COLUMN_PARALLELISM)
+            column_results = await asyncio.gather(*(
+                self._scan_column(column_name, column_data, slots)
+                for column_name, column_data in data.items()
+            ))
+            scan_seconds = time.perf_counter() - start_time
+
+            # Categories come from the in-memory data_element index; ClickHouse is only hit on a reload
+            for column_result in column_results:
+                ner_results = column_result["ner_results"]
                 # Determine the detected entity
                 detected_entity = ner_results.get('highest_label') if isinstance(ner_results, dict) else 'NA'
-                
+                column_result["detected_entity"] = detected_entity
                 # Fetch additional details from ClickHouse
-                data_element = await self.fetch_data_element_category(detected_entity)
-                
-                # Update ClickHouse with the NER results
-                update_result = await self.update_entity_for_column(
-                    table_id,
-                    column_name,
-                    ner_results,
-                    detected_entity,
-                    data_element
-                )
-                if not update_result:
-                    logger.error(f"Failed to save NER results for table_id: {table_id}, column: {column_name}")
-                    return False
+                column_result["data_element"] = await self.fetch_data_element_category(detected_entity)
 
-            return True
+            # Update ClickHouse with the NER results
+            if not await self.update_entities_for_columns(table_id, column_results):
+                logger.error(f"Failed to save NER results for table_id: {table_id}")
+                return False
+
+            total_seconds = round(time.perf_counter() - start_time, 4)
+            logger.info(f"Scanned {len(column_results)} columns of table_id '{table_id}' in {total_seconds} seconds")
+            return {
+                "columns": {result["column_name"]: result["scan_seconds"] for result in column_results},
+                "scan_seconds": round(scan_seconds, 4),
+                "total_seconds": total_seconds
+            }
 
         except Exception as e:
             logger.error(f"Error processing NER results: {str(e)}")
             return False
 
-    async def update_entity_for_column(
-        self,
-        table_id: str,
-        column_name: str,
-        ner_results,
-        detected_entity: str,
-        data_element
-    ) -> bool:
+    async def update_entities_for_columns(self, table_id: str, column_results: List[Dict]) -> bool:
         """
-        Updates the NER result for a given column in ClickHouse.
+        Writes the NER results of all columns of a table to ClickHouse. The rows go through the buffered
+        column_ner_results writer, which shares one insert between concurrent tables.
         """
         try:
-            client = self.get_clickhouse_client()
-            query = """
-                INSERT INTO column_ner_results 
-                    (table_id, column_name, json, detected_entity, data_element)
-                VALUES 
-                    (%(table_id)s, %(column_name)s, %(json)s, %(detected_entity)s, %(data_element)s)
-            """
-            params = {
-                "table_id": table_id,
-                "column_name": column_name,
-                "json": json.dumps(ner_results),
-                "detected_entity": detected_entity,
-                "data_element": data_element
-                
+            columns = {
+                "table_id": [table_id] * len(column_results),
+                "column_name": [result["column_name"] for result in column_results],
+                "json": [json.dumps(result["ner_results"]) for result in column_results],
+                "detected_entity": [result["detected_entity"] for result in column_results],
+                "data_element": [result["data_element"] for result in column_results]
             }
-            client.command(query, params)
-            logger.info(f"Successfully inserted/updated NER result for table_id: '{table_id}', column: '{column_name}'")
+            await column_ner_writer.write(columns)
+            logger.info(f"Successfully inserted/updated NER results for table_id: '{table_id}', columns: {len(column_results)}")
             return True
         except Exception as e:
             logger.error(f"Error inserting/updating data in ClickHouse: {str(e)}")
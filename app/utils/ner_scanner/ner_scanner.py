@@ -1,8 +1,6 @@
 from collections import defaultdict
 from typing import Any, Dict, List, Optional, Tuple
-from presidio_analyzer import AnalyzerEngine
-from presidio_analyzer.nlp_engine.spacy_nlp_engine import SpacyNlpEngine
-from .ner_regex_patteren_for_data import patterns
+from app.utils.model_registry import model_registry
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -18,28 +16,8 @@ class StringAnalysis:
 
 class NERScanner:
     def __init__(self):
-        import spacy
-        from presidio_analyzer import PatternRecognizer
-
-        SPACY_EN_MODEL = "en_core_web_md"
-
-        # Load spaCy model
-        try:
-            spacy.load(SPACY_EN_MODEL)
-        except OSError:
-            from spacy.cli import download
-            download(SPACY_EN_MODEL)
-            spacy.load(SPACY_EN_MODEL)
-
-        # Initialize Presidio Analyzer with spaCy NLP engine
-        self.analyzer = AnalyzerEngine(
-            nlp_engine=SpacyNlpEngine(models={"en": SPACY_EN_MODEL})
-        )
-
-        # Add custom recognizers based on provided patterns
-        for entity, pattern in patterns.items():
-            recognizer = PatternRecognizer(supported_entity=entity, patterns=[pattern])
-            self.analyzer.registry.add_recognizer(recognizer)
+        # Shared analyzer (en_core_web_md + column data recognizers), loaded once per process
+        self.analyzer = model_registry.get("analyzer_column_data")
 
     @staticmethod
     def get_highest_score_label(entities_score: Dict[str, StringAnalysis]) -> Tuple[str, float]:
@@ -0,0 +1,64 @@
+# NLTK data is vendored into NLTK_DATA (downloaded once at image build time, see Dockerfile),
+# so the service never downloads corpora at import or request time.
+#
+#   python -m app.utils.nltk_resources    # download everything below into NLTK_DATA
+import os
+import logging
+from typing import List
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+NLTK_DATA_DIR = os.getenv("NLTK_DATA", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "nltk_data"))
+
+# Package id -> resource path checked with nltk.data.find
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "stopwords": "corpora/stopwords",
+    "averaged_perceptron_tagger": "taggers/averaged_perceptron_tagger",
+    "averaged_perceptron_tagger_eng": "taggers/averaged_perceptron_tagger_eng",
+    "maxent_ne_chunker": "chunkers/maxent_ne_chunker",
+    "maxent_ne_chunker_tab": "chunkers/maxent_ne_chunker_tab",
+    "words": "corpora/words",
+}
+
+
+def configure_nltk_data():
+    """Puts the vendored data directory first on NLTK's search path."""
+    import nltk
+    data_dir = os.path.abspath(NLTK_DATA_DIR)
+    if data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+
+
+def missing_nltk_resources() -> List[str]:
+    """Returns the packages of NLTK_RESOURCES that cannot be found locally."""
+    import nltk
+    configure_nltk_data()
+    missing = []
+    for package, resource in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(package)
+    return missing
+
+
+def ensure_nltk_data():
+    """
+    Raises LookupError naming the missing packages instead of downloading them.
+    """
+    missing = missing_nltk_resources()
+    if missing:
+        raise LookupError(
+            f"NLTK data missing from {os.path.abspath(NLTK_DATA_DIR)}: {', '.join(missing)}. "
+            f"Run `python -m app.utils.nltk_resources` to vendor it."
+        )
+
+
+if __name__ == "__main__":
+    import nltk
+    os.makedirs(NLTK_DATA_DIR, exist_ok=True)
+    for package in NLTK_RESOURCES:
+        nltk.download(package, download_dir=NLTK_DATA_DIR)
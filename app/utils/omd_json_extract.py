@@ -0,0 +1,174 @@
+import json
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib parser gives the same results, only slower
+    _json_loads = json.loads
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+PROFILE_METRIC_COLUMNS = ["rowCount", "timestamp", "sizeInByte", "columnCount", "profileSample"]
+CREATE_DATE_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+# Numeric metrics written to profiler_metric_points, per jsonSchema. Missing and non-numeric values are skipped.
+PROFILE_POINT_METRICS = {
+    "tableProfile": ["rowCount", "columnCount", "sizeInByte", "profileSample"],
+    "columnProfile": [
+        "valuesCount", "nullCount", "nullProportion", "uniqueCount", "uniqueProportion", "distinctCount",
+        "distinctProportion", "duplicateCount", "missingCount", "missingPercentage", "min", "max", "minLength",
+        "maxLength", "mean", "sum", "stddev", "variance", "median", "firstQuartile", "thirdQuartile",
+        "interQuartileRange", "nonParametricSkew",
+    ],
+}
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock seconds per named stage, so a batch can report where its time went.
+    """
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start_time
+
+    def merge(self, other: Dict[str, float]):
+        for name, seconds in other.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        return {name: round(seconds, 4) for name, seconds in self.stages.items()}
+
+
+def _safe_loads(text):
+    try:
+        return _json_loads(text)
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_json_column(json_column: pd.Series, timer: StageTimer) -> pd.Series:
+    """
+    Parses the OpenMetadata `json` column for a whole batch.
+    The exports use Python-style quoting and booleans, which are repaired with vectorized string ops first.
+    Rows that still fail to parse come back as None; callers keep only the rows that parsed to objects.
+    """
+    with timer.stage("repair"):
+        repaired = (
+            json_column.astype(str)
+            .str.replace("'", '"', regex=False)
+            .str.replace("False", "false", regex=False)
+            .str.replace("True", "true", regex=False)
+            .str.rstrip(',')
+        )
+    with timer.stage("parse"):
+        parsed = pd.Series([_safe_loads(text) for text in repaired], index=json_column.index, dtype=object)
+    failed = int(parsed.isna().sum())
+    if failed:
+        logger.error(f"Could not decode {failed} of {len(parsed)} JSON documents")
+    return parsed
+
+
+def extract_service_locations(data: pd.DataFrame, entity_type: str, timer: StageTimer) -> pd.DataFrame:
+    """
+    Derives the dbservice_entity_meta_info columns (id, name, source, region) for a batch
+    from `connection.config.hostPort`, e.g. host.<x>.<region>.<y>.<source>.
+    """
+    parsed = parse_json_column(data["json"], timer)
+    with timer.stage("extract"):
+        valid = parsed.map(lambda document: isinstance(document, dict))
+        parsed = parsed[valid]
+        batch = data[valid]
+
+        host_parts = (
+            parsed.str.get("connection").str.get("config").str.get("hostPort")
+            .where(lambda host_port: host_port.map(lambda value: isinstance(value, str) and value != ""))
+            .str.split(".")
+        )
+        if entity_type == "profiler_data_time_series":
+            entity_ids = batch["entityFQNHash"]
+            entity_names = batch["name"] if "name" in batch.columns else pd.Series("N/A", index=batch.index)
+        else:
+            entity_ids = batch["id"]
+            entity_names = batch["name"]
+
+        return pd.DataFrame({
+            "dbservice_entity_id": entity_ids.astype(str),
+            "dbservice_entity_name": entity_names.astype(str),
+            "source": host_parts.str.get(4).fillna("N/A"),
+            "region": host_parts.str.get(2).fillna("N/A"),
+        })
+
+
+def extract_table_profiles(data: pd.DataFrame, timer: StageTimer, parsed: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Extracts the profiler_metadata columns for the `tableProfile` rows of a batch.
+    createDateTime is converted to epoch seconds in one pd.to_datetime call.
+    parsed may hold the already parsed json of (at least) these rows.
+    """
+    profiles = data[data["jsonSchema"] == "tableProfile"]
+    parsed = parse_json_column(profiles["json"], timer) if parsed is None else parsed.loc[profiles.index]
+    with timer.stage("extract"):
+        valid = parsed.map(lambda document: isinstance(document, dict))
+        records = pd.DataFrame(parsed[valid].tolist(), index=profiles.index[valid])
+        records = records.reindex(columns=PROFILE_METRIC_COLUMNS + ["createDateTime", "profileSampleType"])
+        result = pd.DataFrame({"entityFQNHash": profiles.loc[valid, "entityFQNHash"].astype(str)})
+        for column in PROFILE_METRIC_COLUMNS:
+            result[column] = pd.to_numeric(records[column], errors="coerce").astype("float64")
+        result["timestamp"] = result["timestamp"].fillna(0).astype("uint64")
+        result["profileSampleType"] = records["profileSampleType"].fillna("NA").astype(str)
+    with timer.stage("timestamps"):
+        created = pd.to_datetime(records["createDateTime"], format=CREATE_DATE_TIME_FORMAT, errors="coerce", utc=True)
+        result["createDateTime"] = (
+            (created - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+        ).fillna(0).astype("uint64")
+    return result[["entityFQNHash", "rowCount", "timestamp", "sizeInByte", "columnCount", "profileSample", "createDateTime", "profileSampleType"]]
+
+
+def extract_profile_points(data: pd.DataFrame, timer: StageTimer, parsed: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Unpivots the numeric metrics of the `tableProfile` and `columnProfile` rows of a batch into the
+    profiler_metric_points columns, one row per (entity, timestamp, column, metric).
+    parsed may hold the already parsed json of (at least) these rows.
+    """
+    profiles = data[data["jsonSchema"].isin(list(PROFILE_POINT_METRICS))]
+    parsed = parse_json_column(profiles["json"], timer) if parsed is None else parsed.loc[profiles.index]
+    frames = []
+    with timer.stage("extract"):
+        valid = parsed.map(lambda document: isinstance(document, dict))
+        for schema, metrics in PROFILE_POINT_METRICS.items():
+            rows = profiles.index[(profiles["jsonSchema"] == schema) & valid]
+            if rows.empty:
+                continue
+            records = pd.DataFrame(parsed.loc[rows].tolist(), index=rows).reindex(columns=metrics + ["timestamp", "name"])
+            values = records[metrics].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+            # Row-major positions of the usable values, so each point lines up with its row and metric
+            row_positions, metric_positions = np.nonzero(np.isfinite(values))
+            timestamps = pd.to_numeric(records["timestamp"], errors="coerce").fillna(0).astype("uint64").to_numpy()
+            if schema == "columnProfile":
+                column_names = records["name"].fillna("").astype(str).to_numpy()
+            else:
+                column_names = np.full(len(rows), "", dtype=object)
+            frames.append(pd.DataFrame({
+                "entityFQNHash": profiles.loc[rows, "entityFQNHash"].astype(str).to_numpy()[row_positions],
+                "timestamp": timestamps[row_positions],
+                "column_name": column_names[row_positions],
+                "metric": np.array(metrics, dtype=object)[metric_positions],
+                "value": values[row_positions, metric_positions],
+            }))
+    if not frames:
+        return pd.DataFrame(columns=["entityFQNHash", "timestamp", "column_name", "metric", "value"])
+    return pd.concat(frames, ignore_index=True)
@@ -8,20 +8,25 @@ from PIL import Image
 from skimage.transform import rotate
 from deskew import determine_skew
 import numpy
+import threading
+from app.utils.model_registry import model_registry
+
+_cascade_lock = threading.Lock()
 
 def scan_image_for_people(image):
     
     image = numpy.array(image) # converts the image to a compatible format
     
-    cascade_values_file = 'app/utils/pii_scan/face_cascade.xml'
-    cascade_values = cv2.CascadeClassifier(cascade_values_file)
-    faces = cascade_values.detectMultiScale (
-        image,
-        scaleFactor = 1.1,
-        minNeighbors = 5,
-        minSize = (30, 30),
-        flags = cv2.CASCADE_SCALE_IMAGE
-    )
+    # The cascade is loaded once per process; OpenCV classifiers are not safe to share between threads
+    cascade_values = model_registry.get("haar_cascade")
+    with _cascade_lock:
+        faces = cascade_values.detectMultiScale (
+            image,
+            scaleFactor = 1.1,
+            minNeighbors = 5,
+            minSize = (30, 30),
+            flags = cv2.CASCADE_SCALE_IMAGE
+        )
 
     return len(faces) 
 
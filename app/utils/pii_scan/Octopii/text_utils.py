@@ -25,6 +25,8 @@ SOFTWARE.
 """
 
 import pytesseract, re, json, itertools, difflib
+from app.utils.model_registry import model_registry
+from app.utils.nltk_resources import ensure_nltk_data
 
 def string_tokenizer(text):
     final_word_list = []
@@ -39,10 +41,8 @@ def string_tokenizer(text):
 def similarity(a, b): return difflib.SequenceMatcher(None, a, b).ratio() * 100
 
 def get_regexes():
-    
-    with open('app/utils/pii_scan/definitions.json', "r", encoding='utf-8') as json_file:
-        _rules = json.load(json_file)
-        return _rules
+    # definitions.json is parsed once per process; callers only read the rules
+    return model_registry.get("pii_definitions")
 
 def email_pii(text, rules):
     email_rules = rules["Email"]["regex"]
@@ -95,15 +95,8 @@ def regional_pii(text):
     from nltk import word_tokenize, pos_tag, ne_chunk
     from nltk.corpus import stopwords
 
-    resources = ["punkt", "maxent_ne_chunker", "stopwords", "words", "averaged_perceptron_tagger"]
-
-    try:
-        nltk_resources = ["tokenizers/punkt", "chunkers/maxent_ne_chunker", "corpora/words.zip"]
-        for resource in nltk_resources:
-            if not nltk.data.find(resource): raise LookupError()
-    except LookupError:
-        for resource in resources:
-            nltk.download(resource)
+    # Uses the vendored NLTK data only; raises LookupError if it is incomplete
+    ensure_nltk_data()
 
     stop_words = set(stopwords.words('english'))
 
@@ -5,12 +5,11 @@ from unstructured.partition.auto import partition
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 from app.utils.pii_scan.unstructured_ner_main import MLBasedNERScannerForUnStructuredData
-import nltk
+from app.utils.nltk_resources import configure_nltk_data
 
 
-# Ensure you have NLTK stopwords downloaded
-nltk.download('punkt')
-nltk.download('stopwords')
+# NLTK stopwords and punkt are read from the vendored NLTK_DATA directory
+configure_nltk_data()
 
 # Setup logging
 logging.basicConfig(
@@ -0,0 +1,140 @@
+import re
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+# Backreferences such as \1 or \2 inside a pattern; they are renumbered when the pattern is embedded
+_BACKREFERENCE = re.compile(r"(?<!\\)((?:\\\\)*)\\([1-9][0-9]?)")
+
+
+def _ascii_upper(text: str) -> bool:
+    return text.isascii() and text.isalpha() and text.isupper()
+
+
+def _strip_line_end(text: str) -> str:
+    # `$` also matches before a single trailing newline, so length checks ignore it
+    return text[:-1] if text.endswith("\n") else text
+
+
+# Cheap necessary conditions for the anchored ^...$ ID patterns. A prefilter may only reject
+# values the pattern could never match; anything that passes is still confirmed by the regex.
+ANCHORED_PREFILTERS: Dict[str, Callable[[str], bool]] = {
+    # 12 digits, first in 2-9, with up to two single-character separators
+    'AADHAAR': lambda body: 12 <= len(body) <= 14 and body[0] in "23456789",
+    # AAAAA9999A
+    'PAN': lambda body: len(body) == 10 and _ascii_upper(body[:5]) and _ascii_upper(body[9]),
+    # AAAA0XXXXXX
+    'IFSC': lambda body: len(body) == 11 and body[4] == "0" and _ascii_upper(body[:4]),
+    # 99AAAAA9999A9ZX
+    'GST_NUMBER': lambda body: len(body) == 15 and body[13] == "Z" and _ascii_upper(body[2:7]),
+    'VOTERID': lambda body: len(body) == 10 and _ascii_upper(body[:3]),
+    'PASSPORT': lambda body: len(body) == 8,
+    'BANK_ACCOUNT_NUMBER': lambda body: 9 <= len(body) <= 18,
+    'CVV': lambda body: 3 <= len(body) <= 4,
+    'IMSI': lambda body: 15 <= len(body) <= 17 and body[:2] == "40",
+}
+
+
+def _top_level_alternatives(regex: str) -> List[str]:
+    """Splits a regex on `|` outside groups and character classes."""
+    alternatives, depth, in_class, escaped, start = [], 0, False, False, 0
+    for index, char in enumerate(regex):
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            alternatives.append(regex[start:index])
+            start = index + 1
+    alternatives.append(regex[start:])
+    return alternatives
+
+
+def _is_anchored(regex: str) -> bool:
+    """True when every top-level alternative is anchored at both ends, so it can only match the whole cell."""
+    return all(
+        alternative.startswith("^") and alternative.endswith("$") and not alternative.endswith("\\$")
+        for alternative in _top_level_alternatives(regex)
+    )
+
+
+def _embed(regex: str, group_offset: int) -> str:
+    """Shifts numeric backreferences by group_offset so the pattern keeps its meaning inside the alternation."""
+    return _BACKREFERENCE.sub(lambda match: f"{match.group(1)}(?:\\{int(match.group(2)) + group_offset})", regex)
+
+
+class CompiledPatternMatcher:
+    """
+    Classifies a cell against the whole data_regex pattern table in one pass.
+
+    The free-text patterns (\\b...\\b) are joined into a single alternation with one named group per
+    entity type. A cell that alternation does not match anywhere matches none of them, which is the
+    common case for profiling data, so they are rejected with one search instead of one per pattern.
+    The anchored ^...$ ID patterns get their own alternation behind a leading ^, so re only tries it
+    at position 0; when it hits, cheap length/charset prefilters skip most of them before confirmation.
+    The result is the same {entity_type: "match, match"} mapping as running every pattern separately.
+    """
+
+    def __init__(self, pattern_table: Mapping, prefilters: Optional[Mapping[str, Callable[[str], bool]]] = None):
+        self.prefilters = dict(ANCHORED_PREFILTERS if prefilters is None else prefilters)
+        # (entity_type, compiled pattern, prefilter) in pattern table order
+        self.anchored: List[Tuple[str, "re.Pattern", Optional[Callable[[str], bool]]]] = []
+        self.unanchored: List[Tuple[str, "re.Pattern"]] = []
+
+        anchored_regexes, unanchored_regexes = [], []
+        for entity_type, pattern in pattern_table.items():
+            regex = getattr(pattern, "regex", pattern)
+            compiled = re.compile(regex)
+            if _is_anchored(regex):
+                self.anchored.append((entity_type, compiled, self.prefilters.get(entity_type)))
+                anchored_regexes.append((regex, compiled.groups))
+            else:
+                self.unanchored.append((entity_type, compiled))
+                unanchored_regexes.append((regex, compiled.groups))
+        self.anchored_combined = self._combine(anchored_regexes, "^(?:{})")
+        self.unanchored_combined = self._combine(unanchored_regexes, "{}")
+        self._order = {entity_type: index for index, entity_type in enumerate(pattern_table)}
+
+    @staticmethod
+    def _combine(regexes: List[Tuple[str, int]], template: str) -> Optional["re.Pattern"]:
+        """Joins the patterns into one alternation with a named group per pattern."""
+        if not regexes:
+            return None
+        alternatives = []
+        group_count = 0
+        for index, (regex, groups) in enumerate(regexes):
+            # The wrapping named group takes one number, the pattern's own groups follow it
+            alternatives.append(f"(?P<p{index}>{_embed(regex, group_count + 1)})")
+            group_count += 1 + groups
+        return re.compile(template.format("|".join(alternatives)))
+
+    def classify(self, text: str) -> Dict[str, str]:
+        text = str(text)
+        detected_entities = {}
+
+        if self.anchored_combined is not None and self.anchored_combined.search(text) is not None:
+            body = _strip_line_end(text)
+            for entity_type, compiled, prefilter in self.anchored:
+                if prefilter is not None and not prefilter(body):
+                    continue
+                # Anchored at both ends, so there is at most one match
+                match = compiled.search(text)
+                if match:
+                    detected_entities[entity_type] = match.group(0)
+
+        if self.unanchored_combined is not None and self.unanchored_combined.search(text) is not None:
+            for entity_type, compiled in self.unanchored:
+                matches = [match.group(0) for match in compiled.finditer(text)]
+                if matches:
+                    detected_entities[entity_type] = ', '.join(matches)
+
+        if len(detected_entities) > 1:
+            # Keep the pattern table's key order, as the per-pattern loop does
+            detected_entities = dict(sorted(detected_entities.items(), key=lambda item: self._order[item[0]]))
+        return detected_entities
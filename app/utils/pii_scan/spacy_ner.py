@@ -2,10 +2,7 @@ import logging
 import re
 from collections import defaultdict
 from typing import Dict, List
-import spacy
-from presidio_analyzer import AnalyzerEngine, PatternRecognizer
-from presidio_analyzer.nlp_engine.spacy_nlp_engine import SpacyNlpEngine
-from app.utils.pii_scan.regex_patterns.data_regex import patterns
+from app.utils.model_registry import model_registry
 
 # Define logger
 # Setup logging
@@ -16,39 +13,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-SPACY_EN_MODEL = "en_core_web_md"
-
 class SpaCyNERProcessor:
     """
     SpaCy-based NER Processor to identify entities in texts with custom recognizers.
     """
     def __init__(self):
-        self._load_spacy_model()
-        self.analyzer = AnalyzerEngine(
-            nlp_engine=SpacyNlpEngine(models={"en": SPACY_EN_MODEL})
-        )
-        self._setup_recognizers()
-
-    def _load_spacy_model(self):
-        """
-        Load SpaCy model or download it if not present.
-        """
-        if not spacy.util.is_package(SPACY_EN_MODEL):
-            logger.info(f"Downloading {SPACY_EN_MODEL} language model for SpaCy")
-            spacy.cli.download(SPACY_EN_MODEL)
-        spacy.load(SPACY_EN_MODEL)
-
-    def _setup_recognizers(self):
-        """
-        Setup custom recognizers with defined patterns and add them to the analyzer.
-        """
-        try:
-            for entity, pattern in patterns.items():
-                recognizer = PatternRecognizer(supported_entity=entity, patterns=[pattern])
-                self.analyzer.registry.add_recognizer(recognizer)
-        except Exception as e:
-            logger.error(f"Failed to setup recognizers: {e}")
-            raise
+        # Shared analyzer (en_core_web_md + data_regex recognizers), loaded once per process
+        self.analyzer = model_registry.get("analyzer_data_regex")
 
     def parse_result_string(self, result_string: str) -> Dict[str, List[Dict[str, float]]]:
         """
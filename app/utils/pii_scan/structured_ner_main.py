@@ -3,12 +3,13 @@ import time
 import logging
 import traceback
 import random
-import re
+import threading
 from collections import defaultdict
 from typing import Dict, List, Optional, Union
-from app.utils.pii_scan.regex_patterns.data_regex import patterns
-from multiprocessing import Pool, cpu_count
-import spacy
+from app.utils.pii_scan.regex_patterns.compiled_matcher import CompiledPatternMatcher
+from app.utils.metrics import metrics
+from app.utils.model_registry import model_registry, load_ner_only_model
+import multiprocessing
 
 # Define logger
 log_file = 'spacy_regex_scanner.log'
@@ -19,116 +20,245 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SPACY_STRUCTURED_MODEL = "en_core_web_sm"
+# Number of long-lived NER worker processes, started by the first structured scan. 0 (the default) scans in the
+# calling process; the API's scans already run on the PII_SCAN_WORKERS process pool (app/utils/scan_executor.py)
+NER_POOL_PROCESSES = int(os.getenv("NER_POOL_PROCESSES", "0"))
+# Number of cells per nlp.pipe batch and spaCy's own process count (kept at 1 inside pool workers)
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "256"))
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", "1"))
+
+# Per-process state, populated once by _init_worker in every pool worker
+_worker_nlp = None
+_worker_matcher = None
+
+
+def _build_matcher() -> CompiledPatternMatcher:
+    # data_regex pulls in presidio; imported here so importing this module (and main.py) stays cheap
+    from app.utils.pii_scan.regex_patterns.data_regex import patterns
+    return CompiledPatternMatcher(patterns)
+
+
+def _init_worker():
+    """
+    Pool initializer: loads the SpaCy model and compiles the regex patterns once per worker process.
+    """
+    global _worker_nlp, _worker_matcher
+    _worker_nlp = model_registry.get("spacy_sm_ner")
+    _worker_matcher = _build_matcher()
+    logger.info(f"NER worker {os.getpid()} loaded {SPACY_STRUCTURED_MODEL}")
+
+
+def _parse_spacy_results(doc) -> Dict[str, Dict[str, Union[int, List[str]]]]:
+    """
+    Parse the results from SpaCy and extract relevant details.
+    """
+    entities_info = defaultdict(lambda: {"count": 0, "texts": []})
+
+    for ent in doc.ents:
+        entity_type = ent.label_
+        detected_text = ent.text
+
+        if entity_type and detected_text:
+            entities_info[entity_type]["count"] += 1
+            entities_info[entity_type]["texts"].append(detected_text)
+
+    return dict(entities_info)
+
+
+def _empty_result(text: str) -> Dict:
+    return {
+        "text": text,
+        "entity_detected_spacy": {},
+        "entity_detected_regex": {}
+    }
+
+
+def _process_texts(nlp, matcher: CompiledPatternMatcher, texts: List[str], batch_size: int = SPACY_BATCH_SIZE, n_process: int = 1) -> List[Dict]:
+    """
+    Runs SpaCy and the regex patterns over a batch of cell values.
+    Cells go through nlp.pipe in batches; if a batch fails, its cells are retried one by one
+    so a single bad value only loses its own result.
+    """
+    texts = [str(text).strip() for text in texts]
+    try:
+        docs = list(nlp.pipe(texts, batch_size=batch_size, n_process=n_process))
+    except Exception as exc:
+        logger.warning(f"Batched SpaCy processing failed, falling back to per-cell processing - {exc}")
+        docs = []
+        for text in texts:
+            try:
+                docs.append(nlp(text))
+            except Exception as cell_exc:
+                logger.warning(f"Error processing text with SpaCy model: '{text}' - {cell_exc}")
+                logger.debug(traceback.format_exc())
+                docs.append(None)
+
+    results = []
+    for text, doc in zip(texts, docs):
+        if doc is None:
+            results.append(_empty_result(text))
+            continue
+        results.append({
+            "text": text,
+            "entity_detected_spacy": _parse_spacy_results(doc),
+            "entity_detected_regex": matcher.classify(text)
+        })
+    return results
+
+
+def _process_chunk_in_worker(texts: List[str]):
+    """
+    Pool task: processes one chunk with the worker's preloaded model.
+    Returns the results and the time spent computing, so the caller can derive dispatch overhead.
+    """
+    start_time = time.perf_counter()
+    results = _process_texts(_worker_nlp, _worker_matcher, texts)
+    return results, time.perf_counter() - start_time
+
+
+class NERWorkerPool:
+    """
+    Long-lived process pool for structured NER. Started by the first scan and stopped by the FastAPI lifespan,
+    so the SpaCy model is loaded once per worker instead of once per scanned column.
+    """
+    def __init__(self, processes: int = NER_POOL_PROCESSES):
+        self.processes = processes
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._pool is not None
+
+    def start(self):
+        # NER_POOL_PROCESSES=0 disables the pool; scans then run in the calling process
+        if self._pool is not None or self.processes <= 0:
+            return
+        with self._lock:
+            # Concurrent first scans: only one of them starts the pool
+            if self._pool is None:
+                self._start()
+
+    def _start(self):
+        start_time = time.perf_counter()
+        # spawn instead of fork: the API process already runs threads (uvicorn, ClickHouse client)
+        context = multiprocessing.get_context("spawn")
+        pool = context.Pool(processes=self.processes, initializer=_init_worker)
+        # Block until every worker has run its initializer, so the startup cost is measured once, here
+        pool.map(os.getpid, range(self.processes), chunksize=1)
+        self._pool = pool
+        startup_seconds = time.perf_counter() - start_time
+        metrics.set_gauge("structured_ner.pool_processes", self.processes)
+        metrics.set_gauge("structured_ner.pool_startup_seconds", round(startup_seconds, 3))
+        logger.info(f"Started NER worker pool with {self.processes} processes in {startup_seconds:.2f} seconds")
+
+    def stop(self):
+        with self._lock:
+            if self._pool is None:
+                return
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        metrics.set_gauge("structured_ner.pool_processes", 0)
+        logger.info("Stopped NER worker pool")
+
+    def map_chunks(self, chunks: List[List[str]]) -> List[Dict]:
+        """
+        Processes the chunks on the pool and returns the combined per-text results in order.
+        """
+        start_time = time.perf_counter()
+        chunk_results = self._pool.map(_process_chunk_in_worker, chunks, chunksize=1)
+        wall_seconds = time.perf_counter() - start_time
+
+        combined_results = []
+        compute_seconds = 0.0
+        for results, seconds in chunk_results:
+            combined_results.extend(results)
+            compute_seconds += seconds
+        # Time not spent in the model: pickling, IPC and waiting for a free worker
+        metrics.observe("structured_ner.dispatch_overhead_seconds", max(wall_seconds - compute_seconds / self.processes, 0.0))
+        return combined_results
+
+
+ner_worker_pool = NERWorkerPool()
+
+
 
 class MLBasedNERScannerForStructuredData:
     """
     NER Scanner using SpaCy and Regex for entity recognition.
+    Columns are processed on the shared ner_worker_pool when NER_POOL_PROCESSES enables it; otherwise
+    the model is loaded lazily and used in-process.
     """
 
-    def __init__(self):
-        # Load the SpaCy model
-        self.nlp = self.load_spacy_model()
+    def __init__(self, worker_pool: Optional[NERWorkerPool] = None):
+        self.worker_pool = worker_pool or ner_worker_pool
+        self._nlp = None
+        self._matcher = None
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            self._nlp = self.load_spacy_model()
+        return self._nlp
 
     def load_spacy_model(self):
         """
         Load the SpaCy model for NER.
         """
         try:
-            nlp = spacy.load("en_core_web_sm")
-            print("SpaCy model loaded successfully.")
+            nlp = model_registry.get("spacy_sm_ner")
+            logger.info("SpaCy model loaded successfully.")
             return nlp
         except Exception as e:
             logger.error(f"Error loading SpaCy model: {e}")
             raise
 
-    def _parse_spacy_results(self, doc) -> Dict[str, Dict[str, Union[int, List[str]]]]:
-        """
-        Parse the results from SpaCy and extract relevant details.
-        """
-        entities_info = defaultdict(lambda: {"count": 0, "texts": []})
-
-        for ent in doc.ents:
-            entity_type = ent.label_
-            detected_text = ent.text
-
-            if entity_type and detected_text:
-                entities_info[entity_type]["count"] += 1
-                entities_info[entity_type]["texts"].append(detected_text)
-
-        return dict(entities_info)
-
-    def _apply_regex_patterns(self, text: str) -> Dict[str, str]:
+    def _process_with_spacy(self, texts: List[str]) -> Dict[str, List[Dict[str, Union[str, Dict[str, Union[int, List[str]]]]]]]:
         """
-        Apply regex patterns to a text and return detected entities.
+        Process texts using SpaCy in the current process.
         """
-        detected_entities = {}
-        for entity_type, pattern in patterns.items():
-            matches = re.findall(pattern, str(text))
-            if matches:
-                detected_entities[entity_type] = ', '.join(matches)
-        return detected_entities
+        if self._matcher is None:
+            self._matcher = _build_matcher()
+        return {"results": _process_texts(self.nlp, self._matcher, texts, n_process=SPACY_N_PROCESS)}
 
-    def _process_with_spacy(self, texts: List[str]) -> Dict[str, List[Dict[str, Union[str, Dict[str, Union[int, List[str]]]]]]]:
+    def _sample_data(self, sample_data: List[str], sample_size: Union[int, float]) -> List[str]:
         """
-        Process texts using SpaCy.
+        Sample the data: a float is a fraction of the rows, an int an absolute number of rows.
         """
-        results = []
-        for text in texts:
-            text = text.strip()
-            print("=------->", text)
-            try:
-                doc = self.nlp(text)
-                spacy_results = self._parse_spacy_results(doc)
-                regex_results = self._apply_regex_patterns(text)
-                print(spacy_results, combined_result, "😂")
-                combined_result = {
-                    "text": text,
-                    "entity_detected_spacy": spacy_results,
-                    "entity_detected_regex": regex_results
-                }
-                results.append(combined_result)
-            except Exception as exc:
-                logger.warning(f"Error processing text with SpaCy model: '{ text}' - {exc}")
-                logger.debug(traceback.format_exc())
-                results.append({
-                    "text": text,
-                    "entity_detected_spacy": {},
-                    "entity_detected_regex": {}
-                })
+        if isinstance(sample_size, float):
+            sample_size = int(len(sample_data) * sample_size)
+        sample_size = max(1, min(sample_size, len(sample_data)))
+        return random.sample(sample_data, sample_size) if sample_size < len(sample_data) else sample_data
 
-        return {"results": results}
-
-    def scan(self, sample_data: List[str], chunk_size: int=100, sample_size: Optional[Union[int, float]]=None) -> Dict[str, List[Dict[str, Union[str, Dict[str, Union[int, List[str]]]]]]]:
+    def scan(self, sample_data: List[str], chunk_size: int=1000, sample_size: Optional[Union[int, float]]=None) -> Dict[str, List[Dict[str, Union[str, Dict[str, Union[int, List[str]]]]]]]:
         """
         Scan the input list of text using SpaCy and Regex models and return results.
         Can process only a sample of the data if sample_size is specified.
         """
-        start_time = time.time()  # Initialize start_time
+        start_time = time.perf_counter()
 
-        if sample_size:
+        if sample_size and sample_data:
             sample_data = self._sample_data(sample_data, sample_size)
 
-        # Split the data into chunks
+        # Split the data into chunks of plain strings; only these are sent to the workers
         chunks = [sample_data[i:i + chunk_size] for i in range(0, len(sample_data), chunk_size)]
 
-        # Determine the number of workers based on available CPUs and chunk sizexx
-        num_workers = min(cpu_count(), len(chunks))
-
-        # Process the chunks in parallel
-        with Pool(processes=num_workers) as pool:
-            results = pool.map(self._process_with_spacy, chunks)
+        self.worker_pool.start()
+        if self.worker_pool.running:
+            combined_results = self.worker_pool.map_chunks(chunks)
+        else:
+            combined_results = []
+            for chunk in chunks:
+                combined_results.extend(self._process_with_spacy(chunk).get("results", []))
 
-        # Combine results from all chunks
-        combined_results = []
-        for result in results:
-            combined_results.extend(result.get("results", []))
-
-        end_time = time.time()
-        processing_time = end_time - start_time
+        processing_time = time.perf_counter() - start_time
+        metrics.observe("structured_ner.column_scan_seconds", processing_time)
+        metrics.increment("structured_ner.cells_scanned", len(sample_data))
         logger.info(f"Total processing time: {processing_time:.2f} seconds")
 
         # Return combined results
         return {
             "results": combined_results
         }
-
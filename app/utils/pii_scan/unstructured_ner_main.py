@@ -2,12 +2,12 @@ import logging
 import os
 import time  # Import time module for capturing timestamps
 from typing import List, Dict
-from gliner import GLiNER
 from app.utils.pii_scan.spacy_ner import SpaCyNERProcessor
+from app.utils.model_registry import model_registry, GLINER_MODEL_DIR, GLINER_MODEL_NAME
 
 # Define the local directory path where the model will be saved
-model_dir = "local_pii_model"  # Local directory to store the model
-model_name = "urchade/gliner_multi_pii-v1"  # GLiNER model name or identifier
+model_dir = GLINER_MODEL_DIR  # Local directory to store the model
+model_name = GLINER_MODEL_NAME  # GLiNER model name or identifier
 
 # Setup logging
 logging.basicConfig(
@@ -31,27 +31,10 @@ class MLBasedNERScannerForUnStructuredData:
     def __init__(self):
         self.model_path = model_dir
         self.model_name = model_name
-        if not self._model_exists():
-            logger.info("Model not found locally. Downloading model from Hugging Face.")
-            self._download_model()
-        self.model = GLiNER.from_pretrained(self.model_name)
+        # Shared GLiNER model, downloaded to model_dir on first use and loaded once per process
+        self.model = model_registry.get("gliner_pii")
         self.spacy_processor = SpaCyNERProcessor()
 
-    def _model_exists(self) -> bool:
-        """
-        Check if the model files exist locally.
-        """
-        return os.path.isdir(self.model_path)
-
-    def _download_model(self):
-        """
-        Download the model and tokenizer from Hugging Face and save to local directory.
-        """
-        os.makedirs(self.model_path, exist_ok=True)
-        # Download the GLiNER model
-        GLiNER.from_pretrained(self.model_name, cache_dir=self.model_path)
-        logger.info(f"Model downloaded and cached to {self.model_path}.")
-
     def scan(self, texts: List[str]) -> Dict[str, Dict[str, List[Dict[str, str]]]]:
         """
         Scan the input list of texts using the GLiNER model and SpaCy.
@@ -0,0 +1,55 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class Readiness:
+    """
+    Warmup state of the components the service needs before it can take traffic.
+    Each component moves pending -> loading -> ready (or failed, with the error) as its warmup runs.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, name: str):
+        with self._lock:
+            self._components[name] = {"status": PENDING, "seconds": None, "error": None}
+
+    def run(self, name: str, warmup: Callable[[], Any]) -> bool:
+        """
+        Runs one component's warmup (blocking) and records the outcome. Returns True when it succeeded.
+        """
+        with self._lock:
+            self._components[name] = {"status": LOADING, "seconds": None, "error": None}
+        start_time = time.perf_counter()
+        try:
+            warmup()
+        except Exception as e:
+            seconds = round(time.perf_counter() - start_time, 3)
+            logger.error(f"Warmup of '{name}' failed after {seconds} seconds: {str(e)}")
+            with self._lock:
+                self._components[name] = {"status": FAILED, "seconds": seconds, "error": str(e)}
+            return False
+        seconds = round(time.perf_counter() - start_time, 3)
+        logger.info(f"'{name}' ready in {seconds} seconds")
+        with self._lock:
+            self._components[name] = {"status": READY, "seconds": seconds, "error": None}
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {name: dict(component) for name, component in self._components.items()}
+        return {"ready": bool(components) and all(c["status"] == READY for c in components.values()), "components": components}
+
+
+readiness = Readiness()
@@ -0,0 +1,133 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+from client_connect import Connection
+from app.utils.bulk_writer import insert_columns
+from app.utils.metrics import metrics
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Buffered rows of one table that trigger an immediate flush
+RESULT_WRITER_FLUSH_ROWS = int(os.getenv("RESULT_WRITER_FLUSH_ROWS", "1000"))
+# Milliseconds the oldest buffered row may wait before its table is flushed regardless of size
+RESULT_WRITER_FLUSH_MS = int(os.getenv("RESULT_WRITER_FLUSH_MS", "200"))
+# Set to "true" to send flushes with async_insert, so ClickHouse merges them further into its own batches
+CLICKHOUSE_ASYNC_INSERT = os.getenv("CLICKHOUSE_ASYNC_INSERT", "false").lower() == "true"
+
+
+class BufferedWriter:
+    """
+    Collects rows for one table from any thread or coroutine and writes them in a single columnar insert
+    once flush_rows rows are buffered, the oldest row has waited flush_ms, or the writer is closed.
+
+    add() returns a Future that completes (or fails) with the flush that wrote its rows, so a caller that
+    must know its rows are stored still waits for them, while concurrent callers share one insert.
+    """
+    def __init__(self, client, table: str, flush_rows: int = RESULT_WRITER_FLUSH_ROWS,
+                 flush_ms: int = RESULT_WRITER_FLUSH_MS, async_insert: bool = CLICKHOUSE_ASYNC_INSERT):
+        self.client = client
+        self.table = table
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_ms / 1000
+        # wait_for_async_insert keeps a completed flush meaning the rows are stored
+        self.settings = {"async_insert": 1, "wait_for_async_insert": 1} if async_insert else None
+        self._metric = f"result_writer.{table}"
+        self._cond = threading.Condition()
+        self._columns: Dict[str, List[Any]] = {}
+        self._row_count = 0
+        self._waiters: List[Future] = []
+        self._oldest: Optional[float] = None
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, columns: Mapping[str, Sequence[Any]]) -> Future:
+        """Buffers column-oriented rows; the returned Future completes once they are written."""
+        future = Future()
+        names = list(columns)
+        row_count = len(columns[names[0]]) if names else 0
+        if any(len(columns[name]) != row_count for name in names):
+            raise ValueError(f"All columns written to '{self.table}' must have the same length")
+        if not row_count:
+            future.set_result(None)
+            return future
+
+        with self._cond:
+            if self._closing:
+                raise RuntimeError(f"Writer for '{self.table}' is closed")
+            if self._columns and set(names) != set(self._columns):
+                raise ValueError(f"Rows written to '{self.table}' must all have the columns {sorted(self._columns)}")
+            for name in names:
+                self._columns.setdefault(name, []).extend(columns[name])
+            self._row_count += row_count
+            self._waiters.append(future)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"writer-{self.table}", daemon=True)
+                self._thread.start()
+            metrics.set_gauge(f"{self._metric}.queued_rows", self._row_count)
+            self._cond.notify()
+        return future
+
+    async def write(self, columns: Mapping[str, Sequence[Any]]) -> None:
+        """Buffers the rows and waits, without blocking the event loop, until their flush has finished."""
+        await asyncio.wrap_future(self.add(columns))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._row_count and (self._closing or self._row_count >= self.flush_rows
+                                            or time.monotonic() - self._oldest >= self.flush_seconds):
+                        break
+                    if self._closing:
+                        return
+                    timeout = self.flush_seconds - (time.monotonic() - self._oldest) if self._row_count else None
+                    self._cond.wait(timeout)
+                columns, row_count, waiters, oldest = self._columns, self._row_count, self._waiters, self._oldest
+                self._columns, self._row_count, self._waiters, self._oldest = {}, 0, [], None
+                metrics.set_gauge(f"{self._metric}.queued_rows", 0)
+            self._flush(columns, row_count, waiters, oldest)
+
+    def _flush(self, columns: Dict[str, List[Any]], row_count: int, waiters: List[Future], oldest: float):
+        start_time = time.perf_counter()
+        try:
+            insert_columns(self.client, self.table, columns, settings=self.settings)
+        except Exception as e:
+            # The callers learn about the failure through their futures; the rows are not retried here
+            logger.error(f"Could not write {row_count} buffered rows to '{self.table}': {str(e)}")
+            metrics.increment(f"{self._metric}.failed_rows", row_count)
+            for waiter in waiters:
+                waiter.set_exception(e)
+            return
+        metrics.observe(f"{self._metric}.flush_seconds", time.perf_counter() - start_time)
+        metrics.observe(f"{self._metric}.latency_seconds", time.monotonic() - oldest)
+        metrics.increment(f"{self._metric}.flushes")
+        metrics.increment(f"{self._metric}.rows_written", row_count)
+        metrics.set_gauge(f"{self._metric}.last_flush_rows", row_count)
+        for waiter in waiters:
+            waiter.set_result(None)
+        logger.debug(f"Flushed {row_count} buffered rows from {len(waiters)} writers to '{self.table}'")
+
+    def close(self, timeout: Optional[float] = None):
+        """Flushes whatever is buffered and stops the flush thread; later add() calls raise."""
+        with self._cond:
+            self._closing = True
+            thread = self._thread
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout)
+
+
+column_ner_writer = BufferedWriter(Connection.client, "column_ner_results")
+unstructured_ner_writer = BufferedWriter(Connection.client, "ner_unstructured_data")
+
+
+def close_result_writers():
+    for writer in (column_ner_writer, unstructured_ner_writer):
+        writer.close()
@@ -0,0 +1,35 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Number of worker processes scanning files; the instant scanner and MinIO folder jobs share them
+PII_SCAN_WORKERS = int(os.getenv("PII_SCAN_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_scan_executor = None
+_scan_executor_lock = threading.Lock()
+
+
+def get_scan_executor() -> ProcessPoolExecutor:
+    """
+    Returns the process pool that runs PII scans, creating it on first use.
+    Each worker process loads its own PIIScanner through the model registry on its first file.
+    """
+    global _scan_executor
+    with _scan_executor_lock:
+        if _scan_executor is None:
+            _scan_executor = ProcessPoolExecutor(max_workers=PII_SCAN_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"Started PII scan pool with {PII_SCAN_WORKERS} processes")
+        return _scan_executor
+
+
+def shutdown_scan_executor() -> None:
+    global _scan_executor
+    with _scan_executor_lock:
+        if _scan_executor is not None:
+            _scan_executor.shutdown(wait=False, cancel_futures=True)
+            _scan_executor = None
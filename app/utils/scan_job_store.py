@@ -0,0 +1,202 @@
+import os
+import socket
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+from app.utils.bulk_writer import insert_columns
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Manifest rows buffered before they are written; a crash rescans at most this many finished objects
+MINIO_MANIFEST_FLUSH_SIZE = int(os.getenv("MINIO_MANIFEST_FLUSH_SIZE", "20"))
+# Seconds between the state writes of a running job; they are its heartbeat
+SCAN_JOB_HEARTBEAT_SECONDS = float(os.getenv("SCAN_JOB_HEARTBEAT_SECONDS", "30"))
+# Seconds without a heartbeat after which another instance may resume a queued or running job
+SCAN_JOB_LEASE_SECONDS = float(os.getenv("SCAN_JOB_LEASE_SECONDS", "120"))
+# Seconds between recording a claim on an interrupted job and reading the claims back; must exceed the time an
+# insert takes to become visible on every replica the instances read from
+SCAN_JOB_CLAIM_SETTLE_SECONDS = float(os.getenv("SCAN_JOB_CLAIM_SETTLE_SECONDS", "5"))
+
+# Identifies this instance in the owner column of unstructured_scan_jobs; the suffix tells apart restarts
+# of a container that keep its host name and pid
+JOB_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+JOBS_TABLE = "unstructured_scan_jobs"
+MANIFEST_TABLE = "unstructured_scan_manifest_v2"
+CLAIMS_TABLE = "unstructured_scan_job_claims"
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+def normalize_etag(etag: Optional[str]) -> str:
+    # MinIO returns ETags quoted in some responses and unquoted in others
+    return (etag or "").strip('"')
+
+
+def save_job_state(client, job_id: str, bucket_name: str, folder_name: str, data_received, status: str,
+                   stats: Optional[Dict[str, Any]] = None, error: str = "", created_at: Optional[datetime] = None) -> None:
+    """
+    Appends the current state of a folder job to unstructured_scan_jobs, owned by this instance.
+    created_at is the job's original creation time; every state row carries it, since the latest row replaces the others.
+    Left out for a new job, it is set by the server, like updated_at on every row: the lease compares updated_at
+    with the server's clock and ReplacingMergeTree uses it as the version.
+    """
+    stats = stats or {}
+    columns = {
+        "job_id": [job_id],
+        "bucket_name": [bucket_name],
+        "folder_name": [folder_name],
+        "source_type": [data_received.source_type],
+        "source_bucket": [data_received.source_bucket],
+        "region": [data_received.region],
+        "message": [getattr(data_received, "message", "")],
+        "status": [status],
+        "processed_files": [stats.get("processed_files", 0)],
+        "skipped_files": [stats.get("skipped_files", 0)],
+        "failed_files": [stats.get("failed_files", 0)],
+        "error": [error],
+        "owner": [JOB_OWNER]
+    }
+    if created_at is not None:
+        columns["created_at"] = [created_at]
+    insert_columns(client, JOBS_TABLE, columns)
+
+
+def get_job(client, job_id: str) -> Optional[Dict[str, Any]]:
+    result = client.query(
+        f"SELECT * FROM {JOBS_TABLE} FINAL WHERE job_id = {{job_id:UUID}}",
+        parameters={"job_id": job_id}
+    )
+    if not result.result_rows:
+        return None
+    return dict(zip(result.column_names, result.result_rows[0]))
+
+
+def interrupted_jobs(client, lease_seconds: float = SCAN_JOB_LEASE_SECONDS) -> List[Dict[str, Any]]:
+    """
+    Jobs whose latest state is queued or running but whose owner has not written a heartbeat for lease_seconds,
+    i.e. that were cut short by a restart or a crash. heartbeat_ms identifies the stale state for claim_job.
+    """
+    result = client.query(
+        f"""
+        SELECT *, toUnixTimestamp64Milli(updated_at) AS heartbeat_ms FROM {JOBS_TABLE} FINAL
+        WHERE status IN ('{QUEUED}', '{RUNNING}') AND updated_at < now64(3) - toIntervalMillisecond({{lease_ms:UInt64}})
+        ORDER BY created_at
+        """,
+        parameters={"lease_ms": int(lease_seconds * 1000)}
+    )
+    return [dict(zip(result.column_names, row)) for row in result.result_rows]
+
+
+def record_claim(client, job: Dict[str, Any]) -> None:
+    """
+    Records this instance's claim on an interrupted job returned by interrupted_jobs.
+    Wait SCAN_JOB_CLAIM_SETTLE_SECONDS, then call claim_won.
+    """
+    insert_columns(client, CLAIMS_TABLE, {
+        "job_id": [job["job_id"]],
+        "heartbeat_ms": [job["heartbeat_ms"]],
+        "owner": [JOB_OWNER]
+    })
+
+
+def claim_won(client, job: Dict[str, Any]) -> bool:
+    """
+    True when this instance holds the earliest claim on the stale state of job and the job has not moved on
+    since. Instances that claimed the same state pick the same winner; a claim recorded after another instance
+    already won is later than the winner's. This relies on the settle delay covering insert visibility; the
+    heartbeat of process_files_from_minio stops a job whose owner has changed, in case it does not.
+    """
+    result = client.query(
+        f"""
+        SELECT argMin(owner, (claimed_at, owner)) FROM {CLAIMS_TABLE}
+        WHERE job_id = {{job_id:UUID}} AND heartbeat_ms = {{heartbeat_ms:Int64}}
+        """,
+        parameters={"job_id": str(job["job_id"]), "heartbeat_ms": job["heartbeat_ms"]}
+    )
+    if not result.result_rows or result.result_rows[0][0] != JOB_OWNER:
+        return False
+    current = client.query(
+        f"SELECT toUnixTimestamp64Milli(updated_at) FROM {JOBS_TABLE} FINAL WHERE job_id = {{job_id:UUID}}",
+        parameters={"job_id": str(job["job_id"])}
+    )
+    return bool(current.result_rows) and current.result_rows[0][0] == job["heartbeat_ms"]
+
+
+def completed_etags(client, bucket_name: str, folder_name: str) -> Dict[str, str]:
+    """
+    object_name -> ETag of the objects under folder_name whose latest manifest entry, over all jobs, is completed.
+    """
+    result = client.query(
+        f"""
+        SELECT object_name, argMax(etag, updated_at) FROM {MANIFEST_TABLE}
+        WHERE bucket_name = {{bucket_name:String}} AND startsWith(object_name, {{prefix:String}})
+        GROUP BY object_name
+        HAVING argMax(status, updated_at) = '{COMPLETED}'
+        """,
+        parameters={"bucket_name": bucket_name, "prefix": f"{folder_name}/"}
+    )
+    return {object_name: etag for object_name, etag in result.result_rows}
+
+
+def manifest_summary(client, job_id: str) -> Dict[str, int]:
+    """
+    Number of the job's objects per status. The manifest keeps a row per object and job, so later jobs on the
+    same objects leave these counts alone.
+    """
+    result = client.query(
+        f"SELECT status, count() FROM {MANIFEST_TABLE} FINAL WHERE job_id = {{job_id:UUID}} GROUP BY status",
+        parameters={"job_id": job_id}
+    )
+    return {status: count for status, count in result.result_rows}
+
+
+class ManifestWriter:
+    """
+    Buffers per-object manifest rows of one job and writes them in batches of MINIO_MANIFEST_FLUSH_SIZE.
+    updated_at is set by the server when a batch is written, so rows of different instances compare on one clock.
+    """
+    def __init__(self, client, job_id: str, bucket_name: str, flush_size: int = MINIO_MANIFEST_FLUSH_SIZE):
+        self.client = client
+        self.job_id = job_id
+        self.bucket_name = bucket_name
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        self._rows: List[Dict[str, Any]] = []
+
+    def add(self, object_name: str, etag: str, size: int, status: str, result_id: Optional[str] = None, error: str = "") -> bool:
+        """Buffers one row; returns True when the buffer is full and should be flushed."""
+        row = {
+            "object_name": object_name,
+            "etag": normalize_etag(etag),
+            "size": size,
+            "status": status,
+            "result_id": result_id,
+            "error": error
+        }
+        with self._lock:
+            self._rows.append(row)
+            return len(self._rows) >= self.flush_size
+
+    def flush(self) -> int:
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        columns = {name: [row[name] for row in rows] for name in rows[0]}
+        columns["bucket_name"] = [self.bucket_name] * len(rows)
+        columns["job_id"] = [self.job_id] * len(rows)
+        try:
+            insert_columns(self.client, MANIFEST_TABLE, columns)
+        except Exception:
+            with self._lock:
+                self._rows = rows + self._rows
+            raise
+        logger.info(f"Checkpointed {len(rows)} objects of job {self.job_id}")
+        return len(rows)
@@ -0,0 +1,180 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from importlib import metadata
+from typing import Any, Optional
+from app.utils.bulk_writer import insert_columns
+from app.utils.metrics import metrics
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Directory of the local (per host) result store
+SCAN_CACHE_DIR = os.getenv("SCAN_CACHE_DIR", "/tmp/dd_scan_cache")
+# Size limit of the local store; the least recently used entries are evicted above it
+SCAN_CACHE_MAX_BYTES = int(os.getenv("SCAN_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Set to "false" to always rescan
+SCAN_CACHE_ENABLED = os.getenv("SCAN_CACHE_ENABLED", "true").lower() == "true"
+
+SCAN_CACHE_TABLE = "scan_result_cache"
+
+HIT = "hit"
+MISS = "miss"
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """sha256 of a file on disk, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scanner_version() -> str:
+    """Installed pii-scanner version; part of the cache key so upgrades do not serve stale results."""
+    try:
+        return metadata.version("pii-scanner")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class ScanResultCache:
+    """
+    ner_results of previously scanned files, keyed by (content sha256, scanner version, region, sample size).
+    Entries live in a local directory bounded to SCAN_CACHE_MAX_BYTES (LRU by file mtime) and in the
+    scan_result_cache ClickHouse table, which lets other instances and restarts reuse them.
+    """
+    def __init__(self, cache_dir: str = SCAN_CACHE_DIR, max_bytes: int = SCAN_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version = scanner_version()
+        self._lock = threading.Lock()
+        self._local_bytes: Optional[int] = None
+
+    def cache_key(self, content_sha256: str, region: Any, sample_size: Any) -> str:
+        region = getattr(region, "value", region)
+        return hashlib.sha256(f"{content_sha256}|{self.version}|{region}|{sample_size}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read_local(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as entry:
+                ner_results = json.load(entry)["ner_results"]
+            # Touch the entry so eviction treats it as recently used
+            os.utime(path)
+            return ner_results
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_local(self, key: str, ner_results: Any):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps({"ner_results": ner_results, "scanner_version": self.version})
+        # Write to a temp name first so readers never see a partial entry
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as entry:
+            entry.write(payload)
+        with self._lock:
+            # Overwriting an entry only adds the difference; replacing under the lock keeps concurrent writers
+            # of one key from both counting the old size
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            os.replace(temp_path, path)
+            if self._local_bytes is not None:
+                self._local_bytes += len(payload) - old_size
+        self._evict_if_needed()
+
+    def _scan_local(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._local_bytes is None:
+                self._local_bytes = sum(size for _, size, _ in self._scan_local())
+            if self._local_bytes <= self.max_bytes:
+                return
+            entries = sorted(self._scan_local())
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+            self._local_bytes = total
+        metrics.increment("scan_cache.evictions", evicted)
+        metrics.set_gauge("scan_cache.local_bytes", total)
+        logger.info(f"Evicted {evicted} scan cache entries; local store is {total} bytes")
+
+    def get(self, client, content_sha256: str, region: Any, sample_size: Any) -> Optional[Any]:
+        """
+        Returns the cached ner_results of a file, or None. Looks in the local store first, then in ClickHouse.
+        """
+        if not SCAN_CACHE_ENABLED:
+            return None
+        key = self.cache_key(content_sha256, region, sample_size)
+        ner_results = self._read_local(key)
+        if ner_results is None:
+            try:
+                result = client.query(
+                    f"SELECT ner_results FROM {SCAN_CACHE_TABLE} FINAL WHERE cache_key = {{key:String}} LIMIT 1",
+                    parameters={"key": key}
+                )
+                if result.result_rows:
+                    ner_results = json.loads(result.result_rows[0][0])
+                    self._write_local(key, ner_results)
+            except Exception as e:
+                logger.error(f"Scan cache lookup in ClickHouse failed: {str(e)}")
+
+        metrics.increment("scan_cache.hits" if ner_results is not None else "scan_cache.misses")
+        return ner_results
+
+    def put(self, client, content_sha256: str, region: Any, sample_size: Any, ner_results: Any):
+        """
+        Stores the ner_results of a scanned file. Failures are logged; a missing entry only costs a rescan.
+        """
+        if not SCAN_CACHE_ENABLED:
+            return
+        key = self.cache_key(content_sha256, region, sample_size)
+        try:
+            self._write_local(key, ner_results)
+        except OSError as e:
+            logger.error(f"Could not write scan cache entry {key}: {str(e)}")
+        try:
+            insert_columns(client, SCAN_CACHE_TABLE, {
+                "cache_key": [key],
+                "content_sha256": [content_sha256],
+                "scanner_version": [self.version],
+                "region": [str(getattr(region, "value", region))],
+                "sample_size": [float(sample_size or 0)],
+                "ner_results": [json.dumps(ner_results)],
+                "created_at": [datetime.now()]
+            })
+        except Exception as e:
+            logger.error(f"Could not store scan cache entry {key} in ClickHouse: {str(e)}")
+
+
+scan_result_cache = ScanResultCache()
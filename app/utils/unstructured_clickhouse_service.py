@@ -1,26 +1,33 @@
 import os
 import json
+import time
+import asyncio
+import hashlib
 import logging
+import shutil
+import tempfile
 from pathlib import Path
 from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+from uuid import uuid4
 
 from minio import Minio
 from dotenv import load_dotenv
 from fastapi import HTTPException
-import nltk
 
 from client_connect import Connection
-from pii_scanner.scanner import PIIScanner
+from app.utils.model_registry import model_registry
 from pii_scanner.constants.patterns_countries import Regions
 from app.utils.common_utils import BaseFileProcessor
+from app.utils.result_writer import unstructured_ner_writer
+from app.utils.metrics import metrics
+from app.utils.scan_executor import PII_SCAN_WORKERS, get_scan_executor
+from app.utils.upload_storage import upload_workspace
+from app.utils.scan_result_cache import scan_result_cache, file_sha256, HIT, MISS
+from app.utils import scan_job_store
+from app.utils.scan_job_store import ManifestWriter, normalize_etag, RUNNING, COMPLETED, FAILED, SCAN_JOB_HEARTBEAT_SECONDS
 
 
-# Download necessary NLTK resources for natural language processing
-nltk.download('punkt')
-nltk.download('punkt_tab')
-nltk.download('stopwords')
-nltk.download('averaged_perceptron_tagger_eng')
-
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -31,6 +38,109 @@ TEMP_FOLDER = Path(__file__).resolve().parent.parent / 'utils/pii_scan/temp_file
 if not TEMP_FOLDER.exists():
     TEMP_FOLDER.mkdir(parents=True, exist_ok=True)
 
+# Fraction of each file sampled by the PII scanner; part of the scan result cache key
+UNSTRUCTURED_SCAN_SAMPLE_SIZE = 0.2
+
+# Objects downloaded at the same time by one MinIO folder job
+MINIO_DOWNLOAD_WORKERS = int(os.getenv("MINIO_DOWNLOAD_WORKERS", "4"))
+# Files of one folder job scanned at the same time (on the shared PII scan process pool)
+MINIO_SCAN_CONCURRENCY = int(os.getenv("MINIO_SCAN_CONCURRENCY", str(PII_SCAN_WORKERS)))
+# Downloaded files waiting for a scan; downloads pause while this many are queued
+MINIO_PREFETCH_FILES = int(os.getenv("MINIO_PREFETCH_FILES", "8"))
+# Objects up to this size are read into memory; larger ones are spooled to TEMP_FOLDER
+MINIO_IN_MEMORY_MAX_BYTES = int(os.getenv("MINIO_IN_MEMORY_MAX_BYTES", str(8 * 1024 * 1024)))
+# Set to "false" to keep scanned objects in the bucket; unchanged objects are then skipped by later runs
+MINIO_DELETE_AFTER_SCAN = os.getenv("MINIO_DELETE_AFTER_SCAN", "true").lower() == "true"
+
+
+async def scan_file_ner_results(file_path: str, file_type: str, file_name: str) -> dict:
+    """
+    Runs the PII scanner on the file and summarises the detected entities.
+    """
+    entity_counts = defaultdict(int)
+    total_entities = 0
+
+    json_result = await model_registry.get("pii_scanner").scan(str(file_path), sample_size=UNSTRUCTURED_SCAN_SAMPLE_SIZE, region=Regions.IN)
+ 
+    if not json_result:
+        logger.error(f"No PII detected in the file {file_name} ({file_type}).")
+        raise ValueError("No PII data detected in the file.")
+
+    # Check if json_result is a list
+    if isinstance(json_result, list):
+        # Process document file results
+        for result in json_result:
+            if isinstance(result, dict) and "entity_detected" in result:
+                detected_entities = result["entity_detected"]
+                if isinstance(detected_entities, list):
+                    for entity in detected_entities:
+                        if isinstance(entity, dict):
+                            entity_type = entity.get("type")
+                            if entity_type:
+                                entity_counts[entity_type] += 1
+                                total_entities += 1
+                                
+            # Process image file results
+            elif isinstance(result, dict) and "file_path" in result:
+                pii_class = result.get("pii_class")
+                if pii_class:
+                    entity_counts[pii_class] += 1
+                    total_entities += 1
+                    # Log additional information if needed
+                    logger.info(f"Detected PII: {pii_class}, Score: {result.get('score')}, Country: {result.get('country_of_origin')}")
+
+    # Check if json_result stuctured is a dictionary
+    elif isinstance(json_result, dict):
+        for _, data in json_result.items():
+            if isinstance(data, dict) and isinstance(data.get("results"), list):
+                for result in data["results"]:
+                    detected_entities = result.get("entity_detected", [])
+                    if isinstance(detected_entities, list):
+                        for entity in detected_entities:
+                            entity_type = entity.get("type")
+                            if entity_type:
+                                entity_counts[entity_type] += 1
+                                total_entities += 1
+
+    # Prepare NER results
+    if entity_counts:
+        highest_label = max(entity_counts.items(), key=lambda x: x[1])[0]
+        confidence_score = round(max(entity_counts.values()) / total_entities, 2)
+        ner_results = {
+            'highest_label': highest_label,
+            'confidence_score': confidence_score,
+            'detected_entities': dict(entity_counts)
+        }
+    else:
+        ner_results = {
+            'highest_label': "NA",
+            'confidence_score': 0.00,
+            'detected_entities': "{ NA }"
+        }
+
+    return ner_results
+
+
+def _scan_object_in_worker(file_name: str, file_type: str, file_path: Optional[str] = None, content: Optional[bytes] = None) -> Dict[str, Any]:
+    """
+    Runs in a scan worker process: scans one downloaded object, given either as a path or as its bytes.
+    The scanner only reads files, so in-memory objects are written to a private temp directory first.
+    Errors are returned as plain messages, since HTTPException does not pickle back to the parent.
+    """
+    try:
+        if content is None:
+            return {"ner_results": asyncio.run(scan_file_ner_results(file_path, file_type, file_name))}
+        with upload_workspace(str(TEMP_FOLDER)) as work_dir:
+            file_path = os.path.join(work_dir, file_name)
+            with open(file_path, "wb") as object_file:
+                object_file.write(content)
+            return {"ner_results": asyncio.run(scan_file_ner_results(file_path, file_type, file_name))}
+    except HTTPException as e:
+        return {"error": str(e.detail)}
+    except Exception as e:
+        return {"error": str(e)}
+
+
 class UnstructuredFileProcessor(BaseFileProcessor):
     """
     A class to encapsulate processing of unstructured files, applying NER and updating results in ClickHouse.
@@ -54,70 +164,256 @@ class UnstructuredFileProcessor(BaseFileProcessor):
             secure=self.MINIO_SECURE
         )
 
-        # Initialize the PII scanner
-        self.scanner = PIIScanner()
-
-    async def process_files_from_minio(self, bucket_name: str, folder_name: str, data_received):
+    async def process_files_from_minio(self, bucket_name: str, folder_name: str, data_received, job_id: Optional[str] = None):
         """
         Lists and processes files from a specified MinIO bucket and folder.
-        Downloads each file, processes it with NER, and then deletes it from MinIO.
+        Downloads each file, processes it with NER, and then deletes it from MinIO (see MINIO_DELETE_AFTER_SCAN).
+
+        The job's state is kept in unstructured_scan_jobs and every object is checkpointed in
+        unstructured_scan_manifest with its ETag. Objects whose latest checkpoint is completed with the same
+        ETag are skipped, so a resumed job (same job_id) or a re-run on the folder only scans what changed.
+        While it runs, the job's state is rewritten every SCAN_JOB_HEARTBEAT_SECONDS as its heartbeat. If another
+        instance has taken the job over in the meantime, the heartbeat stops the pipeline instead, and the job's
+        state is left to the new owner.
+
+        Runs as a pipeline so downloads overlap with scanning: the lister feeds a bounded queue of objects,
+        MINIO_DOWNLOAD_WORKERS download them into a queue of at most MINIO_PREFETCH_FILES files, and
+        MINIO_SCAN_CONCURRENCY consumers scan those on the PII scan process pool. Returns counts, scan cache
+        hits/misses and throughput.
         """
+        job_id = job_id or str(uuid4())
+        listed = asyncio.Queue(maxsize=MINIO_DOWNLOAD_WORKERS * 2)
+        downloaded = asyncio.Queue(maxsize=MINIO_PREFETCH_FILES)
+        stats = {"job_id": job_id, "processed_files": 0, "skipped_files": 0, "failed_files": 0, "bytes": 0,
+                 "cache": {"hits": 0, "misses": 0}}
+        start_time = time.perf_counter()
+        manifest = ManifestWriter(Connection.client, job_id, bucket_name)
+        created_at = None
+
+        async def save_state(status: str, error: str = ""):
+            await Connection.async_client.run(scan_job_store.save_job_state, Connection.client, job_id, bucket_name,
+                                              folder_name, data_received, status, stats, error, created_at)
+
+        stopped = asyncio.Event()
+        # Set when another instance owns the job; the pipeline is then cancelled and no state is written
+        taken_over = asyncio.Event()
+
+        async def heartbeat():
+            while True:
+                try:
+                    await asyncio.wait_for(stopped.wait(), SCAN_JOB_HEARTBEAT_SECONDS)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+                try:
+                    job = await Connection.async_client.run(scan_job_store.get_job, Connection.client, job_id)
+                    if job is not None and job["owner"] != scan_job_store.JOB_OWNER:
+                        logger.warning(f"Job {job_id} was taken over by {job['owner']}; stopping it here")
+                        taken_over.set()
+                        pipeline.cancel()
+                        return
+                    await save_state(RUNNING)
+                except Exception as e:
+                    logger.warning(f"Could not write the heartbeat of job {job_id}: {str(e)}")
+
+        async def checkpoint(object_name: str, etag: str, size: int, status: str, result_id: Optional[str] = None, error: str = ""):
+            if manifest.add(object_name, etag, size, status, result_id, error):
+                await Connection.async_client.run(manifest.flush)
+
         try:
-            objects = self.minio_client.list_objects(bucket_name, prefix=f"{folder_name}/", recursive=True)
-            for obj in objects:
-                file_name = obj.object_name
-                file_extension = file_name.split(".")[-1].lower()
+            # Queued and resumed jobs keep the creation time of their first state row
+            job = await Connection.async_client.run(scan_job_store.get_job, Connection.client, job_id)
+            if job is not None:
+                created_at = job["created_at"]
+            await save_state(RUNNING)
+            done_etags = await Connection.async_client.run(scan_job_store.completed_etags, Connection.client, bucket_name, folder_name)
+        except Exception as e:
+            logger.error(f"Could not start job {job_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error during file processing: {str(e)}")
 
-                logger.info(f"Processing file: {file_name}")
+        async def list_objects():
+            objects = self.minio_client.list_objects(bucket_name, prefix=f"{folder_name}/", recursive=True)
+            while True:
+                # list_objects pages lazily over HTTP; fetch each item off the event loop
+                obj = await asyncio.to_thread(next, objects, None)
+                if obj is None:
+                    return
+                file_extension = obj.object_name.split(".")[-1].lower()
                 if file_extension not in self.UNSTRUCTURED_FILE_FORMATS and file_extension not in self.STRUCTURED_FILE_FORMATS:
-                    logger.warning(f"File {file_name} has an unsupported format. Skipping it.")
+                    logger.warning(f"File {obj.object_name} has an unsupported format. Skipping it.")
                     continue
-
-                temp_file_path = TEMP_FOLDER / file_name.split("/")[-1]
-                self.minio_client.fget_object(bucket_name, file_name, str(temp_file_path))
-
-                try:
-                    await self.process_ner_for_file(temp_file_path, data_received)
-                    self.minio_client.remove_object(bucket_name, file_name)
-                    logger.info(f"Successfully deleted file: {file_name} from MinIO.")
-                except Exception as ner_error:
-                    logger.error(f"NER processing failed for file {file_name}: {str(ner_error)}")
+                if done_etags.get(obj.object_name) == normalize_etag(obj.etag):
+                    stats["skipped_files"] += 1
                     continue
+                await listed.put(obj)
 
-                if temp_file_path.exists():
-                    os.remove(temp_file_path)
-                    logger.info(f"Deleted local temp file: {temp_file_path}")
-
+        async def download_objects():
+            while (obj := await listed.get()) is not None:
+                try:
+                    await downloaded.put(await asyncio.to_thread(self._download_object, bucket_name, obj))
+                except Exception as e:
+                    stats["failed_files"] += 1
+                    logger.error(f"Download of {obj.object_name} failed: {str(e)}")
+                    await checkpoint(obj.object_name, obj.etag, obj.size or 0, FAILED, error=str(e))
+
+        async def scan_objects():
+            while (item := await downloaded.get()) is not None:
+                try:
+                    cache_status, result_id = await self._process_downloaded_object(bucket_name, item, data_received)
+                    stats["processed_files"] += 1
+                    stats["bytes"] += item["size"]
+                    stats["cache"]["hits" if cache_status == HIT else "misses"] += 1
+                    await checkpoint(item["object_name"], item["etag"], item["size"], COMPLETED, result_id)
+                except Exception as e:
+                    stats["failed_files"] += 1
+                    logger.error(f"NER processing failed for file {item['object_name']}: {str(e)}")
+                    await checkpoint(item["object_name"], item["etag"], item["size"], FAILED, error=str(e))
+                finally:
+                    if item["work_dir"]:
+                        shutil.rmtree(item["work_dir"], ignore_errors=True)
+
+        async def run_pipeline():
+            try:
+                await list_objects()
+            finally:
+                # A job taken over is abandoned, not drained; its workers are cancelled below
+                if not taken_over.is_set():
+                    for _ in downloaders:
+                        await listed.put(None)
+                    await asyncio.gather(*downloaders)
+                    for _ in scanners:
+                        await downloaded.put(None)
+                    await asyncio.gather(*scanners)
+
+        downloaders = [asyncio.create_task(download_objects()) for _ in range(MINIO_DOWNLOAD_WORKERS)]
+        scanners = [asyncio.create_task(scan_objects()) for _ in range(MINIO_SCAN_CONCURRENCY)]
+        pipeline = asyncio.create_task(run_pipeline())
+        heartbeat_task = asyncio.create_task(heartbeat())
+        try:
+            try:
+                await pipeline
+            finally:
+                # Stopped before the final state is written, so a late heartbeat cannot mark the job running again
+                stopped.set()
+                await asyncio.gather(heartbeat_task, return_exceptions=True)
+            await Connection.async_client.run(manifest.flush)
+            await save_state(COMPLETED)
+        except asyncio.CancelledError:
+            if not taken_over.is_set():
+                raise
+            for task in downloaders + scanners:
+                task.cancel()
+            # The objects finished here are still this job's; the new owner skips them
+            await Connection.async_client.run(manifest.flush)
+            stats["taken_over"] = True
+            logger.info(f"Stopped job {job_id} after it was taken over: {stats}")
+            return stats
         except Exception as e:
+            for task in downloaders + scanners + [heartbeat_task]:
+                task.cancel()
             logger.error(f"Error during file processing: {e}")
+            try:
+                await Connection.async_client.run(manifest.flush)
+                await save_state(FAILED, str(e))
+            except Exception as save_error:
+                logger.error(f"Could not record failure of job {job_id}: {str(save_error)}")
             raise HTTPException(status_code=500, detail=f"Error during file processing: {str(e)}")
 
-    async def process_ner_for_file(self, file_path: Path, data_received):
+        elapsed = time.perf_counter() - start_time
+        stats["seconds"] = round(elapsed, 3)
+        stats["files_per_second"] = round(stats["processed_files"] / elapsed, 3) if elapsed else 0.0
+        stats["mb_per_second"] = round(stats["bytes"] / (1024 * 1024) / elapsed, 3) if elapsed else 0.0
+        metrics.increment("minio_pipeline.files", stats["processed_files"])
+        metrics.increment("minio_pipeline.failed_files", stats["failed_files"])
+        metrics.increment("minio_pipeline.bytes", stats["bytes"])
+        metrics.observe("minio_pipeline.job_seconds", elapsed)
+        metrics.set_gauge("minio_pipeline.files_per_second", stats["files_per_second"])
+        metrics.set_gauge("minio_pipeline.mb_per_second", stats["mb_per_second"])
+        logger.info(f"Processed {bucket_name}/{folder_name}: {stats}")
+        return stats
+
+    def _download_object(self, bucket_name: str, obj) -> Dict[str, Any]:
         """
-        Processes a file with NER.
-        Extracts metadata from the file and delegates processing to the NER functions.
+        Fetches one object (blocking; runs on a download thread). Small objects are kept in memory,
+        larger ones are written to a private directory under TEMP_FOLDER.
         """
-        file_name = file_path.name
-        file_size = file_path.stat().st_size
-        file_type = file_name.split(".")[-1].upper()
-
-        logger.info(f"Processing file: {file_name}, Size: {file_size} bytes, Type: {file_type}")
-
+        file_name = os.path.basename(obj.object_name)
+        if (obj.size or 0) <= MINIO_IN_MEMORY_MAX_BYTES:
+            response = self.minio_client.get_object(bucket_name, obj.object_name)
+            try:
+                content = response.read()
+            finally:
+                response.close()
+                response.release_conn()
+            return {"object_name": obj.object_name, "etag": obj.etag, "file_name": file_name, "size": len(content),
+                    "sha256": hashlib.sha256(content).hexdigest(), "content": content, "path": None, "work_dir": None}
+
+        # Each download gets its own directory, so objects with the same base name do not overwrite each other
+        work_dir = tempfile.mkdtemp(dir=TEMP_FOLDER)
+        file_path = os.path.join(work_dir, file_name)
+        try:
+            self.minio_client.fget_object(bucket_name, obj.object_name, file_path)
+            return {"object_name": obj.object_name, "etag": obj.etag, "file_name": file_name, "size": os.path.getsize(file_path),
+                    "sha256": file_sha256(file_path), "content": None, "path": file_path, "work_dir": work_dir}
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+
+    async def _process_downloaded_object(self, bucket_name: str, item: Dict[str, Any], data_received) -> Tuple[str, str]:
+        """
+        Scans one downloaded object (unless its content is in the scan result cache), saves the results
+        and deletes the object from MinIO. Returns whether the scan cache was hit and the id of the saved row.
+        """
+        file_name = item["file_name"]
+        metadata = self._build_metadata(file_name, item["size"], data_received)
+        logger.info(f"Processing file: {file_name}, Size: {item['size']} bytes, Type: {metadata['file_type']}")
+
+        ner_results = await Connection.async_client.run(scan_result_cache.get, Connection.client, item["sha256"], Regions.IN, UNSTRUCTURED_SCAN_SAMPLE_SIZE)
+        metadata["scan_cache"] = HIT if ner_results is not None else MISS
+        if ner_results is None:
+            loop = asyncio.get_running_loop()
+            outcome = await loop.run_in_executor(
+                get_scan_executor(), _scan_object_in_worker, file_name, metadata["file_type"], item["path"], item["content"]
+            )
+            if "error" in outcome:
+                raise ValueError(outcome["error"])
+            ner_results = outcome["ner_results"]
+            await Connection.async_client.run(scan_result_cache.put, Connection.client, item["sha256"], Regions.IN, UNSTRUCTURED_SCAN_SAMPLE_SIZE, ner_results)
+
+        result_id = await self._save_ner_results(ner_results, metadata)
+
+        if MINIO_DELETE_AFTER_SCAN:
+            await asyncio.to_thread(self.minio_client.remove_object, bucket_name, item["object_name"])
+            logger.info(f"Successfully deleted file: {item['object_name']} from MinIO.")
+        return metadata["scan_cache"], result_id
+
+    def _build_metadata(self, file_name: str, file_size: int, data_received) -> dict:
         # Extract source and sub-service from the provided data
         source_parts = data_received.source_type.split(',')
         source = source_parts[0].strip() if source_parts else "N/A"
         sub_service = source_parts[1].strip() if len(source_parts) > 1 else "N/A"
 
-        metadata = {
+        return {
             "source_bucket": data_received.source_bucket,
             "file_name": file_name,
             "file_size": file_size,
-            "file_type": file_type,
+            "file_type": file_name.split(".")[-1].upper(),
             "source": source,
             "sub_service": sub_service,
             "region": data_received.region,
         }
 
+    async def process_ner_for_file(self, file_path: Path, data_received):
+        """
+        Processes a local file with NER in this process.
+        Extracts metadata from the file and delegates processing to the NER functions.
+        """
+        file_name = file_path.name
+        metadata = self._build_metadata(file_name, file_path.stat().st_size, data_received)
+        file_type = metadata["file_type"]
+
+        logger.info(f"Processing file: {file_name}, Size: {metadata['file_size']} bytes, Type: {file_type}")
+
         try:
             results = await self.process_and_update_ner_results_unstructured(file_path, file_type, file_name, metadata)
             if not results:
@@ -128,121 +424,65 @@ class UnstructuredFileProcessor(BaseFileProcessor):
             logger.error(f"Error processing file {file_name}: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error during NER processing: {str(e)}")
 
-
     async def process_and_update_ner_results_unstructured(self, file_path: Path, file_type: str, file_name: str, metadata: dict):
         """
         Applies the NER scanner on the file and updates the results in ClickHouse.
+        Files whose content was scanned before reuse the cached results; metadata["scan_cache"] says which.
         """
-        entity_counts = defaultdict(int)
-        total_entities = 0
-        ner_results = 'NA'
-
         try:
-            json_result = await self.scanner.scan(str(file_path), sample_size=0.2, region=Regions.IN)
-         
-            if not json_result:
-                logger.error(f"No PII detected in the file {file_name} ({file_type}).")
-                raise ValueError("No PII data detected in the file.")
-
-            # Check if json_result is a list
-            if isinstance(json_result, list):
-                # Process document file results
-                for result in json_result:
-                    if isinstance(result, dict) and "entity_detected" in result:
-                        detected_entities = result["entity_detected"]
-                        if isinstance(detected_entities, list):
-                            for entity in detected_entities:
-                                if isinstance(entity, dict):
-                                    entity_type = entity.get("type")
-                                    if entity_type:
-                                        entity_counts[entity_type] += 1
-                                        total_entities += 1
-                                        
-                    # Process image file results
-                    elif isinstance(result, dict) and "file_path" in result:
-                        pii_class = result.get("pii_class")
-                        if pii_class:
-                            entity_counts[pii_class] += 1
-                            total_entities += 1
-                            # Log additional information if needed
-                            logger.info(f"Detected PII: {pii_class}, Score: {result.get('score')}, Country: {result.get('country_of_origin')}")
-
-            # Check if json_result stuctured is a dictionary
-            elif isinstance(json_result, dict):
-                for _, data in json_result.items():
-                    if isinstance(data, dict) and isinstance(data.get("results"), list):
-                        for result in data["results"]:
-                            detected_entities = result.get("entity_detected", [])
-                            if isinstance(detected_entities, list):
-                                for entity in detected_entities:
-                                    entity_type = entity.get("type")
-                                    if entity_type:
-                                        entity_counts[entity_type] += 1
-                                        total_entities += 1
-
-            # Prepare NER results
-            if entity_counts:
-                highest_label = max(entity_counts.items(), key=lambda x: x[1])[0]
-                confidence_score = round(max(entity_counts.values()) / total_entities, 2)
-                ner_results = {
-                    'highest_label': highest_label,
-                    'confidence_score': confidence_score,
-                    'detected_entities': dict(entity_counts)
-                }
-            else:
-                ner_results = {
-                    'highest_label': "NA",
-                    'confidence_score': 0.00,
-                    'detected_entities': {"NA"}
-                }
-
-            logger.info(f"NER results: {ner_results}")
-
-            # Assuming you have a function to fetch data element category
-            data_element = await self.fetch_data_element_category(highest_label)
-
-            # Save the results (assuming you have a method for this)
-            self.save_unstructured_ner_data(ner_results, metadata, data_element, highest_label)
-
+            content_sha256 = await asyncio.to_thread(file_sha256, str(file_path))
+            ner_results = await Connection.async_client.run(scan_result_cache.get, Connection.client, content_sha256, Regions.IN, UNSTRUCTURED_SCAN_SAMPLE_SIZE)
+            metadata["scan_cache"] = HIT if ner_results is not None else MISS
+            if ner_results is None:
+                ner_results = await scan_file_ner_results(str(file_path), file_type, file_name)
+                await Connection.async_client.run(scan_result_cache.put, Connection.client, content_sha256, Regions.IN, UNSTRUCTURED_SCAN_SAMPLE_SIZE, ner_results)
+
+            await self._save_ner_results(ner_results, metadata)
             return True
 
         except Exception as e:
             logger.error(f"Error processing file {file_name}--{file_type}: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error during NER processing: {str(e)}")
-    
-    def save_unstructured_ner_data(self, ner_results, metadata, data_element, detected_entity):
+
+    async def _save_ner_results(self, ner_results: dict, metadata: dict) -> str:
+        """Looks up the data element of the top entity and saves the row; returns its id."""
+        logger.info(f"NER results: {ner_results}")
+        highest_label = ner_results['highest_label']
+
+        # Assuming you have a function to fetch data element category
+        data_element = await self.fetch_data_element_category(highest_label)
+
+        # Save the results (assuming you have a method for this)
+        return await self.save_unstructured_ner_data(ner_results, metadata, data_element, highest_label)
+
+    async def save_unstructured_ner_data(self, ner_results, metadata, data_element, detected_entity):
         """
-        Saves the NER results and associated metadata into the ClickHouse database.
+        Saves the NER results and associated metadata into the ClickHouse database and returns the id of the row.
+        The row is batched with other files' rows by the buffered writer; this returns once it has been written.
         """
         if not ner_results:
             logger.error("No PII data detected in the file.")
             raise ValueError("No PII data detected")
         ner_results_json = json.dumps(ner_results)
-        data_to_insert = {
-            "source_bucket": metadata.get("source_bucket"),
-            "file_name": metadata.get("file_name"),
-            "json": ner_results_json,
-            "detected_entity": detected_entity,
-            "data_element": data_element,
-            "file_size": metadata.get("file_size"),
-            "file_type": metadata.get("file_type"),
-            "source": metadata.get("source"),
-            "sub_service": metadata.get("sub_service"),
-            "region": metadata.get("region")
+        row_id = str(uuid4())
+        columns = {
+            "id": [row_id],
+            "source_bucket": [metadata.get("source_bucket")],
+            "file_name": [metadata.get("file_name")],
+            "json": [ner_results_json],
+            "detected_entity": [detected_entity],
+            "data_element": [data_element],
+            "file_size": [metadata.get("file_size")],
+            "file_type": [metadata.get("file_type")],
+            "source": [metadata.get("source")],
+            "sub_service": [metadata.get("sub_service")],
+            "region": [metadata.get("region")]
         }
 
-        connection = Connection()
-        client = connection.client
         try:
-            insert_query = """
-            INSERT INTO ner_unstructured_data 
-            (source_bucket, file_name, json, detected_entity, data_element, file_size, file_type, source, sub_service, region)
-            VALUES 
-            (%(source_bucket)s, %(file_name)s, %(json)s, %(detected_entity)s, %(data_element)s, %(file_size)s, %(file_type)s, %(source)s, %(sub_service)s, %(region)s)
-            """
-            client.command(insert_query, data_to_insert)
+            await unstructured_ner_writer.write(columns)
             logger.info("Successfully inserted data into the ner_unstructured_data table.")
-            return True
+            return row_id
         except Exception as e:
             logger.error(f"Error inserting data into the database: {e}")
             raise HTTPException(status_code=500, detail="Error inserting data into the database")
@@ -0,0 +1,87 @@
+import os
+import shutil
+import asyncio
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple
+from fastapi import UploadFile, HTTPException
+from app.utils.metrics import metrics
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Bytes read from an upload and written to disk per step
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Largest accepted upload per file; bigger files are rejected with 413
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(512 * 1024 * 1024)))
+# Parent directory of the per-request upload directories
+UPLOAD_TEMP_DIR = os.getenv("UPLOAD_TEMP_DIR", os.path.join(tempfile.gettempdir(), "dd_uploads"))
+
+
+class StoredUpload(NamedTuple):
+    path: str
+    filename: str
+    size: int
+    sha256: str
+
+
+def _unique_path(directory: str, filename: str) -> str:
+    """Path for filename inside directory, suffixed with _1, _2, ... if the name is already taken."""
+    name, extension = os.path.splitext(filename)
+    path = os.path.join(directory, filename)
+    counter = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f"{name}_{counter}{extension}")
+        counter += 1
+    return path
+
+
+async def spool_upload(file: UploadFile, directory: str, max_bytes: int = UPLOAD_MAX_BYTES) -> StoredUpload:
+    """
+    Copies an upload into directory in UPLOAD_CHUNK_SIZE pieces, hashing it on the way, so the file is
+    never held in memory as a whole. Raises HTTPException 413 (and removes the partial file) above max_bytes.
+    """
+    # Only the base name is kept; client supplied paths must not escape the directory
+    filename = os.path.basename(file.filename or "") or "upload"
+    path = _unique_path(directory, filename)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File '{filename}' exceeds the upload limit of {max_bytes} bytes."
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    metrics.increment("uploads.files")
+    metrics.increment("uploads.bytes", size)
+    logger.info(f"Stored upload '{filename}' ({size} bytes) at {path}")
+    return StoredUpload(path=path, filename=os.path.basename(path), size=size, sha256=digest.hexdigest())
+
+
+@contextmanager
+def upload_workspace(base_dir: str = UPLOAD_TEMP_DIR) -> Iterator[str]:
+    """
+    Creates a directory private to one request (or job) and removes it with its files on exit,
+    so concurrent uploads of files with the same name never collide.
+    """
+    os.makedirs(base_dir, exist_ok=True)
+    directory = tempfile.mkdtemp(dir=base_dir)
+    try:
+        yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,70 @@
+# Benchmark: row-tuple inserts versus the columnar bulk writer for profiler_data_time_series.
+#
+# Writes into a scratch copy of profiler_data_time_series that is dropped afterwards, e.g.
+#   python -m benchmarks.bulk_insert_benchmark --rows 1000000
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from client_connect import Connection
+from app.utils.bulk_writer import insert_columns, insert_dataframe
+
+BENCH_TABLE = "profiler_data_time_series_bench"
+
+
+def build_profiler_rows(row_count: int) -> pd.DataFrame:
+    """Builds synthetic tableProfile rows for 1000 tables, one profile per table per minute."""
+    profile_json = json.dumps({"rowCount": 1200.0, "sizeInByte": 65536.0, "columnCount": 12.0, "profileSample": 100.0})
+    start_ms = int(time.time() * 1000) - row_count * 60_000
+    return pd.DataFrame({
+        "entityFQNHash": [f"svc.db.schema.table{i % 1000}" for i in range(row_count)],
+        "extension": "table.tableProfile",
+        "jsonSchema": "tableProfile",
+        "json": profile_json,
+        "operation": "",
+        "timestamp": np.arange(row_count, dtype=np.uint64) * 60_000 + start_ms,
+    })
+
+
+def tuple_path(client, data: pd.DataFrame, batch_size: int = 1000):
+    """The previous write path: to_records().tolist() and one insert per 1000 rows."""
+    for i in range(0, len(data), batch_size):
+        batch = data.iloc[i:i + batch_size]
+        client.insert(BENCH_TABLE, batch.to_records(index=False).tolist(), column_names=list(batch.columns))
+
+
+def columns_path(client, data: pd.DataFrame):
+    insert_columns(client, BENCH_TABLE, {name: data[name].to_numpy() for name in data.columns})
+
+
+def dataframe_path(client, data: pd.DataFrame):
+    insert_dataframe(client, BENCH_TABLE, data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ClickHouse insert paths")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    client = Connection.client
+    data = build_profiler_rows(args.rows)
+    client.command(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    client.command(f"CREATE TABLE {BENCH_TABLE} AS profiler_data_time_series")
+    try:
+        print(f"{'path':<12}{'seconds':>10}{'rows/s':>14}")
+        for name, path in (("tuples", tuple_path), ("columns", columns_path), ("dataframe", dataframe_path)):
+            client.command(f"TRUNCATE TABLE {BENCH_TABLE}")
+            start = time.perf_counter()
+            path(client, data)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<12}{elapsed:>10.2f}{round(args.rows / elapsed):>14}")
+    finally:
+        client.command(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+
+
+if __name__ == "__main__":
+    main()
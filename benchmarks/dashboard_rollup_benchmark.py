@@ -0,0 +1,143 @@
+# Benchmark: dashboard view latency over the raw tables versus the materialized rollups (migrations/015.sql).
+#
+# Fills column_ner_results, profiler_data_time_series and ner_unstructured_data with --rows synthetic rows
+# (split 30/40/30; the materialized views populate the rollups as the rows are inserted), then times the
+# previous raw-table definition of each dashboard view against the current view. Raw queries running longer
+# than --timeout seconds are reported as timed out. Run against a disposable database, e.g.
+#   CLICKHOUSE_DATABASE=dashboard_bench python migrate.py
+#   CLICKHOUSE_DATABASE=dashboard_bench python -m benchmarks.dashboard_rollup_benchmark --rows 10000000
+
+import argparse
+import time
+
+from client_connect import Connection
+
+SERVICES = 50
+TABLES = 20_000
+
+# The view definitions before the rollups, reading the raw tables (the CASE that strips a suffix from
+# dbservice_entity_id is left out; the synthetic ids have none)
+RAW_QUERIES = {
+    "structured_view_data_element_types": """
+        SELECT c.detected_entity, COUNT(DISTINCT c.id), COUNT(DISTINCT c.column_name), COUNT(DISTINCT t.id),
+            COUNT(DISTINCT splitByString('.', p.entityFQNHash)[2]), COUNT(DISTINCT splitByString('.', p.entityFQNHash)[3]),
+            COUNT(DISTINCT e.serviceType), COUNT(DISTINCT d.region)
+        FROM column_ner_results c
+        LEFT JOIN table_entity t FINAL ON t.id = c.table_id
+        LEFT JOIN dbservice_entity e FINAL ON e.nameHash = splitByString('.', t.fqnHash)[1]
+        LEFT JOIN profiler_data_time_series p FINAL ON splitByString('.', p.entityFQNHash)[1] = e.nameHash
+        LEFT JOIN dbservice_entity_meta_info d FINAL ON e.id = d.dbservice_entity_id
+        GROUP BY c.detected_entity""",
+    "structured_view_data_locations": """
+        SELECT d.region, COUNT(DISTINCT db.serviceType), COUNT(DISTINCT arrayElement(splitByString('.', p.entityFQNHash), 4)),
+            COUNT(DISTINCT arrayElement(splitByString('.', p.entityFQNHash), 2)),
+            COUNT(DISTINCT arrayElement(splitByString('.', p.entityFQNHash), 3)), COUNT(DISTINCT c.detected_entity)
+        FROM dbservice_entity_meta_info d FINAL
+        JOIN dbservice_entity db FINAL ON db.id = d.dbservice_entity_id
+        JOIN profiler_data_time_series p FINAL ON arrayElement(splitByString('.', p.entityFQNHash), 1) = db.nameHash
+        JOIN table_entity t FINAL ON arrayElement(splitByString('.', t.fqnHash), 1) = arrayElement(splitByString('.', p.entityFQNHash), 1)
+        JOIN column_ner_results c ON c.table_id = t.id
+        GROUP BY d.region""",
+    "structured_view_data_management": """
+        SELECT COUNT(DISTINCT serviceType), COUNT(DISTINCT updatedBy),
+            COUNT(DISTINCT splitByString('.', entityFQNHash)[3]), COUNT(DISTINCT splitByString('.', entityFQNHash)[2])
+        FROM profiler_data_time_series p FINAL
+        JOIN dbservice_entity d FINAL ON splitByString('.', entityFQNHash)[1] = d.nameHash""",
+    "structured_view_data_element_categories": """
+        SELECT data_element, COUNT(*) FROM column_ner_results GROUP BY data_element""",
+    "unstructured_view_data_element_listing": """
+        SELECT detected_entity, COUNT(detected_entity), COUNT(DISTINCT file_name), COUNT(DISTINCT source), COUNT(DISTINCT region)
+        FROM ner_unstructured_data GROUP BY detected_entity""",
+    "unstructured_view_data_management": """
+        SELECT COUNT(DISTINCT file_name), SUM(file_size) / 1024, COUNT(DISTINCT file_type) FROM ner_unstructured_data""",
+    "unstructured_view_file_format_statistics": """
+        SELECT file_type, COUNT(DISTINCT file_name), COUNT(DISTINCT source), COUNT(DISTINCT region)
+        FROM ner_unstructured_data GROUP BY file_type""",
+}
+
+ENTITIES = "['EMAIL_ADDRESS','PHONE_NUMBER','PERSON','CREDIT_CARD','AADHAAR','PAN','IP_ADDRESS','NA']"
+ELEMENTS = "['Contact','Contact','Identity','Financial','Identity','Financial','Technical','NA']"
+
+
+def populate(client, rows: int):
+    """Inserts the synthetic dataset server-side; returns the seconds spent per table."""
+    client.command(f"""
+        INSERT INTO dbservice_entity (id, name, serviceType, json, updatedAt, updatedBy, deleted, nameHash)
+        SELECT concat('svc-', toString(number)), concat('service', toString(number)), ['Mysql','Postgres','Snowflake','BigQuery'][number % 4 + 1],
+            '{{}}', 1, concat('owner', toString(number % 7)), 0, concat('svc', toString(number))
+        FROM numbers({SERVICES})""")
+    client.command(f"""
+        INSERT INTO dbservice_entity_meta_info (dbservice_entity_id, dbservice_entity_name, source, region)
+        SELECT concat('svc-', toString(number)), concat('service', toString(number)), 'omd', ['IN','US','EU','SG'][number % 4 + 1]
+        FROM numbers({SERVICES})""")
+    client.command(f"""
+        INSERT INTO table_entity (id, json, updatedAt, updatedBy, deleted, fqnHash, name)
+        SELECT concat('table-', toString(number)), '{{}}', 1, 'admin', 0,
+            concat('svc', toString(number % {SERVICES}), '.db', toString(number % 40), '.schema', toString(number % 200), '.table', toString(number)),
+            concat('table', toString(number))
+        FROM numbers({TABLES})""")
+
+    timings = {}
+    start = time.perf_counter()
+    client.command(f"""
+        INSERT INTO column_ner_results (table_id, column_name, json, detected_entity, data_element)
+        SELECT concat('table-', toString(number % {TABLES})), concat('column', toString(number % 300)), '{{}}',
+            {ENTITIES}[number % 8 + 1], {ELEMENTS}[number % 8 + 1]
+        FROM numbers({rows * 3 // 10})""")
+    timings["column_ner_results"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.command(f"""
+        INSERT INTO profiler_data_time_series (entityFQNHash, extension, jsonSchema, json, operation, timestamp)
+        SELECT concat('svc', toString(number % {TABLES} % {SERVICES}), '.db', toString(number % {TABLES} % 40),
+                '.schema', toString(number % {TABLES} % 200), '.table', toString(number % {TABLES})),
+            'table.tableProfile', 'tableProfile', '{{}}', '', 1700000000000 + intDiv(number, {TABLES}) * 60000
+        FROM numbers({rows * 4 // 10})""")
+    timings["profiler_data_time_series"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.command(f"""
+        INSERT INTO ner_unstructured_data (source_bucket, file_name, json, detected_entity, data_element, file_size,
+            file_type, source, sub_service, region)
+        SELECT concat('bucket', toString(number % 20)), concat('document', toString(number), '.pdf'), '{{}}',
+            {ENTITIES}[number % 8 + 1], {ELEMENTS}[number % 8 + 1], 1024 + number % 100000,
+            ['pdf','docx','xlsx','txt'][number % 4 + 1], ['s3','gcs','azure'][number % 3 + 1], ['bucket','drive'][number % 2 + 1],
+            ['IN','US','EU','SG'][number % 4 + 1]
+        FROM numbers({rows - rows * 3 // 10 - rows * 4 // 10})""")
+    timings["ner_unstructured_data"] = time.perf_counter() - start
+    return timings
+
+
+def timed(client, sql: str, timeout: float):
+    start = time.perf_counter()
+    try:
+        client.query(sql, settings={"max_execution_time": timeout})
+    except Exception as e:
+        if "TIMEOUT_EXCEEDED" in str(e) or "Timeout exceeded" in str(e):
+            return None
+        raise
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dashboard views over raw tables and over the rollups")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds before a raw query is abandoned")
+    parser.add_argument("--skip-populate", action="store_true", help="Reuse the data of an earlier run")
+    args = parser.parse_args()
+
+    client = Connection.client
+    if not args.skip_populate:
+        for table, seconds in populate(client, args.rows).items():
+            print(f"inserted into {table:<28}{seconds:>8.2f}s (materialized views included)")
+
+    print(f"{'view':<44}{'raw ms':>12}{'rollup ms':>12}")
+    for view, raw_sql in RAW_QUERIES.items():
+        raw_seconds = timed(client, raw_sql, args.timeout)
+        rollup_seconds = timed(client, f"SELECT * FROM {view}", args.timeout)
+        raw = f"{raw_seconds * 1000:.1f}" if raw_seconds is not None else "timed out"
+        print(f"{view:<44}{raw:>12}{rollup_seconds * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Benchmark: views joining data_element versus dictGet on data_element_dict (migrations/019.sql, created by migrate.py).
+#
+# Fills data_element with --entities categories (one in ten also has the UNKNOWN row the service registers
+# for new entities) and column_ner_results / ner_unstructured_data with --rows results each, then prints the
+# EXPLAIN plan of the previous join definition and of the current view and times both.
+# Run against a disposable database, e.g.
+#   CLICKHOUSE_DATABASE=dictionary_bench python migrate.py
+#   CLICKHOUSE_DATABASE=dictionary_bench python -m benchmarks.data_element_dictionary_benchmark --rows 10000000
+
+import argparse
+import time
+
+from client_connect import Connection
+
+# The view definitions before the dictionary
+JOIN_QUERIES = {
+    "structured_view_data_ner": """
+        SELECT c.*, d.parameter_sensitivity
+        FROM column_ner_results c
+        LEFT JOIN data_element d ON c.detected_entity = d.parameter_value""",
+    "unstructured_view_data_ner": """
+        SELECT DISTINCT c.*, d.parameter_sensitivity
+        FROM ner_unstructured_data c
+        LEFT JOIN data_element d ON c.detected_entity = d.parameter_value""",
+    "structured_view_data_sensitivity": """
+        SELECT de.parameter_sensitivity AS sensitivity, COUNT(DISTINCT c.detected_entity) AS sensitivity_count
+        FROM data_element de
+        JOIN column_ner_rollup c ON c.detected_entity = de.parameter_value
+        GROUP BY de.parameter_sensitivity""",
+    "unstructured_view_data_sensitivity": """
+        SELECT de.parameter_sensitivity AS sensitivity, countMerge(n.results) AS sensitivity_count
+        FROM ner_unstructured_rollup n
+        JOIN data_element de ON n.detected_entity = de.parameter_value
+        GROUP BY de.parameter_sensitivity""",
+    "structured_view_data_details": """
+        SELECT countMerge(c.results), COUNT(DISTINCT c.detected_entity), (SELECT COUNT(DISTINCT parameter_name) FROM data_element)
+        FROM column_ner_rollup c
+        LEFT JOIN data_element de ON c.data_element = de.parameter_name
+        WHERE c.data_element != 'NA'""",
+    "unstructured_view_data_details": """
+        SELECT countMerge(ner.results), COUNT(DISTINCT ner.detected_entity), (SELECT COUNT(*) FROM data_element)
+        FROM ner_unstructured_rollup ner
+        LEFT JOIN data_element de ON ner.data_element = de.parameter_name""",
+}
+
+CATEGORIES = "['Contact','Identity','Financial','Technical','Health']"
+SENSITIVITIES = "['high','medium','low']"
+
+
+def populate(client, entities: int, rows: int):
+    client.command(f"""
+        INSERT INTO data_element (parameter_name, parameter_value, parameter_sensitivity)
+        SELECT {CATEGORIES}[number % 5 + 1], concat('ENTITY_', toString(number)), {SENSITIVITIES}[number % 3 + 1]
+        FROM numbers({entities})""")
+    client.command(f"""
+        INSERT INTO data_element (parameter_name, parameter_value, parameter_sensitivity)
+        SELECT 'UNKNOWN', concat('ENTITY_', toString(number * 10)), 'UNKNOWN'
+        FROM numbers({entities // 10})""")
+    client.command(f"""
+        INSERT INTO column_ner_results (table_id, column_name, json, detected_entity, data_element)
+        SELECT concat('table-', toString(number % 20000)), concat('column', toString(number % 300)), '{{}}',
+            concat('ENTITY_', toString(number % {entities})), {CATEGORIES}[number % {entities} % 5 + 1]
+        FROM numbers({rows})""")
+    client.command(f"""
+        INSERT INTO ner_unstructured_data (source_bucket, file_name, json, detected_entity, data_element, file_size,
+            file_type, source, sub_service, region)
+        SELECT concat('bucket', toString(number % 20)), concat('document', toString(number), '.pdf'), '{{}}',
+            concat('ENTITY_', toString(number % {entities})), {CATEGORIES}[number % {entities} % 5 + 1], 1024 + number % 100000,
+            ['pdf','docx','xlsx','txt'][number % 4 + 1], ['s3','gcs','azure'][number % 3 + 1], ['bucket','drive'][number % 2 + 1],
+            ['IN','US','EU','SG'][number % 4 + 1]
+        FROM numbers({rows})""")
+    client.command("SYSTEM RELOAD DICTIONARY data_element_dict")
+
+
+def explain(client, sql: str) -> str:
+    return "\n".join(row[0] for row in client.query(f"EXPLAIN PLAN {sql}").result_rows)
+
+
+def timed(client, sql: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # The *_ner views return every result row; hash them server-side so every column is still computed
+        client.query(f"SELECT count(), sum(cityHash64(*)) FROM ({sql})")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare data_element joins with dictionary lookups in the views")
+    parser.add_argument("--entities", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Rows per NER result table")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query; the fastest is reported")
+    parser.add_argument("--skip-populate", action="store_true", help="Reuse the data of an earlier run")
+    args = parser.parse_args()
+
+    client = Connection.client
+    if not args.skip_populate:
+        populate(client, args.entities, args.rows)
+
+    timings = []
+    for view, join_sql in JOIN_QUERIES.items():
+        view_sql = f"SELECT * FROM {view}"
+        print(f"== {view}\n-- join\n{explain(client, join_sql)}\n-- dictionary\n{explain(client, view_sql)}\n")
+        timings.append((view, timed(client, join_sql, args.repeat), timed(client, view_sql, args.repeat)))
+
+    print(f"{'view':<40}{'join ms':>12}{'dictGet ms':>12}{'speedup':>10}")
+    for view, join_seconds, dictionary_seconds in timings:
+        print(f"{view:<40}{join_seconds * 1000:>12.1f}{dictionary_seconds * 1000:>12.1f}{join_seconds / dictionary_seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
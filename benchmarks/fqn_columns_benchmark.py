@@ -0,0 +1,124 @@
+# Benchmark: structured views joining on split FQN expressions versus the materialized FQN columns
+# (migrations/016.sql), plus a service lookup with and without the skip index.
+#
+# Fills the OMD entity tables and column_ner_results with synthetic rows, then times the previous view
+# definitions (splitByString / CASE joins) against the current views. Run against a disposable database, e.g.
+#   CLICKHOUSE_DATABASE=fqn_bench python migrate.py
+#   CLICKHOUSE_DATABASE=fqn_bench python -m benchmarks.fqn_columns_benchmark --tables 1000000
+
+import argparse
+import time
+
+from client_connect import Connection
+
+SERVICES = 50
+
+NORMALIZED_ID = """CASE WHEN position(d.dbservice_entity_id, '.') > 0
+    THEN substring(d.dbservice_entity_id, 1, position(d.dbservice_entity_id, '.') - 1) ELSE d.dbservice_entity_id END"""
+
+# The views before the FQN columns existed
+SPLIT_QUERIES = {
+    "structured_view_data_element_types": f"""
+        SELECT c.detected_entity, any(totals.results), any(totals.columns), COUNT(DISTINCT t.id),
+            uniqMerge(p.schemas), uniqMerge(p.databases), COUNT(DISTINCT e.serviceType), COUNT(DISTINCT d.region)
+        FROM column_ner_rollup c
+        JOIN (SELECT detected_entity, countMerge(results) AS results, uniqMerge(columns) AS columns
+              FROM column_ner_rollup GROUP BY detected_entity) totals ON totals.detected_entity = c.detected_entity
+        LEFT JOIN table_entity t FINAL ON t.id = c.table_id
+        LEFT JOIN dbservice_entity e FINAL ON e.nameHash = splitByString('.', CAST(t.fqnHash AS String))[1]
+        LEFT JOIN profiler_service_rollup p ON p.service_hash = e.nameHash
+        LEFT JOIN dbservice_entity_meta_info d FINAL ON e.id = {NORMALIZED_ID}
+        GROUP BY c.detected_entity""",
+    "structured_view_data_locations": f"""
+        SELECT d.region, COUNT(DISTINCT db.serviceType), uniqMerge(p.tables), uniqMerge(p.schemas), uniqMerge(p.databases),
+            COUNT(DISTINCT c.detected_entity)
+        FROM dbservice_entity_meta_info d FINAL
+        JOIN dbservice_entity db FINAL ON db.id = {NORMALIZED_ID}
+        JOIN profiler_service_rollup p ON p.service_hash = db.nameHash
+        JOIN table_entity t FINAL ON arrayElement(splitByString('.', t.fqnHash), 1) = p.service_hash
+        JOIN column_ner_rollup c ON c.table_id = t.id
+        GROUP BY d.region""",
+    "structured_view_data_shankey": f"""
+        SELECT DISTINCT d.region, db.serviceType, db.updatedBy, s.name, c.data_element, c.detected_entity
+        FROM dbservice_entity_meta_info d FINAL
+        JOIN dbservice_entity db FINAL ON db.id = {NORMALIZED_ID}
+        JOIN database_schema_entity s FINAL ON arrayElement(splitByString('.', s.fqnHash), 1) = db.nameHash
+        JOIN table_entity t FINAL ON arrayElement(splitByString('.', t.fqnHash), 1) = arrayElement(splitByString('.', s.fqnHash), 1)
+        JOIN column_ner_rollup c ON c.table_id = t.id""",
+}
+
+LOOKUPS = {
+    "tables of one service": (
+        "SELECT count() FROM table_entity WHERE splitByString('.', fqnHash)[1] = 'svc7'",
+        "SELECT count() FROM table_entity WHERE service_hash = 'svc7'",
+    ),
+}
+
+
+def populate(client, tables: int, schemas: int):
+    client.command(f"""
+        INSERT INTO dbservice_entity (id, name, serviceType, json, updatedAt, updatedBy, deleted, nameHash)
+        SELECT concat('svc-', toString(number)), concat('service', toString(number)), ['Mysql','Postgres','Snowflake','BigQuery'][number % 4 + 1],
+            '{{}}', 1, concat('owner', toString(number % 7)), 0, concat('svc', toString(number))
+        FROM numbers({SERVICES})""")
+    client.command(f"""
+        INSERT INTO dbservice_entity_meta_info (dbservice_entity_id, dbservice_entity_name, source, region)
+        SELECT concat('svc-', toString(number), if(number % 2 = 0, '.mysql', '')), concat('service', toString(number)), 'omd',
+            ['IN','US','EU','SG'][number % 4 + 1]
+        FROM numbers({SERVICES})""")
+    client.command(f"""
+        INSERT INTO database_schema_entity (id, json, updatedAt, updatedBy, deleted, fqnHash, name)
+        SELECT concat('schema-', toString(number)), '{{}}', 1, 'admin', 0,
+            concat('svc', toString(number % {SERVICES}), '.db', toString(number % 40), '.schema', toString(number)), concat('schema', toString(number))
+        FROM numbers({schemas})""")
+    client.command(f"""
+        INSERT INTO table_entity (id, json, updatedAt, updatedBy, deleted, fqnHash, name)
+        SELECT concat('table-', toString(number)), '{{}}', 1, 'admin', 0,
+            concat('svc', toString(number % {SERVICES}), '.db', toString(number % 40), '.schema', toString(number % {schemas}), '.table', toString(number)),
+            concat('table', toString(number))
+        FROM numbers({tables})""")
+    client.command(f"""
+        INSERT INTO profiler_data_time_series (entityFQNHash, extension, jsonSchema, json, operation, timestamp)
+        SELECT concat('svc', toString(number % {SERVICES}), '.db', toString(number % 40), '.schema', toString(number % {schemas}),
+                '.table', toString(number)), 'table.tableProfile', 'tableProfile', '{{}}', '', 1700000000000
+        FROM numbers({tables})""")
+    # One detected entity on every tenth table
+    client.command(f"""
+        INSERT INTO column_ner_results (table_id, column_name, json, detected_entity, data_element)
+        SELECT concat('table-', toString(number * 10)), 'email', '{{}}', ['EMAIL_ADDRESS','PHONE_NUMBER','PERSON'][number % 3 + 1],
+            ['Contact','Contact','Identity'][number % 3 + 1]
+        FROM numbers({tables // 10})""")
+
+
+def timed(client, sql: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.query(sql)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare split-expression joins with the materialized FQN columns")
+    parser.add_argument("--tables", type=int, default=1_000_000)
+    parser.add_argument("--schemas", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query; the fastest is reported")
+    parser.add_argument("--skip-populate", action="store_true", help="Reuse the data of an earlier run")
+    args = parser.parse_args()
+
+    client = Connection.client
+    if not args.skip_populate:
+        populate(client, args.tables, args.schemas)
+
+    print(f"{'query':<40}{'split ms':>12}{'columns ms':>12}{'speedup':>10}")
+    comparisons = [(view, sql, f"SELECT * FROM {view}") for view, sql in SPLIT_QUERIES.items()]
+    comparisons += [(name, split_sql, column_sql) for name, (split_sql, column_sql) in LOOKUPS.items()]
+    for name, split_sql, column_sql in comparisons:
+        split_seconds = timed(client, split_sql, args.repeat)
+        column_seconds = timed(client, column_sql, args.repeat)
+        print(f"{name:<40}{split_seconds * 1000:>12.1f}{column_seconds * 1000:>12.1f}{split_seconds / column_seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
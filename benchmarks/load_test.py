@@ -0,0 +1,95 @@
+# Load test: latency of GET / and POST /ner/process while a large OMD upload is being written.
+# Probes run for --seconds without any upload (baseline), then again while /omd/upload/table_entity ingests
+# a --rows CSV. With ClickHouse access off the event loop, the two phases should show the same p99.
+# Run against a server using a disposable database, e.g.
+#   CLICKHOUSE_DATABASE=omd_bench uvicorn main:app --port 8000
+#   python -m benchmarks.load_test --url http://127.0.0.1:8000 --rows 500000
+
+import argparse
+import asyncio
+import io
+import statistics
+import time
+
+import httpx
+
+from benchmarks.omd_upsert_benchmark import build_table_entity_rows
+
+NER_CSV = b"name,email,phone\nAsha Rao,asha@example.com,9876543210\nRavi Kumar,ravi@example.com,9123456780\n"
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def probe(client: httpx.AsyncClient, name: str, stop: asyncio.Event, latencies: dict, interval: float):
+    while not stop.is_set():
+        start = time.perf_counter()
+        if name == "GET /":
+            response = await client.get("/")
+        else:
+            response = await client.post("/ner/process/load-test", files={"file": ("probe.csv", NER_CSV, "text/csv")})
+        elapsed = time.perf_counter() - start
+        latencies.setdefault(name, []).append(elapsed if response.status_code < 500 else float("inf"))
+        await asyncio.sleep(interval)
+
+
+async def run_phase(client: httpx.AsyncClient, seconds: float, concurrency: int, interval: float, upload=None) -> dict:
+    stop = asyncio.Event()
+    latencies = {}
+    probes = [
+        asyncio.create_task(probe(client, name, stop, latencies, interval))
+        for name in ("GET /", "POST /ner/process") for _ in range(concurrency)
+    ]
+    upload_seconds = None
+    if upload is not None:
+        start = time.perf_counter()
+        response = await upload
+        upload_seconds = time.perf_counter() - start
+        response.raise_for_status()
+    else:
+        await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*probes)
+    return {"latencies": latencies, "upload_seconds": upload_seconds}
+
+
+def report(phase: str, result: dict):
+    for name, values in result["latencies"].items():
+        print(f"{phase:<16}{name:<22}{len(values):>7}"
+              f"{statistics.median(values) * 1000:>10.1f}{percentile(values, 0.95) * 1000:>10.1f}"
+              f"{percentile(values, 0.99) * 1000:>10.1f}{max(values) * 1000:>10.1f}")
+    if result["upload_seconds"] is not None:
+        print(f"{'':<16}upload took {result['upload_seconds']:.1f}s")
+
+
+async def main_async(args):
+    data = build_table_entity_rows(args.rows)
+    buffer = io.StringIO()
+    data.to_csv(buffer, sep=";", index=False)
+    csv_bytes = buffer.getvalue().encode("utf-8")
+    print(f"OMD upload: {args.rows} rows, {len(csv_bytes) / (1024 * 1024):.1f} MB")
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=600) as client:
+        baseline = await run_phase(client, args.seconds, args.concurrency, args.interval)
+        upload = client.post("/omd/upload/table_entity", files={"file": ("table_entity.csv", csv_bytes, "text/csv")})
+        during_upload = await run_phase(client, args.seconds, args.concurrency, args.interval, upload)
+
+    print(f"{'phase':<16}{'endpoint':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    report("baseline", baseline)
+    report("during upload", during_upload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe endpoint latency while a large OMD upload is written")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--seconds", type=float, default=20, help="Length of the baseline phase")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent probes per endpoint")
+    parser.add_argument("--interval", type=float, default=0.05, help="Pause between requests of one probe")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
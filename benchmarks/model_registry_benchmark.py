@@ -0,0 +1,49 @@
+# Benchmark: per-request model construction cost with the shared model registry.
+#
+# Builds the scanners the way request handlers do, several times in one process, and reports
+# how long each construction took and how often each artifact was actually loaded, e.g.
+#   python -m benchmarks.model_registry_benchmark --requests 5
+
+import argparse
+import json
+import time
+
+from app.utils.model_registry import model_registry
+
+
+def build_scanners():
+    from app.utils.pii_scan.spacy_ner import SpaCyNERProcessor
+    from app.utils.ner_scanner.ner_scanner import NERScanner
+    from app.utils.pii_scan.structured_ner_main import MLBasedNERScannerForStructuredData
+    from app.utils.pii_scan.Octopii.text_utils import get_regexes
+
+    return {
+        "SpaCyNERProcessor": SpaCyNERProcessor,
+        "NERScanner": NERScanner,
+        "MLBasedNERScannerForStructuredData": lambda: MLBasedNERScannerForStructuredData().nlp,
+        "PIIScanner": lambda: model_registry.get("pii_scanner"),
+        "definitions.json": get_regexes,
+        "haar_cascade": lambda: model_registry.get("haar_cascade"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure model construction time per simulated request")
+    parser.add_argument("--requests", type=int, default=5)
+    args = parser.parse_args()
+
+    constructors = build_scanners()
+    print(f"{'request':<10}" + "".join(f"{name[:24]:>26}" for name in constructors))
+    for request in range(1, args.requests + 1):
+        timings = []
+        for construct in constructors.values():
+            start = time.perf_counter()
+            construct()
+            timings.append(time.perf_counter() - start)
+        print(f"{request:<10}" + "".join(f"{seconds:>25.4f}s" for seconds in timings))
+
+    print(json.dumps(model_registry.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Benchmark: OMD upload throughput and mutation backlog for the "mutation" and "replacing" upsert modes.
+#
+# Run against a disposable database that has the migrations applied, e.g.
+#   CLICKHOUSE_DATABASE=omd_bench python migrate.py
+#   CLICKHOUSE_DATABASE=omd_bench python -m benchmarks.omd_upsert_benchmark --rows 200000
+
+import argparse
+import json
+import time
+import uuid
+
+import pandas as pd
+
+from client_connect import Connection
+from app.utils import clickhouse_service
+
+
+def build_table_entity_rows(row_count: int) -> pd.DataFrame:
+    """Builds synthetic table_entity rows shaped like an OpenMetadata export."""
+    now_ms = int(time.time() * 1000)
+    service_json = json.dumps({"connection": {"config": {"hostPort": "db.prod.ap-south-1.rds.mysql.amazonaws.com:3306"}}})
+    return pd.DataFrame({
+        "id": [str(uuid.uuid4()) for _ in range(row_count)],
+        "json": [service_json] * row_count,
+        "updatedAt": [now_ms] * row_count,
+        "updatedBy": ["admin"] * row_count,
+        "deleted": [0] * row_count,
+        "fqnHash": [f"svc{i % 50}.db{i % 10}.schema{i % 5}.table{i}" for i in range(row_count)],
+        "name": [f"table{i}" for i in range(row_count)],
+    })
+
+
+def pending_mutations(client) -> int:
+    result = client.query("SELECT count() FROM system.mutations WHERE database = currentDatabase() AND is_done = 0")
+    return result.result_rows[0][0]
+
+
+def run_mode(mode: str, data: pd.DataFrame, client) -> dict:
+    clickhouse_service.OMD_UPSERT_MODE = mode
+    timings = []
+    # First pass inserts, second pass re-uploads the same ids with a newer updatedAt (the upsert case)
+    for upload in range(2):
+        batch = data.copy()
+        batch["updatedAt"] = batch["updatedAt"] + upload
+        start = time.perf_counter()
+        clickhouse_service.save_omd_table_data("table_entity", batch)
+        timings.append(time.perf_counter() - start)
+    return {
+        "mode": mode,
+        "rows_per_sec_insert": round(len(data) / timings[0]),
+        "rows_per_sec_upsert": round(len(data) / timings[1]),
+        "pending_mutations": pending_mutations(client),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OMD upsert modes")
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    client = Connection.client
+    data = build_table_entity_rows(args.rows)
+    results = []
+    for mode in clickhouse_service.OMD_UPSERT_MODES:
+        for table in ("table_entity", "dbservice_entity_meta_info"):
+            client.command(f"TRUNCATE TABLE {table}")
+        results.append(run_mode(mode, data, client))
+
+    print(f"{'mode':<12}{'insert rows/s':>16}{'upsert rows/s':>16}{'pending mutations':>20}")
+    for result in results:
+        print(f"{result['mode']:<12}{result['rows_per_sec_insert']:>16}{result['rows_per_sec_upsert']:>16}{result['pending_mutations']:>20}")
+
+
+if __name__ == "__main__":
+    main()
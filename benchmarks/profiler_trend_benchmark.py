@@ -0,0 +1,175 @@
+# Benchmark: 90-day profiler trend queries over the json of profiler_data_time_series versus the typed
+# metric points and their hourly / daily rollups (migrations/018.sql).
+#
+# Fills profiler_data_time_series with hourly tableProfile and columnProfile documents (Python-style quoting,
+# as OpenMetadata exports them) and profiler_metadata / profiler_metric_points with the same values; the
+# materialized views fill the rollups as the points are inserted. The tables are merged before timing, which
+# also drops the points past the 30-day TTL; those are only kept in the rollups. Then each trend is timed on
+# every table that can answer it. Run against a disposable database, e.g.
+#   CLICKHOUSE_DATABASE=profiler_bench python migrate.py
+#   CLICKHOUSE_DATABASE=profiler_bench python -m benchmarks.profiler_trend_benchmark --tables 500
+
+import argparse
+import time
+
+from client_connect import Connection
+
+HOUR_MS = 3_600_000
+
+# The json repair of omd_json_extract.parse_json_column, done in SQL
+REPAIRED_JSON = "replaceAll(replaceAll(replaceAll(json, '\\'', '\"'), 'False', 'false'), 'True', 'true')"
+
+# {since} is the start of the 90-day window in epoch milliseconds, {since_day} the same as a Date
+TRENDS = {
+    "daily rows of one table": {
+        "json": f"""
+            SELECT toDate(toDateTime(intDiv(timestamp, 1000))) AS day, avg(JSONExtractFloat({REPAIRED_JSON}, 'rowCount'))
+            FROM profiler_data_time_series
+            WHERE entityFQNHash = 'svc.db.schema.table42' AND jsonSchema = 'tableProfile' AND timestamp >= {{since}}
+            GROUP BY day ORDER BY day""",
+        "profiler_metadata": """
+            SELECT toDate(toDateTime(intDiv(timestamp, 1000))) AS day, avg(rowCount)
+            FROM profiler_metadata FINAL
+            WHERE entityFQNHash = 'svc.db.schema.table42' AND timestamp >= {since}
+            GROUP BY day ORDER BY day""",
+        "daily rollup": """
+            SELECT day, avgMerge(avg_value)
+            FROM profiler_metric_daily
+            WHERE entityFQNHash = 'svc.db.schema.table42' AND column_name = '' AND metric = 'rowCount' AND day >= {since_day}
+            GROUP BY day ORDER BY day""",
+    },
+    "hourly nulls of one column": {
+        "json": f"""
+            SELECT toStartOfHour(toDateTime(intDiv(timestamp, 1000))) AS hour, max(JSONExtractFloat({REPAIRED_JSON}, 'nullCount'))
+            FROM profiler_data_time_series
+            WHERE entityFQNHash = 'svc.db.schema.table42.column1' AND jsonSchema = 'columnProfile' AND timestamp >= {{since}}
+            GROUP BY hour ORDER BY hour""",
+        "hourly rollup": """
+            SELECT hour, maxMerge(max_value)
+            FROM profiler_metric_hourly
+            WHERE entityFQNHash = 'svc.db.schema.table42.column1' AND column_name = 'column1' AND metric = 'nullCount'
+                AND hour >= toDateTime(intDiv({since}, 1000))
+            GROUP BY hour ORDER BY hour""",
+    },
+    "daily rows of all tables": {
+        "json": f"""
+            SELECT day, sum(last_rows) FROM (
+                SELECT entityFQNHash, toDate(toDateTime(intDiv(timestamp, 1000))) AS day,
+                    argMax(JSONExtractFloat({REPAIRED_JSON}, 'rowCount'), timestamp) AS last_rows
+                FROM profiler_data_time_series
+                WHERE jsonSchema = 'tableProfile' AND timestamp >= {{since}}
+                GROUP BY entityFQNHash, day)
+            GROUP BY day ORDER BY day""",
+        "profiler_metadata": """
+            SELECT day, sum(last_rows) FROM (
+                SELECT entityFQNHash, toDate(toDateTime(intDiv(timestamp, 1000))) AS day, argMax(rowCount, timestamp) AS last_rows
+                FROM profiler_metadata FINAL
+                WHERE timestamp >= {since}
+                GROUP BY entityFQNHash, day)
+            GROUP BY day ORDER BY day""",
+        "daily rollup": """
+            SELECT day, sum(last_rows) FROM (
+                SELECT entityFQNHash, day, argMaxMerge(last_value) AS last_rows
+                FROM profiler_metric_daily
+                WHERE column_name = '' AND metric = 'rowCount' AND day >= {since_day}
+                GROUP BY entityFQNHash, day)
+            GROUP BY day ORDER BY day""",
+    },
+}
+
+
+def populate(client, tables: int, columns: int, days: int, end_ms: int):
+    """Inserts one table profile per table and one column profile per column for every hour of the window."""
+    hours = days * 24
+    start_ms = end_ms - hours * HOUR_MS
+    table_profiles = f"""
+        SELECT concat('svc.db.schema.table', toString(number % {tables})) AS entity,
+            {start_ms} + intDiv(number, {tables}) * {HOUR_MS} AS ts,
+            1000 + (number % {tables}) * 10 + intDiv(number, {tables}) AS row_count
+        FROM numbers({tables * hours})"""
+    column_profiles = f"""
+        SELECT concat('svc.db.schema.table', toString(number % {tables}), '.column', toString(intDiv(number, {tables}) % {columns})) AS entity,
+            concat('column', toString(intDiv(number, {tables}) % {columns})) AS column,
+            {start_ms} + intDiv(number, {tables * columns}) * {HOUR_MS} AS ts,
+            number % 50 AS null_count
+        FROM numbers({tables * columns * hours})"""
+
+    client.command(f"""
+        INSERT INTO profiler_data_time_series (entityFQNHash, extension, jsonSchema, json, operation, timestamp)
+        SELECT entity, 'table.tableProfile', 'tableProfile',
+            concat('{{\\'timestamp\\': ', toString(ts), ', \\'rowCount\\': ', toString(row_count),
+                ', \\'columnCount\\': {columns}, \\'sizeInByte\\': ', toString(row_count * 100), ', \\'profileSample\\': 100.0, \\'partial\\': False}}'),
+            '', ts
+        FROM ({table_profiles})""", settings={"max_partitions_per_insert_block": 1000})
+    client.command(f"""
+        INSERT INTO profiler_data_time_series (entityFQNHash, extension, jsonSchema, json, operation, timestamp)
+        SELECT entity, 'table.columnProfile', 'columnProfile',
+            concat('{{\\'name\\': \\'', column, '\\', \\'timestamp\\': ', toString(ts), ', \\'valuesCount\\': 1000.0, \\'nullCount\\': ',
+                toString(null_count), ', \\'nullProportion\\': ', toString(null_count / 1000), ', \\'min\\': \\'a\\', \\'max\\': \\'z\\'}}'),
+            '', ts
+        FROM ({column_profiles})""", settings={"max_partitions_per_insert_block": 1000})
+    client.command(f"""
+        INSERT INTO profiler_metadata (entityFQNHash, rowCount, timestamp, sizeInByte, columnCount, profileSample, createDateTime, profileSampleType)
+        SELECT entity, row_count, ts, row_count * 100, {columns}, 100, intDiv(ts, 1000), 'PERCENTAGE'
+        FROM ({table_profiles})""")
+    # Through the points table, so the materialized views fill the rollups as the upload would
+    client.command(f"""
+        INSERT INTO profiler_metric_points (entityFQNHash, timestamp, column_name, metric, value)
+        SELECT entity, ts, '', metric, value
+        FROM ({table_profiles})
+        ARRAY JOIN ['rowCount', 'columnCount', 'sizeInByte', 'profileSample'] AS metric,
+            [toFloat64(row_count), {columns}, row_count * 100, 100] AS value""",
+        settings={"max_partitions_per_insert_block": 1000})
+    client.command(f"""
+        INSERT INTO profiler_metric_points (entityFQNHash, timestamp, column_name, metric, value)
+        SELECT entity, ts, column, metric, value
+        FROM ({column_profiles})
+        ARRAY JOIN ['valuesCount', 'nullCount', 'nullProportion'] AS metric, [1000, toFloat64(null_count), null_count / 1000] AS value""",
+        settings={"max_partitions_per_insert_block": 1000})
+    # Merge to the steady state background merges reach; this also drops the points past their TTL
+    for table in ("profiler_data_time_series", "profiler_metadata", "profiler_metric_points", "profiler_metric_hourly", "profiler_metric_daily"):
+        client.command(f"OPTIMIZE TABLE {table} FINAL")
+
+
+def timed(client, sql: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.query(sql)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare 90-day profiler trends over json, profiler_metadata and the metric rollups")
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--columns", type=int, default=10, help="Profiled columns per table")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query; the fastest is reported")
+    parser.add_argument("--skip-populate", action="store_true", help="Reuse the data of an earlier run")
+    args = parser.parse_args()
+
+    client = Connection.client
+    end_ms = int(time.time()) // 3600 * 3600 * 1000
+    if not args.skip_populate:
+        start = time.perf_counter()
+        populate(client, args.tables, args.columns, args.days, end_ms)
+        print(f"populated in {time.perf_counter() - start:.1f}s")
+    for table in ("profiler_data_time_series", "profiler_metric_points", "profiler_metric_hourly", "profiler_metric_daily"):
+        rows, compressed = client.query(
+            "SELECT sum(rows), sum(data_compressed_bytes) FROM system.parts WHERE database = currentDatabase() AND table = {table:String} AND active",
+            parameters={"table": table}
+        ).result_rows[0]
+        print(f"{table:<32}{rows:>14,} rows{compressed / 1024 / 1024:>10.1f} MiB")
+
+    since = end_ms - args.days * 24 * HOUR_MS
+    since_day = f"toDate(toDateTime(intDiv({since}, 1000)))"
+    print(f"\n{'trend':<32}{'source':<24}{'ms':>10}")
+    for trend, sources in TRENDS.items():
+        for source, sql in sources.items():
+            seconds = timed(client, sql.format(since=since, since_day=since_day), args.repeat)
+            print(f"{trend:<32}{source:<24}{seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Benchmark: one insert per NER result versus the buffered result writer for ner_unstructured_data.
+#
+# Simulates --files concurrent scans each saving one result row, and reports wall time, the number of
+# inserts sent and the parts they created. Writes into a scratch copy of ner_unstructured_data that is
+# dropped afterwards, e.g.
+#   python -m benchmarks.result_writer_benchmark --files 5000 --concurrency 32
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from client_connect import Connection
+from app.utils.bulk_writer import insert_columns
+from app.utils.metrics import metrics
+from app.utils.result_writer import BufferedWriter
+
+BENCH_TABLE = "ner_unstructured_data_bench"
+NER_JSON = json.dumps({"highest_label": "EMAIL_ADDRESS", "confidence_score": 0.9, "detected_entities": {"EMAIL_ADDRESS": 9}})
+
+
+def build_result_row(index: int) -> dict:
+    return {
+        "id": [str(uuid.uuid4())],
+        "source_bucket": ["bench-bucket"],
+        "file_name": [f"file{index}.pdf"],
+        "json": [NER_JSON],
+        "detected_entity": ["EMAIL_ADDRESS"],
+        "data_element": ["Email"],
+        "file_size": [4096],
+        "file_type": ["pdf"],
+        "source": ["bench"],
+        "sub_service": ["s3"],
+        "region": ["IN"],
+    }
+
+
+def part_count(client) -> int:
+    return client.command(f"SELECT count() FROM system.parts WHERE database = currentDatabase() AND table = '{BENCH_TABLE}'")
+
+
+async def save_results(files: int, concurrency: int, save) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def save_one(index: int):
+        async with semaphore:
+            await save(build_result_row(index))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(save_one(i) for i in range(files)))
+    return time.perf_counter() - start
+
+
+async def main_async(args):
+    client = Connection.client
+    client.command(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    client.command(f"CREATE TABLE {BENCH_TABLE} AS ner_unstructured_data")
+    # Keep background merges from hiding how many parts each path creates
+    client.command(f"SYSTEM STOP MERGES {BENCH_TABLE}")
+    try:
+        print(f"{'path':<12}{'seconds':>10}{'rows/s':>10}{'inserts':>10}{'parts':>8}")
+
+        client.command(f"TRUNCATE TABLE {BENCH_TABLE}")
+        elapsed = await save_results(args.files, args.concurrency,
+                                     lambda columns: Connection.async_client.run(insert_columns, client, BENCH_TABLE, columns))
+        print(f"{'per-row':<12}{elapsed:>10.2f}{round(args.files / elapsed):>10}{args.files:>10}{part_count(client):>8}")
+
+        client.command(f"TRUNCATE TABLE {BENCH_TABLE}")
+        writer = BufferedWriter(client, BENCH_TABLE, flush_rows=args.flush_rows, flush_ms=args.flush_ms)
+        elapsed = await save_results(args.files, args.concurrency, writer.write)
+        writer.close()
+        flushes = int(metrics.snapshot()["counters"].get(f"result_writer.{BENCH_TABLE}.flushes", 0))
+        print(f"{'buffered':<12}{elapsed:>10.2f}{round(args.files / elapsed):>10}{flushes:>10}{part_count(client):>8}")
+    finally:
+        client.command(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row and buffered writes of NER results")
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32, help="Scans saving their result at the same time")
+    parser.add_argument("--flush-rows", type=int, default=1000)
+    parser.add_argument("--flush-ms", type=int, default=200)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
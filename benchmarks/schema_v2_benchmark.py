@@ -0,0 +1,164 @@
+# Benchmark: storage size and lookup latency of the NER result tables before and after schema v2
+# (migrations/017.sql).
+#
+# Creates scratch copies <table>_bench_v1 (the original schema) and <table>_bench_v2 (the v2 schema, copied
+# from <table>_v2 before the swap and from <table> after it), fills both with the same synthetic rows and
+# merges them, then reports compressed / uncompressed bytes and times the typical lookups on each.
+# The scratch tables are dropped at the end. Run against a disposable database, e.g.
+#   CLICKHOUSE_DATABASE=schema_bench python migrate.py
+#   CLICKHOUSE_DATABASE=schema_bench python -m benchmarks.schema_v2_benchmark --rows 10000000
+
+import argparse
+import time
+
+from client_connect import Connection
+
+# The tables as created by migrations 005, 007 and 009
+V1_SCHEMAS = {
+    "column_ner_results": """(
+        id UUID DEFAULT generateUUIDv4(), table_id String, column_name String, json String,
+        detected_entity String, data_element String, created_at DateTime DEFAULT now(), updated_at DateTime DEFAULT now()
+    ) ENGINE = MergeTree() ORDER BY id""",
+    "ner_unstructured_data": """(
+        id UUID DEFAULT generateUUIDv4(), source_bucket String, file_name String, json String, detected_entity String,
+        data_element String, file_size UInt64, file_type String, source String, sub_service String, region String,
+        created_at DateTime DEFAULT now(), updated_at DateTime DEFAULT now()
+    ) ENGINE = MergeTree() PARTITION BY source_bucket ORDER BY id""",
+    "data_element": """(
+        id UUID DEFAULT generateUUIDv4(), parameter_name String, parameter_value String, parameter_sensitivity String
+    ) ENGINE = MergeTree() ORDER BY id""",
+}
+
+ENTITIES = "['EMAIL_ADDRESS','PHONE_NUMBER','PERSON','CREDIT_CARD','AADHAAR','PAN','IP_ADDRESS','NA']"
+ELEMENTS = "['Contact','Contact','Identity','Financial','Identity','Financial','Technical','NA']"
+
+# Synthetic rows per table; {rows} is the --rows argument. Rows are spread over the last 12 months.
+POPULATE = {
+    "column_ner_results": f"""
+        SELECT generateUUIDv4(), concat('table-', toString(number % 200000)), concat('column', toString(number % 300)),
+            concat('{{"entity": "', {ENTITIES}[number % 8 + 1], '", "score": 0.', toString(number % 100), ', "samples": ["value', toString(number % 5000), '"]}}'),
+            {ENTITIES}[number % 8 + 1], {ELEMENTS}[number % 8 + 1],
+            now() - (number * 97 % 31536000) AS created, created
+        FROM numbers({{rows}})""",
+    "ner_unstructured_data": f"""
+        SELECT generateUUIDv4(), concat('bucket', toString(number % 500)), concat('document', toString(number), '.pdf'),
+            concat('{{"entity": "', {ENTITIES}[number % 8 + 1], '", "pages": ', toString(number % 40), '}}'),
+            {ENTITIES}[number % 8 + 1], {ELEMENTS}[number % 8 + 1], 1024 + number % 100000,
+            ['pdf','docx','xlsx','txt'][number % 4 + 1], ['s3','gcs','azure'][number % 3 + 1], ['bucket','drive'][number % 2 + 1],
+            ['IN','US','EU','SG'][number % 4 + 1], now() - (number * 97 % 31536000) AS created, created
+        FROM numbers({{rows}})""",
+    "data_element": f"""
+        SELECT generateUUIDv4(), {ELEMENTS}[number % 8 + 1], concat('ENTITY_', toString(number)), ['high','medium','low'][number % 3 + 1]
+        FROM numbers(1000)""",
+}
+
+# Lookups the service and the dashboards issue; {table} is replaced with the scratch table
+LOOKUPS = {
+    "column_ner_results": {
+        "results of one table": "SELECT column_name, detected_entity FROM {table} WHERE table_id = 'table-4242'",
+        "tables with one entity": "SELECT uniqExact(table_id) FROM {table} WHERE detected_entity = 'CREDIT_CARD'",
+        "results per entity": "SELECT detected_entity, count() FROM {table} GROUP BY detected_entity",
+    },
+    "ner_unstructured_data": {
+        "entities of one location": "SELECT detected_entity, count() FROM {table} WHERE region = 'IN' AND source = 's3' GROUP BY detected_entity",
+        "documents of one file type": "SELECT uniqExact(file_name) FROM {table} WHERE file_type = 'docx'",
+        "one document": "SELECT detected_entity FROM {table} WHERE file_name = 'document4242.pdf'",
+    },
+    "data_element": {
+        "category of one entity": "SELECT parameter_name FROM {table} WHERE parameter_value = 'ENTITY_421'",
+    },
+}
+
+
+def table_exists(client, table: str) -> bool:
+    return bool(client.query(
+        "SELECT 1 FROM system.tables WHERE database = currentDatabase() AND name = {table:String}",
+        parameters={"table": table}
+    ).result_rows)
+
+
+def create_scratch_tables(client, table: str, rows: int):
+    """Creates and fills <table>_bench_v1 and <table>_bench_v2; returns the seconds each insert took."""
+    v2_source = f"{table}_v2" if table_exists(client, f"{table}_v2") else table
+    client.command(f"DROP TABLE IF EXISTS {table}_bench_v1")
+    client.command(f"DROP TABLE IF EXISTS {table}_bench_v2")
+    client.command(f"CREATE TABLE {table}_bench_v1 {V1_SCHEMAS[table]}")
+    client.command(f"CREATE TABLE {table}_bench_v2 AS {v2_source}")
+
+    timings = {}
+    start = time.perf_counter()
+    client.command(f"INSERT INTO {table}_bench_v1 {POPULATE[table].replace('{rows}', str(rows))}",
+                   settings={"max_partitions_per_insert_block": 1000})
+    timings["v1"] = time.perf_counter() - start
+    start = time.perf_counter()
+    client.command(f"INSERT INTO {table}_bench_v2 SELECT * FROM {table}_bench_v1")
+    timings["v2"] = time.perf_counter() - start
+    for version in ("v1", "v2"):
+        client.command(f"OPTIMIZE TABLE {table}_bench_{version} FINAL")
+    return timings
+
+
+def storage(client, table: str):
+    """Compressed bytes, uncompressed bytes and partition count of the active parts of table."""
+    return client.query(
+        "SELECT sum(data_compressed_bytes), sum(data_uncompressed_bytes), uniqExact(partition_id) FROM system.parts"
+        " WHERE database = currentDatabase() AND table = {table:String} AND active",
+        parameters={"table": table}
+    ).result_rows[0]
+
+
+def column_storage(client, table: str):
+    return {name: compressed for name, compressed in client.query(
+        "SELECT name, data_compressed_bytes FROM system.columns WHERE database = currentDatabase() AND table = {table:String}",
+        parameters={"table": table}
+    ).result_rows}
+
+
+def timed(client, sql: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.query(sql)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def mib(size: int) -> str:
+    # Small parts are written in the compact format, which does not report sizes per column
+    return f"{size / 1024 / 1024:.1f}" if size else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the NER result tables before and after schema v2")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Rows per NER result table")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query; the fastest is reported")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch tables for inspection")
+    args = parser.parse_args()
+
+    client = Connection.client
+    for table in V1_SCHEMAS:
+        timings = create_scratch_tables(client, table, args.rows)
+        print(f"\n{table}: inserted in {timings['v1']:.2f}s (v1) / {timings['v2']:.2f}s (v2)")
+
+        v1, v2 = storage(client, f"{table}_bench_v1"), storage(client, f"{table}_bench_v2")
+        print(f"  {'':<28}{'compressed MiB':>16}{'raw MiB':>12}{'partitions':>12}")
+        print(f"  {'v1':<28}{mib(v1[0]):>16}{mib(v1[1]):>12}{v1[2]:>12}")
+        print(f"  {'v2':<28}{mib(v2[0]):>16}{mib(v2[1]):>12}{v2[2]:>12}")
+        print(f"  {'column (compressed MiB)':<28}{'v1':>16}{'v2':>12}")
+        v1_columns, v2_columns = column_storage(client, f"{table}_bench_v1"), column_storage(client, f"{table}_bench_v2")
+        for column, size in v1_columns.items():
+            print(f"  {column:<28}{mib(size):>16}{mib(v2_columns.get(column, 0)):>12}")
+
+        print(f"  {'lookup':<28}{'v1 ms':>16}{'v2 ms':>12}{'speedup':>12}")
+        for name, sql in LOOKUPS[table].items():
+            v1_seconds = timed(client, sql.format(table=f"{table}_bench_v1"), args.repeat)
+            v2_seconds = timed(client, sql.format(table=f"{table}_bench_v2"), args.repeat)
+            print(f"  {name:<28}{v1_seconds * 1000:>16.1f}{v2_seconds * 1000:>12.1f}{v1_seconds / v2_seconds:>11.1f}x")
+
+        if not args.keep:
+            client.command(f"DROP TABLE {table}_bench_v1")
+            client.command(f"DROP TABLE {table}_bench_v2")
+
+
+if __name__ == "__main__":
+    main()
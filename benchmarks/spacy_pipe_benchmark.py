@@ -0,0 +1,80 @@
+# Benchmark: structured-column NER throughput, per-cell nlp(text) versus batched nlp.pipe.
+#
+# Runs in-process on a synthetic column (no ClickHouse needed), e.g.
+#   python -m benchmarks.spacy_pipe_benchmark --cells 100000 --batch-sizes 64 256 1024 --n-process 1 2
+
+import argparse
+import random
+import time
+
+import spacy
+
+from app.utils.pii_scan.structured_ner_main import SPACY_STRUCTURED_MODEL, load_ner_only_model
+
+FIRST_NAMES = ["Aarav", "Priya", "John", "Maria", "Wei", "Fatima", "Lucas", "Ananya"]
+LAST_NAMES = ["Sharma", "Smith", "Garcia", "Chen", "Khan", "Müller", "Iyer", "Brown"]
+CITIES = ["Mumbai", "London", "New York", "Berlin", "Bengaluru", "Singapore"]
+
+
+def build_column(cell_count: int, seed: int = 7):
+    """Builds a mixed profiling column: names, addresses, emails, phone numbers and free-form notes."""
+    rng = random.Random(seed)
+    cells = []
+    for i in range(cell_count):
+        first, last, city = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), rng.choice(CITIES)
+        kind = i % 5
+        if kind == 0:
+            cells.append(f"{first} {last}")
+        elif kind == 1:
+            cells.append(f"{rng.randint(1, 999)} Main Street, {city}")
+        elif kind == 2:
+            cells.append(f"{first.lower()}.{last.lower()}@example.com")
+        elif kind == 3:
+            cells.append(f"+91 {rng.randint(7000000000, 9999999999)}")
+        else:
+            cells.append(f"Called {first} in {city} on {rng.randint(1, 28)} March about order {rng.randint(1000, 9999)}")
+    return cells
+
+
+def per_cell(nlp, cells, batch_size, n_process):
+    for text in cells:
+        nlp(text).ents
+
+
+def piped(nlp, cells, batch_size, n_process):
+    for doc in nlp.pipe(cells, batch_size=batch_size, n_process=n_process):
+        doc.ents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare spaCy inference modes for structured column scans")
+    parser.add_argument("--cells", type=int, default=100_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[64, 256, 1024])
+    parser.add_argument("--n-process", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--skip-per-cell", action="store_true", help="skip the slow baseline")
+    args = parser.parse_args()
+
+    cells = build_column(args.cells)
+    full_nlp = spacy.load(SPACY_STRUCTURED_MODEL)
+    ner_nlp = load_ner_only_model()
+    print(f"full pipeline: {full_nlp.pipe_names}")
+    print(f"ner-only pipeline: {ner_nlp.pipe_names}")
+
+    configs = []
+    if not args.skip_per_cell:
+        configs.append(("nlp(text), full pipeline", full_nlp, per_cell, 1, 1))
+    configs.append((f"pipe, full pipeline, batch {args.batch_sizes[0]}", full_nlp, piped, args.batch_sizes[0], 1))
+    for n_process in args.n_process:
+        for batch_size in args.batch_sizes:
+            configs.append((f"pipe, ner only, batch {batch_size}, n_process {n_process}", ner_nlp, piped, batch_size, n_process))
+
+    print(f"{'configuration':<48}{'seconds':>10}{'cells/s':>12}")
+    for name, nlp, run, batch_size, n_process in configs:
+        start = time.perf_counter()
+        run(nlp, cells, batch_size, n_process)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<48}{elapsed:>10.2f}{round(args.cells / elapsed):>12}")
+
+
+if __name__ == "__main__":
+    main()
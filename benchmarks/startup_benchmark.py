@@ -0,0 +1,87 @@
+# Startup benchmark: how long `import main` takes in a fresh interpreter, and how long a uvicorn
+# process takes until GET /ready returns 200 (all models warmed up). Run from the repo root, e.g.
+#   python -m benchmarks.startup_benchmark --runs 5 --port 8099
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def import_seconds() -> float:
+    """Wall time of `import main` in a new interpreter (includes interpreter startup)."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], check=True)
+    return time.perf_counter() - start
+
+
+def poll(url: str, timeout: float):
+    """Returns the status code of url, or None if the server is not accepting connections yet."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None
+
+
+def time_to_ready(port: int, deadline_seconds: float):
+    """
+    Starts uvicorn and returns (seconds until it answers /, seconds until /ready is 200).
+    Either value is None if it was not reached before the deadline.
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    start = time.perf_counter()
+    serving_seconds = ready_seconds = None
+    try:
+        while time.perf_counter() - start < deadline_seconds:
+            if serving_seconds is None and poll(f"http://127.0.0.1:{port}/", 1) == 200:
+                serving_seconds = time.perf_counter() - start
+            if serving_seconds is not None and poll(f"http://127.0.0.1:{port}/ready", 1) == 200:
+                ready_seconds = time.perf_counter() - start
+                break
+            time.sleep(0.1)
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+    return serving_seconds, ready_seconds
+
+
+def describe(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return "not reached"
+    return f"median {statistics.median(values):.2f}s  min {min(values):.2f}s  max {max(values):.2f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-ready of the service")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--deadline", type=float, default=300, help="Seconds to wait for /ready per run")
+    parser.add_argument("--skip-server", action="store_true", help="Only measure import time")
+    args = parser.parse_args()
+
+    imports = [import_seconds() for _ in range(args.runs)]
+    print(f"import main        {describe(imports)}")
+    if args.skip_server:
+        return
+
+    serving, ready = [], []
+    for _ in range(args.runs):
+        serving_seconds, ready_seconds = time_to_ready(args.port, args.deadline)
+        serving.append(serving_seconds)
+        ready.append(ready_seconds)
+    print(f"serving requests   {describe(serving)}")
+    print(f"/ready returns 200 {describe(ready)}")
+
+
+if __name__ == "__main__":
+    main()
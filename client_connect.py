@@ -1,17 +1,257 @@
 # ITs only for testing use of the connection
 
 import clickhouse_connect
+from clickhouse_connect.driver.exceptions import OperationalError
 from dotenv import load_dotenv
+from contextlib import contextmanager
 import os
+import queue
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.metrics import metrics
 
 # Load environment variables from the .env file
 load_dotenv()
 
-class Connection:
-    client = clickhouse_connect.get_client(
+logger = logging.getLogger(__name__)
+
+# Compression used on the wire for queries and inserts: lz4, zstd, gzip, br or none
+CLICKHOUSE_COMPRESSION = os.getenv('CLICKHOUSE_COMPRESSION', 'lz4').lower()
+# Maximum number of ClickHouse clients (each with its own HTTP session) open at the same time
+CLICKHOUSE_POOL_SIZE = int(os.getenv('CLICKHOUSE_POOL_SIZE', '8'))
+# Seconds a caller waits for a free client before giving up
+CLICKHOUSE_POOL_TIMEOUT = float(os.getenv('CLICKHOUSE_POOL_TIMEOUT', '30'))
+# Clients idle for longer than this are pinged before they are handed out again
+CLICKHOUSE_POOL_HEALTHCHECK_SECONDS = float(os.getenv('CLICKHOUSE_POOL_HEALTHCHECK_SECONDS', '30'))
+# Threads running ClickHouse calls for async code; at most this many run at once, the rest wait in line
+CLICKHOUSE_ASYNC_WORKERS = int(os.getenv('CLICKHOUSE_ASYNC_WORKERS', str(CLICKHOUSE_POOL_SIZE)))
+
+
+def _create_client():
+    return clickhouse_connect.get_client(
         host=os.getenv('CLICKHOUSE_HOST'),
         port=os.getenv('CLICKHOUSE_PORT'),
         username=os.getenv('CLICKHOUSE_USERNAME'),
         password=os.getenv('CLICKHOUSE_PASSWORD'),
-        database=os.getenv('CLICKHOUSE_DATABASE')
-    )
\ No newline at end of file
+        database=os.getenv('CLICKHOUSE_DATABASE'),
+        compress=False if CLICKHOUSE_COMPRESSION == 'none' else CLICKHOUSE_COMPRESSION
+    )
+
+
+class ClickHousePool:
+    """
+    Pool of ClickHouse clients. A caller holds a client exclusively while it uses it, so concurrent
+    requests and threads never share a session. Clients are created on demand up to max_size,
+    pinged after being idle and replaced when the connection to ClickHouse is lost.
+    """
+    def __init__(self, max_size: int = CLICKHOUSE_POOL_SIZE, timeout: float = CLICKHOUSE_POOL_TIMEOUT,
+                 healthcheck_seconds: float = CLICKHOUSE_POOL_HEALTHCHECK_SECONDS, factory=_create_client):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.healthcheck_seconds = healthcheck_seconds
+        self._factory = factory
+        # (client, time it was returned); LIFO so idle clients beyond the working set stay idle
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._in_use = 0
+
+    def _update_gauges(self):
+        metrics.set_gauge("clickhouse_pool.size", self._size)
+        metrics.set_gauge("clickhouse_pool.in_use", self._in_use)
+
+    def _checkout(self):
+        start_time = time.perf_counter()
+        client = None
+        try:
+            client, returned_at = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._size < self.max_size
+                if create:
+                    self._size += 1
+            if create:
+                try:
+                    client, returned_at = self._factory(), time.monotonic()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                    raise
+            else:
+                try:
+                    client, returned_at = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    metrics.increment("clickhouse_pool.timeouts")
+                    raise TimeoutError(f"No ClickHouse connection became free within {self.timeout} seconds")
+        metrics.observe("clickhouse_pool.wait_seconds", time.perf_counter() - start_time)
+
+        if time.monotonic() - returned_at > self.healthcheck_seconds and not self._ping(client):
+            metrics.increment("clickhouse_pool.health_check_failures")
+            client = self._replace(client)
+        with self._lock:
+            self._in_use += 1
+            self._update_gauges()
+        return client
+
+    @staticmethod
+    def _ping(client) -> bool:
+        try:
+            return bool(client.ping())
+        except Exception:
+            return False
+
+    def _replace(self, client):
+        """Closes a broken client and opens a new one in its place."""
+        try:
+            client.close()
+        except Exception:
+            pass
+        metrics.increment("clickhouse_pool.reconnects")
+        logger.warning("Reconnecting a pooled ClickHouse client")
+        try:
+            return self._factory()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._update_gauges()
+            raise
+
+    def _discard(self, client):
+        try:
+            client.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._in_use -= 1
+            self._update_gauges()
+
+    def _checkin(self, client):
+        with self._lock:
+            self._in_use -= 1
+            self._update_gauges()
+        self._idle.put((client, time.monotonic()))
+
+    @contextmanager
+    def acquire(self):
+        """
+        Checks out a client for the duration of the block. Use it directly when several statements
+        must run on the same session; single calls can go through Connection.client.
+        """
+        client = self._checkout()
+        try:
+            yield client
+        except OperationalError:
+            # The connection is gone; do not hand this client out again
+            self._discard(client)
+            metrics.increment("clickhouse_pool.discarded")
+            raise
+        except BaseException:
+            self._checkin(client)
+            raise
+        else:
+            self._checkin(client)
+
+    def close_all(self):
+        while True:
+            try:
+                client, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                client.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._size -= 1
+        self._update_gauges()
+
+    def stats(self):
+        with self._lock:
+            return {"size": self._size, "in_use": self._in_use, "idle": self._idle.qsize(), "max_size": self.max_size}
+
+
+class PooledClient:
+    """
+    Drop-in for a clickhouse-connect client: every call checks a client out of the pool for just that call.
+    """
+    def __init__(self, pool: ClickHousePool):
+        self._pool = pool
+
+    def _call(self, method: str, *args, **kwargs):
+        with self._pool.acquire() as client:
+            return getattr(client, method)(*args, **kwargs)
+
+    def query(self, *args, **kwargs):
+        return self._call("query", *args, **kwargs)
+
+    def command(self, *args, **kwargs):
+        return self._call("command", *args, **kwargs)
+
+    def insert(self, *args, **kwargs):
+        return self._call("insert", *args, **kwargs)
+
+    def insert_df(self, *args, **kwargs):
+        return self._call("insert_df", *args, **kwargs)
+
+    def query_df(self, *args, **kwargs):
+        return self._call("query_df", *args, **kwargs)
+
+    def ping(self) -> bool:
+        return self._call("ping")
+
+    def close(self):
+        # Pooled clients are owned by the pool; see ClickHousePool.close_all
+        pass
+
+
+class AsyncClickHouse:
+    """
+    Async access for request handlers: ClickHouse work runs on a dedicated, bounded thread pool,
+    so a slow query or insert never blocks the event loop and bursts queue up instead of
+    exhausting the connection pool.
+
+        rows = await Connection.async_client.query("SELECT ...")
+        await Connection.async_client.run(insert_columns, Connection.client, "table", columns)
+    """
+    def __init__(self, client: PooledClient, max_workers: int = CLICKHOUSE_ASYNC_WORKERS):
+        self._client = client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="clickhouse-io")
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs), a blocking function doing ClickHouse I/O, off the event loop."""
+        submitted_at = time.perf_counter()
+
+        def timed_call():
+            metrics.observe("clickhouse_io.queue_seconds", time.perf_counter() - submitted_at)
+            return fn(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, timed_call)
+        finally:
+            metrics.observe("clickhouse_io.call_seconds", time.perf_counter() - submitted_at)
+
+    async def query(self, *args, **kwargs):
+        return await self.run(self._client.query, *args, **kwargs)
+
+    async def command(self, *args, **kwargs):
+        return await self.run(self._client.command, *args, **kwargs)
+
+    async def insert(self, *args, **kwargs):
+        return await self.run(self._client.insert, *args, **kwargs)
+
+    async def insert_df(self, *args, **kwargs):
+        return await self.run(self._client.insert_df, *args, **kwargs)
+
+
+clickhouse_pool = ClickHousePool()
+
+
+class Connection:
+    pool = clickhouse_pool
+    client = PooledClient(clickhouse_pool)
+    async_client = AsyncClickHouse(client)
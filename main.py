@@ -1,8 +1,21 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from app.routers import omd_router
 from app.routers import ner_router
 from app.routers import unstructured_ner_router
 from app.routers import pii_scanner_router
+from app.utils.scan_executor import shutdown_scan_executor
+from app.utils.metrics import metrics
+from app.utils.model_registry import model_registry
+from app.utils.data_element_cache import data_element_cache
+from app.utils.nltk_resources import ensure_nltk_data
+from app.utils.readiness import readiness
+from app.utils.result_writer import close_result_writers
+from client_connect import Connection, clickhouse_pool
+from app.utils.pii_scan.structured_ner_main import ner_worker_pool
 from middleware.custom_cors_middleware import CustomCORSMiddleware
 
 origins = [
@@ -20,7 +33,59 @@ origins = [
  
 ]
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+def _check_clickhouse():
+    Connection.client.command("SELECT 1")
+    data_element_cache.load(Connection.client)
+
+
+def _warm_pii_scanner():
+    from pii_scanner.constants.patterns_countries import Regions
+    scanner = model_registry.get("pii_scanner")
+    # The scanner loads its SpaCy model on the first scan, not in its constructor
+    asyncio.run(scanner.scan(data=["warmup"], region=Regions.IN))
+
+
+# Components warmed up in the background after startup; GET /ready reports their state
+WARMUP_STEPS = {
+    "nltk_data": ensure_nltk_data,
+    "clickhouse": _check_clickhouse,
+    "pii_scanner": _warm_pii_scanner,
+}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve immediately and load models in the background; nothing heavy happens at import time
+    for name in WARMUP_STEPS:
+        readiness.register(name)
+    app.state.warmup_tasks = [
+        asyncio.create_task(asyncio.to_thread(readiness.run, name, warmup))
+        for name, warmup in WARMUP_STEPS.items()
+    ]
+    # Fail /process-files jobs cut short by the last shutdown; their spool directories are listed before any
+    # request can create a new one
+    app.state.interrupted_scan_task = asyncio.create_task(
+        pii_scanner_router.fail_interrupted_jobs(pii_scanner_router.interrupted_job_dirs())
+    )
+    # Pick up MinIO folder jobs cut short by a shutdown or crash of any instance
+    app.state.resume_task = asyncio.create_task(unstructured_ner_router.resume_interrupted_jobs())
+    yield
+    app.state.resume_task.cancel()
+    # Let warmups that are still running finish before tearing down what they start
+    await asyncio.gather(*app.state.warmup_tasks, return_exceptions=True)
+    try:
+        await Connection.async_client.run(data_element_cache.flush, Connection.client)
+    except Exception as e:
+        logger.error(f"Could not flush buffered data_element rows: {str(e)}")
+    # Write out NER result rows still waiting in the buffered writers
+    await asyncio.to_thread(close_result_writers)
+    shutdown_scan_executor()
+    await asyncio.to_thread(ner_worker_pool.stop)
+    clickhouse_pool.close_all()
+
+app = FastAPI(lifespan=lifespan)
 
 allow_origins = ["*"]
 allow_methods = ["*"]
@@ -44,3 +109,12 @@ app.include_router(pii_scanner_router.router, prefix="/instant-pii-scanner")
 @app.get("/")
 async def root():
     return {"message": "Service Running"}
+
+@app.get("/metrics")
+async def get_metrics():
+    return {**metrics.snapshot(), "models": model_registry.stats(), "clickhouse_pool": clickhouse_pool.stats()}
+
+@app.get("/ready")
+async def ready():
+    snapshot = readiness.snapshot()
+    return JSONResponse(status_code=200 if snapshot["ready"] else 503, content=snapshot)
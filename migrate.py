@@ -14,6 +14,24 @@ client = clickhouse_connect.get_client(
     database=os.getenv('CLICKHOUSE_DATABASE')
 )
 
+def strip_comment(line):
+    """Remove a trailing `--` comment from a SQL line, ignoring `--` inside string literals."""
+    in_string = False
+    for i, char in enumerate(line):
+        if char == "'":
+            in_string = not in_string
+        elif not in_string and line.startswith('--', i):
+            return line[:i]
+    return line
+
+def split_statements(sql):
+    """
+    Split a SQL file into individual statements, since ClickHouse executes one statement per command.
+    Comments are stripped first so a `;` inside a comment does not end a statement.
+    """
+    code = "\n".join(strip_comment(line) for line in sql.splitlines())
+    return [statement.strip() for statement in code.split(';') if statement.strip()]
+
 # Directory containing migration files
 migration_dir = './migrations'
 migrations = sorted(os.listdir(migration_dir))
@@ -37,7 +55,8 @@ for migration in migrations:
         try:
             with open(os.path.join(migration_dir, migration), 'r') as f:
                 sql = f.read()
-                client.command(sql)  # Execute the migration SQL
+                for statement in split_statements(sql):
+                    client.command(statement)  # Execute the migration SQL
                 print(f"Applied migration {migration_id}")
                 # Log the applied migration
                 client.command("INSERT INTO migration_log (id) VALUES (%s)", (migration_id,))
@@ -46,6 +65,229 @@ for migration in migrations:
 
 print("All migrations applied.")
 
+# data_element_dict reads data_element_lookup (migrations/019.sql) through a ClickHouse source, which would
+# otherwise connect as `default` to the default database. It is recreated on every run with the credentials
+# and database of this connection, so it follows credential changes; SHOW CREATE hides the password.
+DATA_ELEMENT_DICTIONARY = """
+CREATE OR REPLACE DICTIONARY data_element_dict (
+    parameter_value String,
+    parameter_name String DEFAULT 'UNKNOWN',
+    parameter_sensitivity String DEFAULT ''
+)
+PRIMARY KEY parameter_value
+SOURCE(CLICKHOUSE(USER {user} PASSWORD {password} DB {database} TABLE 'data_element_lookup'))
+LAYOUT(COMPLEX_KEY_HASHED())
+LIFETIME(MIN 60 MAX 300)"""
+
+def sql_string(value):
+    """Quote value as a ClickHouse string literal."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+try:
+    client.command(DATA_ELEMENT_DICTIONARY.format(
+        user=sql_string(os.getenv('CLICKHOUSE_USERNAME') or 'default'),
+        password=sql_string(os.getenv('CLICKHOUSE_PASSWORD') or ''),
+        database=sql_string(client.query("SELECT currentDatabase()").result_rows[0][0])
+    ))
+    print("Created dictionary data_element_dict")
+except Exception as e:
+    print(f"Error creating dictionary data_element_dict: {e}")
+
+# Tables filled from a source table on insert: rollup -> (materialized view or table filled at insert,
+# source table, insert-time expression or None, query matching the view's). The rollups of migrations/015.sql
+# are filled by materialized views, profiler_metric_points (migrations/018.sql) by the profiler upload.
+# Rows the source held before the view (or table) existed are copied in once, one source partition at a time.
+# Only rows older than the view are copied, so rows the view already counted are not counted twice; rollups
+# made only of uniq states skip that filter.
+ROLLUP_BACKFILLS = {
+    "column_ner_rollup": ("column_ner_rollup_mv", "column_ner_results", "created_at", """
+        SELECT table_id, detected_entity, data_element, countState(), uniqState(column_name)
+        FROM column_ner_results WHERE {condition}
+        GROUP BY table_id, detected_entity, data_element"""),
+    "profiler_service_rollup": ("profiler_service_rollup_mv", "profiler_data_time_series", None, """
+        SELECT splitByString('.', entityFQNHash)[1] AS service_hash,
+            uniqState(arrayElement(splitByString('.', entityFQNHash), 2)),
+            uniqState(arrayElement(splitByString('.', entityFQNHash), 3)),
+            uniqState(arrayElement(splitByString('.', entityFQNHash), 4))
+        FROM profiler_data_time_series WHERE {condition}
+        GROUP BY service_hash"""),
+    "ner_unstructured_rollup": ("ner_unstructured_rollup_mv", "ner_unstructured_data", "created_at", """
+        SELECT detected_entity, data_element, region, source, sub_service, file_type,
+            countState(), uniqState(file_name), sumState(file_size)
+        FROM ner_unstructured_data WHERE {condition}
+        GROUP BY detected_entity, data_element, region, source, sub_service, file_type"""),
+    # The json is repaired the way omd_json_extract.parse_json_column does; metrics match PROFILE_POINT_METRICS
+    "profiler_metric_points": ("profiler_metric_points", "profiler_data_time_series",
+                               "fromUnixTimestamp64Micro(toInt64(ingest_version))", """
+        SELECT entityFQNHash, JSONExtractUInt(doc, 'timestamp'),
+            if(jsonSchema = 'columnProfile', JSONExtractString(doc, 'name'), ''), metric, JSONExtractFloat(doc, metric),
+            ingest_version
+        FROM (
+            SELECT entityFQNHash, jsonSchema, ingest_version,
+                replaceRegexpOne(replaceAll(replaceAll(replaceAll(json, '\\'', '"'), 'False', 'false'), 'True', 'true'), ',+$', '') AS doc
+            FROM profiler_data_time_series FINAL
+            WHERE {condition} AND jsonSchema IN ('tableProfile', 'columnProfile')
+        )
+        ARRAY JOIN if(jsonSchema = 'tableProfile',
+            ['rowCount', 'columnCount', 'sizeInByte', 'profileSample'],
+            ['valuesCount', 'nullCount', 'nullProportion', 'uniqueCount', 'uniqueProportion', 'distinctCount',
+             'distinctProportion', 'duplicateCount', 'missingCount', 'missingPercentage', 'min', 'max', 'minLength',
+             'maxLength', 'mean', 'sum', 'stddev', 'variance', 'median', 'firstQuartile', 'thirdQuartile',
+             'interQuartileRange', 'nonParametricSkew']) AS metric
+        WHERE JSONType(doc, metric) IN ('Int64', 'UInt64', 'Double')"""),
+}
+
+def backfill_rollup(rollup, view, source, created_column, select):
+    """
+    Copies the rows of source that predate view into rollup. Each finished partition is recorded in
+    migration_log, so an interrupted backfill carries on with the partitions it has not done yet.
+    """
+    if not client.query(
+        "SELECT 1 FROM system.tables WHERE database = currentDatabase() AND name = {view:String}",
+        parameters={"view": view}
+    ).result_rows:
+        raise RuntimeError(f"{view} does not exist")
+    partitions = [row[0] for row in client.query(
+        "SELECT DISTINCT partition_id FROM system.parts WHERE database = currentDatabase() AND table = {table:String} AND active ORDER BY partition_id",
+        parameters={"table": source}
+    ).result_rows]
+    for partition_id in partitions:
+        log_id = f"backfill_{rollup}_{partition_id}"
+        if log_id in applied_migrations:
+            continue
+        condition = "_partition_id = {partition:String}"
+        if created_column:
+            condition += (f" AND {created_column} < (SELECT metadata_modification_time FROM system.tables"
+                          " WHERE database = currentDatabase() AND name = {view:String})")
+        client.command(
+            f"INSERT INTO {rollup} {select.replace('{condition}', condition)}",
+            parameters={"partition": partition_id, "view": view}
+        )
+        client.command("INSERT INTO migration_log (id) VALUES (%s)", (log_id,))
+        print(f"Backfilled {rollup} from partition {partition_id} of {source}")
+
+for rollup, (view, source, created_column, select) in ROLLUP_BACKFILLS.items():
+    if f"backfill_{rollup}" in applied_migrations:
+        continue
+    try:
+        backfill_rollup(rollup, view, source, created_column, select)
+        client.command("INSERT INTO migration_log (id) VALUES (%s)", (f"backfill_{rollup}",))
+        applied_migrations.add(f"backfill_{rollup}")
+        print(f"Backfilled {rollup}")
+    except Exception as e:
+        print(f"Error backfilling {rollup}: {e}")
+
+# Tables rebuilt with a new schema (migrations/017.sql): table -> insert-time column or None. The rows of
+# table are copied into table_v2 while the service keeps writing to table, the two are exchanged and the
+# old table is dropped. Writers and the rollup materialized views follow the table name across the
+# exchange, so neither needs to change. Rows are matched on id, which is unique in all of these tables.
+TABLE_SWAPS = {
+    "column_ner_results": "created_at",
+    "data_element": None,
+    "ner_unstructured_data": "created_at",
+}
+
+def table_exists(table):
+    return bool(client.query(
+        "SELECT 1 FROM system.tables WHERE database = currentDatabase() AND name = {table:String}",
+        parameters={"table": table}
+    ).result_rows)
+
+def insertable_columns(table):
+    """Columns of table that an INSERT can write, i.e. all but MATERIALIZED and ALIAS columns."""
+    return ", ".join(row[0] for row in client.query(
+        "SELECT name FROM system.columns WHERE database = currentDatabase() AND table = {table:String}"
+        " AND default_kind NOT IN ('MATERIALIZED', 'ALIAS') ORDER BY position",
+        parameters={"table": table}
+    ).result_rows)
+
+def swap_table(table, created_column):
+    """
+    Replaces table with table_v2, copying every row of table across without stopping the writers.
+
+    1. Each partition of table is copied into table_v2; finished partitions are recorded in migration_log.
+    2. Rows written to table during the copy are caught up by id, then the tables are exchanged.
+    3. Rows written to the old table between the catch-up and the exchange are attached to the new table
+       through a scratch table. ATTACH PARTITION does not fire the materialized views, which already
+       counted these rows when they were first inserted.
+    The catch-ups compare ids with NOT IN, which holds the ids of the compared range in memory; for tables
+    with an insert-time column the range starts an hour before the copy did.
+    """
+    new_table = f"{table}_v2"
+    columns = insertable_columns(table)
+    since = ""
+    if created_column:
+        since = (f" AND {created_column} >= (SELECT min(applied_at) - INTERVAL 1 HOUR FROM migration_log"
+                 f" WHERE id LIKE 'swap_{table}_%')")
+
+    if f"swap_{table}_exchanged" not in applied_migrations:
+        if not table_exists(new_table):
+            raise RuntimeError(f"Table {new_table} does not exist")
+        partitions = [row[0] for row in client.query(
+            "SELECT DISTINCT partition_id FROM system.parts WHERE database = currentDatabase() AND table = {table:String} AND active ORDER BY partition_id",
+            parameters={"table": table}
+        ).result_rows]
+        for partition_id in partitions:
+            log_id = f"swap_{table}_{partition_id}"
+            if log_id in applied_migrations:
+                continue
+            # A copy interrupted part way is redone without the rows it already wrote
+            started = f"{log_id}_started" in applied_migrations
+            if not started:
+                client.command("INSERT INTO migration_log (id) VALUES (%s)", (f"{log_id}_started",))
+            condition = "_partition_id = {partition:String}"
+            if started:
+                condition += f" AND id NOT IN (SELECT id FROM {new_table})"
+            client.command(
+                f"INSERT INTO {new_table} ({columns}) SELECT {columns} FROM {table} WHERE {condition}",
+                parameters={"partition": partition_id}
+            )
+            client.command("INSERT INTO migration_log (id) VALUES (%s)", (log_id,))
+            print(f"Copied partition {partition_id} of {table} into {new_table}")
+
+        client.command(
+            f"INSERT INTO {new_table} ({columns}) SELECT {columns} FROM {table}"
+            f" WHERE id NOT IN (SELECT id FROM {new_table} WHERE 1{since}){since}"
+        )
+        client.command(f"EXCHANGE TABLES {table} AND {new_table}")
+        client.command("INSERT INTO migration_log (id) VALUES (%s)", (f"swap_{table}_exchanged",))
+        applied_migrations.add(f"swap_{table}_exchanged")
+        print(f"Exchanged {table} and {new_table}")
+
+    if not table_exists(new_table):
+        return
+    # new_table now holds the old rows
+    catchup_table = f"{table}_catchup"
+    client.command(f"DROP TABLE IF EXISTS {catchup_table}")
+    client.command(f"CREATE TABLE {catchup_table} AS {table}")
+    client.command(
+        f"INSERT INTO {catchup_table} ({columns}) SELECT {columns} FROM {new_table}"
+        f" WHERE id NOT IN (SELECT id FROM {table} WHERE 1{since}){since}"
+    )
+    for row in client.query(
+        "SELECT DISTINCT partition_id FROM system.parts WHERE database = currentDatabase() AND table = {table:String} AND active",
+        parameters={"table": catchup_table}
+    ).result_rows:
+        client.command(f"ALTER TABLE {table} ATTACH PARTITION ID '{row[0]}' FROM {catchup_table}")
+    client.command(f"DROP TABLE {catchup_table}")
+    client.command(f"DROP TABLE {new_table}")
+
+for table, created_column in TABLE_SWAPS.items():
+    if f"swap_{table}" in applied_migrations:
+        continue
+    pending = [rollup for rollup, (_, source, _, _) in ROLLUP_BACKFILLS.items()
+               if source == table and f"backfill_{rollup}" not in applied_migrations]
+    if pending:
+        # The backfills select by the partitions of the old table
+        print(f"Skipping the swap of {table} until {', '.join(pending)} is backfilled")
+        continue
+    try:
+        swap_table(table, created_column)
+        client.command("INSERT INTO migration_log (id) VALUES (%s)", (f"swap_{table}",))
+        print(f"Swapped {table}")
+    except Exception as e:
+        print(f"Error swapping {table}: {e}")
+
 # Apply views from structured and unstructured directories
 structured_views_dir = './views/structured'
 unstructured_views_dir = './views/unstructured'
@@ -56,7 +298,8 @@ for view in structured_views:
     try:
         with open(os.path.join(structured_views_dir, view), 'r') as f:
             sql = f.read()
-            client.command(sql)
+            for statement in split_statements(sql):
+                client.command(statement)
             print(f"Applied structured view {view}")
     except Exception as e:
         print(f"Error applying structured view {view}: {e}")
@@ -67,7 +310,8 @@ for view in unstructured_views:
     try:
         with open(os.path.join(unstructured_views_dir, view), 'r') as f:
             sql = f.read()
-            client.command(sql)
+            for statement in split_statements(sql):
+                client.command(statement)
             print(f"Applied unstructured view {view}")
     except Exception as e:
         print(f"Error applying unstructured view {view}: {e}")
\ No newline at end of file
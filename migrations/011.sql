@@ -0,0 +1,114 @@
+-- Convert the OMD entity tables to ReplacingMergeTree so uploads can be appended
+-- (OMD_UPSERT_MODE=replacing) instead of issuing ALTER TABLE ... DELETE mutations.
+-- Each table is rebuilt as <table>_replacing, filled from the current table and swapped in atomically.
+-- Tables that carry OpenMetadata's updatedAt use it as the version; the others get an ingest_version
+-- populated at insert time, so the most recently ingested row wins.
+
+-- dbservice_entity
+DROP TABLE IF EXISTS dbservice_entity_replacing;
+CREATE TABLE dbservice_entity_replacing (
+    id String,  -- VARCHAR(36)
+    name String,  -- VARCHAR(256)
+    serviceType String,  -- VARCHAR(256)
+    json String,  -- Store JSON as String
+    updatedAt UInt64,  -- BIGINT UNSIGNED
+    updatedBy String,  -- VARCHAR(256)
+    deleted UInt8,  -- TINYINT(1)
+    nameHash String  -- VARCHAR(256)
+) ENGINE = ReplacingMergeTree(updatedAt)
+ORDER BY id
+SETTINGS index_granularity = 8192;
+INSERT INTO dbservice_entity_replacing (id, name, serviceType, json, updatedAt, updatedBy, deleted, nameHash)
+SELECT id, name, serviceType, json, updatedAt, updatedBy, deleted, nameHash FROM dbservice_entity;
+EXCHANGE TABLES dbservice_entity AND dbservice_entity_replacing;
+DROP TABLE dbservice_entity_replacing;
+
+-- database_schema_entity
+DROP TABLE IF EXISTS database_schema_entity_replacing;
+CREATE TABLE database_schema_entity_replacing (
+    id String,  -- VARCHAR(36)
+    json String,  -- Store JSON as String
+    updatedAt UInt64,  -- BIGINT UNSIGNED
+    updatedBy String,  -- VARCHAR(256)
+    deleted UInt8,  -- TINYINT(1)
+    fqnHash String,  -- VARCHAR(768)
+    name String  -- VARCHAR(256)
+) ENGINE = ReplacingMergeTree(updatedAt)
+ORDER BY id
+SETTINGS index_granularity = 8192;
+INSERT INTO database_schema_entity_replacing (id, json, updatedAt, updatedBy, deleted, fqnHash, name)
+SELECT id, json, updatedAt, updatedBy, deleted, fqnHash, name FROM database_schema_entity;
+EXCHANGE TABLES database_schema_entity AND database_schema_entity_replacing;
+DROP TABLE database_schema_entity_replacing;
+
+-- table_entity
+DROP TABLE IF EXISTS table_entity_replacing;
+CREATE TABLE table_entity_replacing (
+    id String,  -- Equivalent to VARCHAR(36), storing 'id' from JSON
+    json String,  -- Storing full JSON as String
+    updatedAt UInt64,  -- Equivalent to BIGINT UNSIGNED, extracting 'updatedAt' from JSON
+    updatedBy String,  -- Equivalent to VARCHAR(256), extracting 'updatedBy' from JSON
+    deleted UInt8,  -- Equivalent to TINYINT(1), extracting 'deleted' from JSON
+    fqnHash String,  -- Equivalent to VARCHAR(768), nullable
+    name String  -- Equivalent to VARCHAR(256)
+) ENGINE = ReplacingMergeTree(updatedAt)
+ORDER BY id
+SETTINGS index_granularity = 8192;
+INSERT INTO table_entity_replacing (id, json, updatedAt, updatedBy, deleted, fqnHash, name)
+SELECT id, json, updatedAt, updatedBy, deleted, fqnHash, name FROM table_entity;
+EXCHANGE TABLES table_entity AND table_entity_replacing;
+DROP TABLE table_entity_replacing;
+
+-- profiler_data_time_series
+DROP TABLE IF EXISTS profiler_data_time_series_replacing;
+CREATE TABLE profiler_data_time_series_replacing (
+    entityFQNHash String,  -- Equivalent to VARCHAR(768)
+    extension String,  -- Equivalent to VARCHAR(256)
+    jsonSchema String,  -- Equivalent to VARCHAR(256)
+    json String,  -- Storing full JSON as String
+    operation String,  -- Extracted from JSON, equivalent to 'operation' in MySQL
+    timestamp UInt64,  -- Equivalent to BIGINT UNSIGNED, extracted from JSON
+    ingest_version UInt64 DEFAULT toUnixTimestamp64Micro(now64(6))  -- Latest ingest wins on merge
+) ENGINE = ReplacingMergeTree(ingest_version)
+ORDER BY (entityFQNHash, extension, operation, timestamp)
+SETTINGS index_granularity = 8192;
+INSERT INTO profiler_data_time_series_replacing (entityFQNHash, extension, jsonSchema, json, operation, timestamp)
+SELECT entityFQNHash, extension, jsonSchema, json, operation, timestamp FROM profiler_data_time_series;
+EXCHANGE TABLES profiler_data_time_series AND profiler_data_time_series_replacing;
+DROP TABLE profiler_data_time_series_replacing;
+
+-- dbservice_entity_meta_info: one row per dbservice entity, keyed on dbservice_entity_id instead of a random UUID
+DROP TABLE IF EXISTS dbservice_entity_meta_info_replacing;
+CREATE TABLE dbservice_entity_meta_info_replacing (
+    id UUID DEFAULT generateUUIDv4(),
+    dbservice_entity_id String,
+    dbservice_entity_name String,
+    source String,
+    region String,
+    ingest_version UInt64 DEFAULT toUnixTimestamp64Micro(now64(6))  -- Latest ingest wins on merge
+) ENGINE = ReplacingMergeTree(ingest_version)
+ORDER BY dbservice_entity_id;
+INSERT INTO dbservice_entity_meta_info_replacing (id, dbservice_entity_id, dbservice_entity_name, source, region)
+SELECT id, dbservice_entity_id, dbservice_entity_name, source, region FROM dbservice_entity_meta_info;
+EXCHANGE TABLES dbservice_entity_meta_info AND dbservice_entity_meta_info_replacing;
+DROP TABLE dbservice_entity_meta_info_replacing;
+
+-- profiler_metadata: one row per (entity, profile timestamp)
+DROP TABLE IF EXISTS profiler_metadata_replacing;
+CREATE TABLE profiler_metadata_replacing (
+    entityFQNHash String,
+    rowCount Float64,
+    timestamp UInt64,
+    sizeInByte Float64,
+    columnCount Float64,
+    profileSample Float64,
+    createDateTime UInt64,
+    profileSampleType String,
+    ingest_version UInt64 DEFAULT toUnixTimestamp64Micro(now64(6))  -- Latest ingest wins on merge
+)
+ENGINE = ReplacingMergeTree(ingest_version)
+ORDER BY (entityFQNHash, timestamp);
+INSERT INTO profiler_metadata_replacing (entityFQNHash, rowCount, timestamp, sizeInByte, columnCount, profileSample, createDateTime, profileSampleType)
+SELECT entityFQNHash, rowCount, timestamp, sizeInByte, columnCount, profileSample, createDateTime, profileSampleType FROM profiler_metadata;
+EXCHANGE TABLES profiler_metadata AND profiler_metadata_replacing;
+DROP TABLE profiler_metadata_replacing;
@@ -0,0 +1,6 @@
+-- Job status for asynchronous /instant-pii-scanner/process-files scans.
+-- Every state change of a job is appended as a new row with the same id; the current state is the
+-- row with the latest updated_at (ties broken by queued < running < completed/failed).
+-- Rows written before jobs existed were only saved once the scan had finished, hence the default.
+ALTER TABLE instant_classifier ADD COLUMN IF NOT EXISTS status LowCardinality(String) DEFAULT 'completed' AFTER json_output;
+ALTER TABLE instant_classifier ADD COLUMN IF NOT EXISTS error String DEFAULT '' AFTER status;
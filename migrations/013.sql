@@ -0,0 +1,14 @@
+-- Results of previously scanned files, shared by all service instances (see app/utils/scan_result_cache.py).
+-- cache_key = sha256(content sha256 | scanner version | region | sample size); re-inserting a key replaces it.
+-- Entries older than 90 days are dropped by the TTL; a rescan stores them again.
+CREATE TABLE IF NOT EXISTS scan_result_cache (
+    cache_key String,
+    content_sha256 String,
+    scanner_version LowCardinality(String),
+    region LowCardinality(String),
+    sample_size Float64,
+    ner_results String,
+    created_at DateTime DEFAULT now()
+) ENGINE = ReplacingMergeTree(created_at)
+ORDER BY cache_key
+TTL created_at + INTERVAL 90 DAY;
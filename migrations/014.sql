@@ -0,0 +1,36 @@
+-- Durable records of /unstructured_ner/process_unstructured folder jobs.
+-- Each state change appends a row; ReplacingMergeTree keeps the latest per job_id.
+-- Jobs still queued or running at startup are resumed.
+CREATE TABLE IF NOT EXISTS unstructured_scan_jobs (
+    job_id UUID,
+    bucket_name String,
+    folder_name String,
+    source_type String,
+    source_bucket String,
+    region String,
+    message String,
+    status LowCardinality(String),
+    processed_files UInt32 DEFAULT 0,
+    skipped_files UInt32 DEFAULT 0,
+    failed_files UInt32 DEFAULT 0,
+    error String DEFAULT '',
+    created_at DateTime DEFAULT now(),
+    updated_at DateTime64(3) DEFAULT now64(3)
+) ENGINE = ReplacingMergeTree(updated_at)
+ORDER BY job_id;
+
+-- Per-object checkpoint of folder jobs; the latest row per (bucket_name, object_name) wins.
+-- An object whose latest row is 'completed' with the same ETag is skipped by later jobs.
+-- result_id is the id of the object's row in ner_unstructured_data.
+CREATE TABLE IF NOT EXISTS unstructured_scan_manifest (
+    bucket_name String,
+    object_name String,
+    etag String,
+    size UInt64,
+    status LowCardinality(String),
+    job_id UUID,
+    result_id Nullable(UUID),
+    error String DEFAULT '',
+    updated_at DateTime64(3) DEFAULT now64(3)
+) ENGINE = ReplacingMergeTree(updated_at)
+ORDER BY (bucket_name, object_name);
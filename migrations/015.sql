@@ -0,0 +1,73 @@
+-- Pre-aggregated rollups behind the structured_view_* and unstructured_view_* dashboards.
+-- Materialized views fold every insert into the source tables into small AggregatingMergeTree tables,
+-- so a panel refresh merges a few thousand states instead of scanning and joining the raw tables.
+-- The rollups are keyed by the columns the views join on (table_id, service hash); the OMD entity tables
+-- are still joined when the view is read, so later uploads of those tables show up immediately.
+-- Rows that existed before this migration are copied in by the backfill step of migrate.py.
+
+-- column_ner_results per table, entity type and data element
+CREATE TABLE IF NOT EXISTS column_ner_rollup (
+    table_id String,
+    detected_entity String,
+    data_element String,
+    results AggregateFunction(count),
+    columns AggregateFunction(uniq, String)
+) ENGINE = AggregatingMergeTree()
+ORDER BY (table_id, detected_entity, data_element);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS column_ner_rollup_mv TO column_ner_rollup AS
+SELECT
+    table_id,
+    detected_entity,
+    data_element,
+    countState() AS results,
+    uniqState(column_name) AS columns
+FROM column_ner_results
+GROUP BY table_id, detected_entity, data_element;
+
+-- profiler_data_time_series per database service (first part of entityFQNHash);
+-- the views call the second, third and fourth parts schemas, databases and tables
+CREATE TABLE IF NOT EXISTS profiler_service_rollup (
+    service_hash String,
+    schemas AggregateFunction(uniq, String),
+    databases AggregateFunction(uniq, String),
+    tables AggregateFunction(uniq, String)
+) ENGINE = AggregatingMergeTree()
+ORDER BY service_hash;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS profiler_service_rollup_mv TO profiler_service_rollup AS
+SELECT
+    splitByString('.', entityFQNHash)[1] AS service_hash,
+    uniqState(arrayElement(splitByString('.', entityFQNHash), 2)) AS schemas,
+    uniqState(arrayElement(splitByString('.', entityFQNHash), 3)) AS databases,
+    uniqState(arrayElement(splitByString('.', entityFQNHash), 4)) AS tables
+FROM profiler_data_time_series
+GROUP BY service_hash;
+
+-- ner_unstructured_data per entity type, data element, location, source and file format
+CREATE TABLE IF NOT EXISTS ner_unstructured_rollup (
+    detected_entity String,
+    data_element String,
+    region String,
+    source String,
+    sub_service String,
+    file_type String,
+    results AggregateFunction(count),
+    documents AggregateFunction(uniq, String),
+    bytes AggregateFunction(sum, UInt64)
+) ENGINE = AggregatingMergeTree()
+ORDER BY (detected_entity, data_element, region, source, sub_service, file_type);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS ner_unstructured_rollup_mv TO ner_unstructured_rollup AS
+SELECT
+    detected_entity,
+    data_element,
+    region,
+    source,
+    sub_service,
+    file_type,
+    countState() AS results,
+    uniqState(file_name) AS documents,
+    sumState(file_size) AS bytes
+FROM ner_unstructured_data
+GROUP BY detected_entity, data_element, region, source, sub_service, file_type;
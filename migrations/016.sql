@@ -0,0 +1,38 @@
+-- Precomputed FQN parts for the joins of the structured views.
+-- The views used to split fqnHash / entityFQNHash (and strip the suffix of dbservice_entity_id) for every
+-- row on every query. These MATERIALIZED columns are computed once at insert time; MATERIALIZE COLUMN /
+-- INDEX backfill the existing parts as a background mutation. The parts are named the way the dashboards
+-- count them: the second part of entityFQNHash as the schema, the third as the database.
+-- MATERIALIZED columns are left out of SELECT * and cannot be inserted, so the OMD upload is unaffected.
+
+-- table_entity: service of the table
+ALTER TABLE table_entity ADD COLUMN IF NOT EXISTS service_hash String MATERIALIZED splitByChar('.', fqnHash)[1];
+ALTER TABLE table_entity ADD INDEX IF NOT EXISTS idx_service_hash service_hash TYPE set(100) GRANULARITY 4;
+ALTER TABLE table_entity MATERIALIZE COLUMN service_hash;
+ALTER TABLE table_entity MATERIALIZE INDEX idx_service_hash;
+
+-- database_schema_entity: service of the schema
+ALTER TABLE database_schema_entity ADD COLUMN IF NOT EXISTS service_hash String MATERIALIZED splitByChar('.', fqnHash)[1];
+ALTER TABLE database_schema_entity ADD INDEX IF NOT EXISTS idx_service_hash service_hash TYPE set(100) GRANULARITY 4;
+ALTER TABLE database_schema_entity MATERIALIZE COLUMN service_hash;
+ALTER TABLE database_schema_entity MATERIALIZE INDEX idx_service_hash;
+
+-- profiler_data_time_series: all four parts of the profiled entity
+ALTER TABLE profiler_data_time_series ADD COLUMN IF NOT EXISTS service_hash String MATERIALIZED splitByChar('.', entityFQNHash)[1];
+ALTER TABLE profiler_data_time_series ADD COLUMN IF NOT EXISTS schema_part String MATERIALIZED arrayElement(splitByChar('.', entityFQNHash), 2);
+ALTER TABLE profiler_data_time_series ADD COLUMN IF NOT EXISTS database_part String MATERIALIZED arrayElement(splitByChar('.', entityFQNHash), 3);
+ALTER TABLE profiler_data_time_series ADD COLUMN IF NOT EXISTS table_part String MATERIALIZED arrayElement(splitByChar('.', entityFQNHash), 4);
+ALTER TABLE profiler_data_time_series ADD INDEX IF NOT EXISTS idx_service_hash service_hash TYPE set(100) GRANULARITY 4;
+ALTER TABLE profiler_data_time_series ADD INDEX IF NOT EXISTS idx_table_part table_part TYPE bloom_filter(0.01) GRANULARITY 4;
+ALTER TABLE profiler_data_time_series MATERIALIZE COLUMN service_hash;
+ALTER TABLE profiler_data_time_series MATERIALIZE COLUMN schema_part;
+ALTER TABLE profiler_data_time_series MATERIALIZE COLUMN database_part;
+ALTER TABLE profiler_data_time_series MATERIALIZE COLUMN table_part;
+ALTER TABLE profiler_data_time_series MATERIALIZE INDEX idx_service_hash;
+ALTER TABLE profiler_data_time_series MATERIALIZE INDEX idx_table_part;
+
+-- dbservice_entity_meta_info: dbservice_entity id without the suffix after the first '.'
+ALTER TABLE dbservice_entity_meta_info ADD COLUMN IF NOT EXISTS normalized_service_id String MATERIALIZED splitByChar('.', dbservice_entity_id)[1];
+ALTER TABLE dbservice_entity_meta_info ADD INDEX IF NOT EXISTS idx_normalized_service_id normalized_service_id TYPE bloom_filter(0.01) GRANULARITY 1;
+ALTER TABLE dbservice_entity_meta_info MATERIALIZE COLUMN normalized_service_id;
+ALTER TABLE dbservice_entity_meta_info MATERIALIZE INDEX idx_normalized_service_id;
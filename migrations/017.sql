@@ -0,0 +1,51 @@
+-- Schema v2 of the NER result tables: sort keys that match how the tables are read, monthly partitions,
+-- LowCardinality for the small string domains and ZSTD for the json blobs.
+-- Only the new tables are created here. migrate.py's swap step copies the data across while the service
+-- keeps writing, exchanges the tables and drops the old ones (see TABLE_SWAPS in migrate.py).
+
+-- column_ner_results: read per table and per entity type; id lookups use the bloom filter
+CREATE TABLE IF NOT EXISTS column_ner_results_v2 (
+    id UUID DEFAULT generateUUIDv4(),
+    table_id String,
+    column_name String,
+    json String CODEC(ZSTD(3)),
+    detected_entity LowCardinality(String),
+    data_element LowCardinality(String),
+    created_at DateTime DEFAULT now() CODEC(Delta, ZSTD(1)),
+    updated_at DateTime DEFAULT now() CODEC(Delta, ZSTD(1)),
+    INDEX idx_id id TYPE bloom_filter(0.01) GRANULARITY 4,
+    INDEX idx_detected_entity detected_entity TYPE set(100) GRANULARITY 4
+) ENGINE = MergeTree()
+PARTITION BY toYYYYMM(created_at)
+ORDER BY (table_id, column_name, created_at);
+
+-- data_element: a few hundred rows looked up by parameter_value; too small and undated to partition
+CREATE TABLE IF NOT EXISTS data_element_v2 (
+    id UUID DEFAULT generateUUIDv4(),
+    parameter_name LowCardinality(String),
+    parameter_value String,
+    parameter_sensitivity LowCardinality(String)
+) ENGINE = MergeTree()
+ORDER BY (parameter_value, parameter_name);
+
+-- ner_unstructured_data: read per location, source and entity type; partitioned by month instead of by
+-- source_bucket, which created one partition per bucket
+CREATE TABLE IF NOT EXISTS ner_unstructured_data_v2 (
+    id UUID DEFAULT generateUUIDv4(),
+    source_bucket LowCardinality(String),
+    file_name String,
+    json String CODEC(ZSTD(3)),
+    detected_entity LowCardinality(String),
+    data_element LowCardinality(String),
+    file_size UInt64,
+    file_type LowCardinality(String),
+    source LowCardinality(String),
+    sub_service LowCardinality(String),
+    region LowCardinality(String),
+    created_at DateTime DEFAULT now() CODEC(Delta, ZSTD(1)),
+    updated_at DateTime DEFAULT now() CODEC(Delta, ZSTD(1)),
+    INDEX idx_id id TYPE bloom_filter(0.01) GRANULARITY 4,
+    INDEX idx_file_name file_name TYPE bloom_filter(0.01) GRANULARITY 4
+) ENGINE = MergeTree()
+PARTITION BY toYYYYMM(created_at)
+ORDER BY (region, source, detected_entity, created_at);
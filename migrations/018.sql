@@ -0,0 +1,75 @@
+-- Typed profiler metrics: one row per (entity, profile timestamp, column, metric) for the numeric metrics of the
+-- tableProfile and columnProfile documents, so trend panels read Float64 values instead of parsing json.
+-- The upload of profiler_data_time_series writes the points (profiler_meta_data in clickhouse_service.py);
+-- migrate.py backfills the profiles uploaded before this table existed.
+-- timestamp is OpenMetadata's epoch milliseconds, as in profiler_data_time_series and profiler_metadata.
+
+-- Raw points, kept for 30 days. Re-uploaded profiles carry the same key and collapse on merge.
+CREATE TABLE IF NOT EXISTS profiler_metric_points (
+    entityFQNHash String,
+    timestamp UInt64 CODEC(Delta, ZSTD(1)),
+    column_name String,  -- '' for table metrics
+    metric LowCardinality(String),
+    value Float64 CODEC(Gorilla, ZSTD(1)),
+    ingest_version UInt64 DEFAULT toUnixTimestamp64Micro(now64(6))  -- Latest ingest wins on merge
+) ENGINE = ReplacingMergeTree(ingest_version)
+PARTITION BY toYYYYMM(toDateTime(intDiv(timestamp, 1000)))
+ORDER BY (entityFQNHash, timestamp, column_name, metric)
+TTL toDateTime(intDiv(timestamp, 1000)) + INTERVAL 30 DAY;
+
+-- Hourly rollup, kept for 180 days. min / max / last are unaffected by re-uploaded profiles; avg weighs them
+-- once per upload. The rollups lead with metric, since every trend names one and fleet-wide trends name
+-- no entity.
+CREATE TABLE IF NOT EXISTS profiler_metric_hourly (
+    entityFQNHash String,
+    column_name String,
+    metric LowCardinality(String),
+    hour DateTime,
+    min_value AggregateFunction(min, Float64),
+    max_value AggregateFunction(max, Float64),
+    avg_value AggregateFunction(avg, Float64),
+    last_value AggregateFunction(argMax, Float64, UInt64)
+) ENGINE = AggregatingMergeTree()
+PARTITION BY toYYYYMM(hour)
+ORDER BY (metric, entityFQNHash, column_name, hour)
+TTL hour + INTERVAL 180 DAY;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS profiler_metric_hourly_mv TO profiler_metric_hourly AS
+SELECT
+    entityFQNHash,
+    column_name,
+    metric,
+    toStartOfHour(toDateTime(intDiv(timestamp, 1000))) AS hour,
+    minState(value) AS min_value,
+    maxState(value) AS max_value,
+    avgState(value) AS avg_value,
+    argMaxState(value, timestamp) AS last_value
+FROM profiler_metric_points
+GROUP BY entityFQNHash, column_name, metric, hour;
+
+-- Daily rollup, kept indefinitely
+CREATE TABLE IF NOT EXISTS profiler_metric_daily (
+    entityFQNHash String,
+    column_name String,
+    metric LowCardinality(String),
+    day Date,
+    min_value AggregateFunction(min, Float64),
+    max_value AggregateFunction(max, Float64),
+    avg_value AggregateFunction(avg, Float64),
+    last_value AggregateFunction(argMax, Float64, UInt64)
+) ENGINE = AggregatingMergeTree()
+PARTITION BY toYear(day)
+ORDER BY (metric, entityFQNHash, column_name, day);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS profiler_metric_daily_mv TO profiler_metric_daily AS
+SELECT
+    entityFQNHash,
+    column_name,
+    metric,
+    toDate(toDateTime(intDiv(timestamp, 1000))) AS day,
+    minState(value) AS min_value,
+    maxState(value) AS max_value,
+    avgState(value) AS avg_value,
+    argMaxState(value, timestamp) AS last_value
+FROM profiler_metric_points
+GROUP BY entityFQNHash, column_name, metric, day;
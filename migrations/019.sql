@@ -0,0 +1,18 @@
+-- data_element as a dictionary, so the views look categories and sensitivities up with dictGet instead of
+-- joining the table. data_element_lookup keeps one row per parameter_value; a real category wins over the
+-- UNKNOWN row the service registers for new entities, as in data_element_cache.py. The dictionary is
+-- reloaded every 1-5 minutes, so UNKNOWN rows and edits to data_element show up in the views after a reload.
+
+CREATE VIEW IF NOT EXISTS data_element_lookup AS
+SELECT
+    parameter_value,
+    best.1 AS parameter_name,
+    best.2 AS parameter_sensitivity
+FROM (
+    SELECT parameter_value, argMax((parameter_name, parameter_sensitivity), parameter_name != 'UNKNOWN') AS best
+    FROM data_element
+    GROUP BY parameter_value
+);
+
+-- data_element_dict itself is created by migrate.py (DATA_ELEMENT_DICTIONARY), which gives its source the
+-- service's ClickHouse user, password and database.
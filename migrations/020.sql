@@ -0,0 +1,27 @@
+-- Folder job ownership and per-job manifests.
+-- owner is the instance (host:pid) that last wrote the job's state. A running job rewrites its state every
+-- SCAN_JOB_HEARTBEAT_SECONDS, so updated_at doubles as its heartbeat: instances only resume jobs whose
+-- heartbeat is older than SCAN_JOB_LEASE_SECONDS, and only after their claim wins (scan_job_store.py).
+ALTER TABLE unstructured_scan_jobs ADD COLUMN IF NOT EXISTS owner String DEFAULT '' AFTER error;
+
+-- The manifest keyed by (bucket_name, object_name) kept one row per object across jobs, so a later job
+-- checkpointing the same objects replaced an earlier job's rows and zeroed its counts. This table keeps the
+-- latest row per object and job; the latest row per object across jobs is read with argMax.
+CREATE TABLE IF NOT EXISTS unstructured_scan_manifest_v2 (
+    bucket_name String,
+    object_name String,
+    etag String,
+    size UInt64,
+    status LowCardinality(String),
+    job_id UUID,
+    result_id Nullable(UUID),
+    error String DEFAULT '',
+    updated_at DateTime64(3) DEFAULT now64(3),
+    INDEX job_id_idx job_id TYPE bloom_filter GRANULARITY 4
+) ENGINE = ReplacingMergeTree(updated_at)
+ORDER BY (bucket_name, object_name, job_id);
+
+-- The old table is left in place for instances still running the previous release
+INSERT INTO unstructured_scan_manifest_v2
+SELECT bucket_name, object_name, etag, size, status, job_id, result_id, error, updated_at
+FROM unstructured_scan_manifest;
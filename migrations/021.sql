@@ -0,0 +1,12 @@
+-- Claims on interrupted folder jobs. An instance that finds a stale job records a claim keyed by the job and
+-- the heartbeat it saw (toUnixTimestamp64Milli of updated_at), waits SCAN_JOB_CLAIM_SETTLE_SECONDS and reads
+-- the claims back: every contender picks the earliest claim by server time, so they agree on one winner.
+-- claimed_at is always the server's clock.
+CREATE TABLE IF NOT EXISTS unstructured_scan_job_claims (
+    job_id UUID,
+    heartbeat_ms Int64,
+    owner String,
+    claimed_at DateTime64(3) DEFAULT now64(3)
+) ENGINE = MergeTree()
+ORDER BY (job_id, heartbeat_ms)
+TTL toDateTime(claimed_at) + INTERVAL 7 DAY;
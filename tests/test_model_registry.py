@@ -0,0 +1,34 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.model_registry import ModelRegistry
+
+THREADS = 8
+
+
+def test_concurrent_get_loads_once():
+    registry = ModelRegistry()
+    load_count = 0
+
+    def counting_loader():
+        nonlocal load_count
+        load_count += 1
+        # Keep the load in progress while the other threads ask for the model
+        time.sleep(0.2)
+        return object()
+
+    registry.register("counting", counting_loader)
+    start = threading.Barrier(THREADS)
+
+    def get_model():
+        start.wait()
+        return registry.get("counting")
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        models = list(executor.map(lambda _: get_model(), range(THREADS)))
+
+    assert load_count == 1
+    assert all(model is models[0] for model in models)
+    assert registry.stats()["models"]["counting"]["load_count"] == 1
+    assert registry.stats()["models"]["counting"]["requests"] == THREADS
@@ -1,8 +1,8 @@
-CREATE VIEW IF NOT EXISTS structured_view_data_element_categories AS
+CREATE OR REPLACE VIEW structured_view_data_element_categories AS
 SELECT
     data_element,
-    COUNT(*) AS data_element_category
+    countMerge(results) AS data_element_category
 FROM 
-    column_ner_results
+    column_ner_rollup
 GROUP BY 
     data_element;
@@ -1,26 +1,34 @@
-CREATE VIEW IF NOT EXISTS structured_view_data_element_types AS
+CREATE OR REPLACE VIEW structured_view_data_element_types AS
 SELECT
     c.detected_entity AS data_element_types,  -- The detected entity type (e.g., CVV, PERSON)
-    COUNT(DISTINCT c.id) AS count_data_element_types,     -- Count of how many times the entity appears, distinct by c.id
-    COUNT(DISTINCT c.column_name) AS total_columns,  -- Distinct columns where this entity appeared
+    any(totals.results) AS count_data_element_types,     -- Count of how many times the entity appears
+    any(totals.columns) AS total_columns,  -- Distinct columns where this entity appeared
     COUNT(DISTINCT t.id) AS total_tables,      -- Distinct tables where this entity appeared
-    COUNT(DISTINCT splitByString('.', CAST(p.entityFQNHash AS String))[2]) AS total_schemas,  -- Distinct schemas
-    COUNT(DISTINCT splitByString('.', CAST(p.entityFQNHash AS String))[3]) AS total_databases,  -- Distinct databases
+    uniqMerge(p.schemas) AS total_schemas,  -- Distinct schemas
+    uniqMerge(p.databases) AS total_databases,  -- Distinct databases
     COUNT(DISTINCT e.serviceType) AS total_data_systems,  -- Distinct service types
     COUNT(DISTINCT d.region) AS total_locations  -- Distinct regions
 FROM 
-    column_ner_results c
+    column_ner_rollup c
+JOIN 
+    (
+        -- Per-entity totals, taken before the joins below repeat the rollup rows
+        SELECT detected_entity, countMerge(results) AS results, uniqMerge(columns) AS columns
+        FROM column_ner_rollup
+        GROUP BY detected_entity
+    ) totals ON totals.detected_entity = c.detected_entity
 LEFT JOIN 
-    table_entity t ON t.id = c.table_id
+    table_entity t FINAL ON t.id = c.table_id
 LEFT JOIN 
-    dbservice_entity e ON e.nameHash = splitByString('.', CAST(t.fqnHash AS String))[1]
+    dbservice_entity e FINAL ON e.nameHash = t.service_hash
 LEFT JOIN 
-    profiler_data_time_series p ON splitByString('.', CAST(p.entityFQNHash AS String))[1] = e.nameHash 
+    (
+        -- One row per service
+        SELECT service_hash, uniqMergeState(schemas) AS schemas, uniqMergeState(databases) AS databases
+        FROM profiler_service_rollup
+        GROUP BY service_hash
+    ) p ON p.service_hash = e.nameHash 
 LEFT JOIN 
-    dbservice_entity_meta_info d ON e.id = CASE 
-                                              WHEN position(d.dbservice_entity_id, '.') > 0 
-                                              THEN substring(d.dbservice_entity_id, 1, position(d.dbservice_entity_id, '.') - 1)
-                                              ELSE d.dbservice_entity_id
-                                            END
+    dbservice_entity_meta_info d FINAL ON e.id = d.normalized_service_id
 GROUP BY 
     c.detected_entity;
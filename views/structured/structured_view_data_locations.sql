@@ -1,28 +1,31 @@
-CREATE VIEW IF NOT EXISTS structured_view_data_locations AS 
+CREATE OR REPLACE VIEW structured_view_data_locations AS 
 SELECT 
     d.region as location,
     COUNT(DISTINCT db.serviceType) AS total_data_systems,
-    COUNT(DISTINCT arrayElement(splitByString('.', p.entityFQNHash), 4)) AS total_tables,
-    COUNT(DISTINCT arrayElement(splitByString('.', p.entityFQNHash), 2)) AS total_schemas,
-    COUNT(DISTINCT arrayElement(splitByString('.', p.entityFQNHash), 3)) AS total_databases,
+    uniqMerge(p.tables) AS total_tables,
+    uniqMerge(p.schemas) AS total_schemas,
+    uniqMerge(p.databases) AS total_databases,
     COUNT(DISTINCT c.detected_entity) AS total_data_elements
 FROM 
-    dbservice_entity_meta_info d
+    dbservice_entity_meta_info d FINAL
 JOIN
-    dbservice_entity db 
-    ON db.id = CASE 
-                WHEN position(d.dbservice_entity_id, '.') > 0 
-                THEN substring(d.dbservice_entity_id, 1, position(d.dbservice_entity_id, '.') - 1)
-                ELSE d.dbservice_entity_id
-              END
+    dbservice_entity db FINAL
+    ON db.id = d.normalized_service_id
 JOIN
-    profiler_data_time_series p
-    ON arrayElement(splitByString('.', p.entityFQNHash), 1) = db.nameHash
+    (
+        -- One row per service
+        SELECT service_hash, uniqMergeState(tables) AS tables, uniqMergeState(schemas) AS schemas, uniqMergeState(databases) AS databases
+        FROM profiler_service_rollup
+        GROUP BY service_hash
+    ) p
+    ON p.service_hash = db.nameHash
 JOIN
-    table_entity t
-    ON arrayElement(splitByString('.', t.fqnHash), 1) = arrayElement(splitByString('.', p.entityFQNHash), 1)
-JOIN
-    column_ner_results c
-    ON c.table_id = t.id
+    (
+        -- Entity types found in the tables of each service
+        SELECT DISTINCT t.service_hash, r.detected_entity
+        FROM table_entity t FINAL
+        JOIN column_ner_rollup r ON r.table_id = t.id
+    ) c
+    ON c.service_hash = p.service_hash
 GROUP BY 
     d.region;
@@ -1,11 +1,11 @@
-CREATE VIEW IF NOT EXISTS structured_view_data_management AS 
+CREATE OR REPLACE VIEW structured_view_data_management AS 
 SELECT 
     COUNT(DISTINCT serviceType) AS total_services,
     COUNT(DISTINCT updatedBy) AS total_system_owner,
-    COUNT(DISTINCT splitByString('.', entityFQNHash)[3]) AS total_databases,
-    COUNT(DISTINCT splitByString('.', entityFQNHash)[2]) AS total_schemas
+    uniqMerge(p.databases) AS total_databases,
+    uniqMerge(p.schemas) AS total_schemas
 FROM 
-    profiler_data_time_series p
+    profiler_service_rollup p
 JOIN 
-    dbservice_entity d
-    ON splitByString('.', entityFQNHash)[1] = d.nameHash;
+    dbservice_entity d FINAL
+    ON p.service_hash = d.nameHash;
@@ -1,9 +1,6 @@
-CREATE VIEW IF NOT EXISTS structured_view_data_ner AS 
+CREATE OR REPLACE VIEW structured_view_data_ner AS 
 SELECT
     c.*, 
-     d.parameter_sensitivity
+    dictGetOrDefault('data_element_dict', 'parameter_sensitivity', c.detected_entity, '') AS parameter_sensitivity
 FROM 
-    column_ner_results c
-LEFT JOIN 
-    data_element d
-    ON c.detected_entity = d.parameter_value;
\ No newline at end of file
+    column_ner_results c;
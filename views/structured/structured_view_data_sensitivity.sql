@@ -1,11 +1,10 @@
-CREATE VIEW IF NOT EXISTS structured_view_data_sensitivity AS 
+CREATE OR REPLACE VIEW structured_view_data_sensitivity AS 
 SELECT
-    de.parameter_sensitivity AS sensitivity,
+    dictGet('data_element_dict', 'parameter_sensitivity', c.detected_entity) AS sensitivity,
     COUNT(DISTINCT c.detected_entity) AS sensitivity_count
 FROM
-    data_element de
-JOIN
-    column_ner_results c
-    ON c.detected_entity = de.parameter_value
+    column_ner_rollup c
+WHERE
+    dictHas('data_element_dict', c.detected_entity)  -- Only entities listed in data_element
 GROUP BY
-    de.parameter_sensitivity;
+    sensitivity;
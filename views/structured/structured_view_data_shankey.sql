@@ -1,4 +1,4 @@
-CREATE VIEW IF NOT EXISTS structured_view_data_shankey AS 
+CREATE OR REPLACE VIEW structured_view_data_shankey AS 
 SELECT DISTINCT
     d.region AS location,
     db.serviceType AS data_system, 
@@ -7,20 +7,18 @@ SELECT DISTINCT
     c.data_element AS data_category,  -- Use the data_element column directly
     c.detected_entity AS pii
 FROM 
-    dbservice_entity_meta_info d
+    dbservice_entity_meta_info d FINAL
 JOIN
-    dbservice_entity db 
-    ON db.id = CASE 
-                WHEN position(d.dbservice_entity_id, '.') > 0 
-                THEN substring(d.dbservice_entity_id, 1, position(d.dbservice_entity_id, '.') - 1)
-                ELSE d.dbservice_entity_id
-              END
+    dbservice_entity db FINAL
+    ON db.id = d.normalized_service_id
 JOIN
-    database_schema_entity s
-    ON arrayElement(splitByString('.', s.fqnHash), 1) = db.nameHash
+    database_schema_entity s FINAL
+    ON s.service_hash = db.nameHash
 JOIN
-    table_entity t
-    ON arrayElement(splitByString('.', t.fqnHash), 1) = arrayElement(splitByString('.', s.fqnHash), 1)
-JOIN
-    column_ner_results c
-    ON c.table_id = t.id;
+    (
+        -- Data categories and entity types found in the tables of each service
+        SELECT DISTINCT t.service_hash, r.data_element, r.detected_entity
+        FROM table_entity t FINAL
+        JOIN column_ner_rollup r ON r.table_id = t.id
+    ) c
+    ON c.service_hash = s.service_hash;
@@ -1,5 +1,5 @@
-CREATE VIEW IF NOT EXISTS structured_view_location AS
+CREATE OR REPLACE VIEW structured_view_location AS
 SELECT 
     COUNT(DISTINCT region) AS location
 FROM
-    dbservice_entity_meta_info;
+    dbservice_entity_meta_info FINAL;
@@ -1,9 +1,9 @@
-CREATE VIEW IF NOT EXISTS unstructured_view_data_element_listing AS
+CREATE OR REPLACE VIEW unstructured_view_data_element_listing AS
 SELECT
-     DISTINCT detected_entity AS data_element_type,
-    COUNT(detected_entity) AS data_elements,
-    COUNT(DISTINCT file_name) AS documents,
+    detected_entity AS data_element_type,
+    countMerge(results) AS data_elements,
+    uniqMerge(documents) AS documents,
     COUNT(DISTINCT source) AS data_systems,
     COUNT(DISTINCT region) AS locations
-FROM ner_unstructured_data
+FROM ner_unstructured_rollup
 GROUP BY detected_entity;
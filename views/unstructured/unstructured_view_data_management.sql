@@ -1,6 +1,6 @@
-CREATE VIEW IF NOT EXISTS unstructured_view_data_management AS
+CREATE OR REPLACE VIEW unstructured_view_data_management AS
 SELECT
-    COUNT(DISTINCT file_name) AS scanned_documents,
-    SUM(file_size) / 1024 AS scanned_volume,
+    uniqMerge(documents) AS scanned_documents,
+    sumMerge(bytes) / 1024 AS scanned_volume,
     COUNT(DISTINCT file_type) AS file_format_count
-FROM ner_unstructured_data;
+FROM ner_unstructured_rollup;
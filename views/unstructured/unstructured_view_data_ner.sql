@@ -1,9 +1,6 @@
-CREATE VIEW IF NOT EXISTS unstructured_view_data_ner AS 
+CREATE OR REPLACE VIEW unstructured_view_data_ner AS 
 SELECT 
-    Distinct c.*, 
-    d.parameter_sensitivity
+    c.*, 
+    dictGetOrDefault('data_element_dict', 'parameter_sensitivity', c.detected_entity, '') AS parameter_sensitivity
 FROM 
-    ner_unstructured_data c
-LEFT JOIN 
-    data_element d
-    ON c.detected_entity = d.parameter_value;
+    ner_unstructured_data c;
@@ -1,10 +1,10 @@
-CREATE VIEW IF NOT EXISTS unstructured_view_data_sensitivity AS 
+CREATE OR REPLACE VIEW unstructured_view_data_sensitivity AS 
 SELECT 
-    de.parameter_sensitivity AS sensitivity,
-    COUNT(n.detected_entity) AS sensitivity_count
+    dictGet('data_element_dict', 'parameter_sensitivity', n.detected_entity) AS sensitivity,
+    countMerge(n.results) AS sensitivity_count
 FROM 
-    ner_unstructured_data n
-JOIN 
-    data_element de ON n.detected_entity = de.parameter_value
+    ner_unstructured_rollup n
+WHERE 
+    dictHas('data_element_dict', n.detected_entity)  -- Only entities listed in data_element
 GROUP BY 
-    de.parameter_sensitivity;
\ No newline at end of file
+    sensitivity;